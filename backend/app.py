@@ -1,45 +1,79 @@
-import random
-import statistics
-import numpy as np
-from fastapi import FastAPI, HTTPException
+import os
+
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, WebSocket
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from collections import defaultdict
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import HTTPConnection
 
-from simulation.order_book import OrderBook
-from simulation.matching_engine import MatchingEngine
-from simulation.agents import NoiseTrader, MarketTaker, LiquidityProvider
+from responses import MEDIA_TYPES, RESPONSE_FORMATS
+from session import DEFAULT_SESSION, SERIALIZE_TIME, SessionRegistry, Simulation
+from simulation.export import EXPORT_FORMATS, EXPORT_TABLES, stream_batches, table_schema
+from simulation.indicators import MAX_PERIOD
+from simulation.metrics import METRICS
+from simulation.profiling import profile_call
 
 # --- Pydantic Models ---
 class AgentConfig(BaseModel):
     agent_type: str
     count: int = 1
+    params: dict[str, float] = {}  # overrides of the agent type's defaults
+
+MAX_AGENTS_PER_REQUEST = 100_000
 
 class StepConfig(BaseModel):
     count: int = 1
 
-# --- Global Simulation State & initialize_simulation() function ---
-current_tick = 0
-order_queue = [] 
-order_book = OrderBook()
-matching_engine = MatchingEngine(order_book)
-agents = []
-trades_log = []
-
-def initialize_simulation():
-    global order_book, matching_engine, trades_log, agents, current_tick, order_queue
-    current_tick = 0
-    order_queue = []
-    order_book = OrderBook()
-    matching_engine = MatchingEngine(order_book)
-    trades_log = []
-    agents = [
-        LiquidityProvider(agent_id=1),
-        NoiseTrader(agent_id=2),
-        MarketTaker(agent_id=3),
-    ]
-
-initialize_simulation()
+class ProfileConfig(BaseModel):
+    count: int = 10000
+    interval_ms: float = 1.0
+
+# --- History paging ---
+# History endpoints return {"start", "cursor", "items"}: the records in
+# [start, cursor) of their series. Clients pass the returned cursor back to
+# receive only newer records. A cursor beyond the end of the series means
+# the simulation was reset, so paging restarts from 0 (start != cursor sent).
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 10000
+
+def page_bounds(total: int, cursor: int, limit: int) -> tuple[int, int]:
+    if cursor < 0 or cursor > total:
+        cursor = 0
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    return cursor, min(total, cursor + limit)
+
+# --- Cached responses ---
+# The high-volume endpoints take ``format=json`` (the default) or
+# ``format=msgpack``. Their bodies are encoded once per version of the
+# session's market and served from its payload cache until the next step.
+def cached_response(session: Simulation, key: tuple, format: str, build) -> Response:
+    if format not in RESPONSE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown response format: {format}")
+    with session.lock:
+        try:
+            with SERIALIZE_TIME.time():
+                body = session.payloads.get(session.version, key, format, build)
+        except RuntimeError as e:
+            raise HTTPException(status_code=501, detail=str(e))
+    return Response(content=body, media_type=MEDIA_TYPES[format])
+
+# --- Sessions ---
+# Each session is an independent simulation. The routes below are served
+# both at the root (the default session, used by the dashboard) and under
+# /sessions/{session_id}. FastAPI runs these sync endpoints in its worker
+# thread pool, so a long step holds only its own session's lock and never
+# blocks the event loop or other sessions. Setting MMS_JOURNAL_DIR journals
+# every session to that directory (see simulation/journal.py).
+sessions = SessionRegistry(journal_dir=os.environ.get("MMS_JOURNAL_DIR"))
+METRICS.gauge("mms_sessions", "Sessions currently open.", lambda: len(sessions))
+
+def get_session(connection: HTTPConnection) -> Simulation:
+    session_id = connection.path_params.get("session_id", DEFAULT_SESSION)
+    session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found.")
+    return session
 
 # --- FastAPI App & CORS ---
 app = FastAPI(
@@ -60,209 +94,226 @@ app.add_middleware(
 def read_root():
     return {"status": "ok"}
 
-@app.post("/simulation/reset")
-def reset_simulation():
-    initialize_simulation()
+@app.post("/sessions")
+def create_session():
+    return {"session_id": sessions.create().session_id}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Returns the step phase histograms and counters in the Prometheus text format."""
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+@app.delete("/sessions/{session_id}")
+def delete_session(session_id: str):
+    if session_id == DEFAULT_SESSION or not sessions.remove(session_id):
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found.")
+    return {"message": f"Session {session_id} removed."}
+
+router = APIRouter()
+
+@router.post("/simulation/reset")
+def reset_simulation(session: Simulation = Depends(get_session)):
+    with session.lock:
+        session.reset()
+        if session.hub.clients:
+            session.publish({**session.stream_update(0), "reset": True})
     return {"message": "Simulation reset successfully."}
 
-@app.post("/simulation/step")
-def run_simulation_step(config: StepConfig):
-    global current_tick
-    newly_queued_orders = [] 
-    for _ in range(config.count):
-        due_orders = [item for item in order_queue if item[0] <= current_tick]
-        agent_map = {agent.agent_id: agent for agent in agents}
-        for process_tick, order in due_orders:
-            trades = matching_engine.process_order(order)
-            if trades:
-                for trade in trades:
-                    aggressor_agent = agent_map.get(trade.aggressor_agent_id)
-                    resting_agent = agent_map.get(trade.resting_agent_id)
-                    if trade.side == 'buy':
-                        buyer, seller = aggressor_agent, resting_agent
-                    else:
-                        seller, buyer = aggressor_agent, resting_agent
-                    trade_value = trade.price * trade.quantity
-                    if buyer and seller:
-                        buyer.portfolio['cash'] -= trade_value
-                        buyer.portfolio['shares'] += trade.quantity
-                        seller.portfolio['cash'] += trade_value
-                        seller.portfolio['shares'] -= trade.quantity
-                trades_log.extend(trades)
-        order_queue[:] = [item for item in order_queue if item[0] > current_tick]
-        if agents:
-            agent = random.choice(agents)
-            new_order = agent.act(order_book)
-            if new_order:
-                process_at_tick = current_tick + agent.latency
-                order_queue.append((process_at_tick, new_order))
-                newly_queued_orders.append(new_order)
-        current_tick += 1
-    return {
-        "message": f"Ran {config.count} simulation steps. Current tick is {current_tick}.",
-        "newly_queued_orders": newly_queued_orders
-    }
-
-@app.get("/data/market-metrics")
-def get_market_metrics():
-    total_volume = sum(trade.quantity for trade in trades_log)
-    volatility = 0
-    if len(trades_log) > 1:
-        prices = [trade.price for trade in trades_log]
-        volatility = statistics.stdev(prices)
-    return {
-        "total_volume": total_volume,
-        "volatility": volatility,
-        "trade_count": len(trades_log)
-    }
-    
-@app.get("/agents")
-def get_agents():
-    return [{"agent_id": agent.agent_id, "type": type(agent).__name__, "latency": agent.latency} for agent in agents]
-
-@app.get("/agents/pnl")
-def get_pnl():
-    last_trade_price = trades_log[-1].price if trades_log else 100.0
-    pnl_data = []
-    for agent in agents:
-        portfolio_value = agent.portfolio['cash'] + (agent.portfolio['shares'] * last_trade_price)
-        pnl = portfolio_value - 100000.0
-        pnl_data.append({
-            "agent_id": agent.agent_id, "type": type(agent).__name__, "portfolio": agent.portfolio,
-            "portfolio_value": portfolio_value, "pnl": pnl
-        })
-    return pnl_data
-
-@app.post("/agents")
-def add_agents(config: AgentConfig):
-    last_id = max([agent.agent_id for agent in agents]) if agents else 0
-    for i in range(config.count):
-        new_id = last_id + i + 1
-        agent_map = {"NoiseTrader": NoiseTrader, "MarketTaker": MarketTaker, "LiquidityProvider": LiquidityProvider}
-        agent_class = agent_map.get(config.agent_type)
-        if agent_class:
-            agents.append(agent_class(agent_id=new_id))
-        else:
+@router.post("/simulation/step")
+def run_simulation_step(config: StepConfig, session: Simulation = Depends(get_session)):
+    with session.lock:
+        newly_queued_orders = session.step(config.count)
+        current_tick = session.current_tick
+    with SERIALIZE_TIME.time():
+        return {
+            "message": f"Ran {config.count} simulation steps. Current tick is {current_tick}.",
+            "newly_queued_orders": [order.to_dict(session.order_book.grid) for order in newly_queued_orders]
+        }
+
+@router.post("/simulation/profile", response_class=PlainTextResponse)
+def profile_simulation(config: ProfileConfig, session: Simulation = Depends(get_session)):
+    """Runs ``count`` steps under the sampling profiler and returns the folded stacks.
+
+    The response is one line per call stack with its sample count, ready
+    for flamegraph.pl, speedscope or inferno.
+    """
+    if config.count < 1 or config.interval_ms <= 0:
+        raise HTTPException(status_code=400, detail="Count and interval must be positive.")
+    with session.lock:
+        _, profiler = profile_call(session.step, config.count, interval=config.interval_ms / 1000)
+    return PlainTextResponse(profiler.folded(), headers={"X-Profile-Samples": str(profiler.samples)})
+
+@router.get("/data/market-metrics")
+def get_market_metrics(session: Simulation = Depends(get_session)):
+    with session.lock:
+        return session.market_metrics()
+
+@router.get("/agents")
+def get_agents(session: Simulation = Depends(get_session)):
+    with session.lock:
+        return [{"agent_id": agent.agent_id, "type": type(agent).__name__, "latency": agent.latency, "params": agent.params}
+                for agent in session.agents]
+
+@router.get("/agents/pnl")
+def get_pnl(session: Simulation = Depends(get_session)):
+    with session.lock:
+        return session.pnl()
+
+@router.post("/agents")
+def add_agents(config: AgentConfig, session: Simulation = Depends(get_session)):
+    if not 1 <= config.count <= MAX_AGENTS_PER_REQUEST:
+        raise HTTPException(status_code=400, detail=f"Count must be between 1 and {MAX_AGENTS_PER_REQUEST}.")
+    with session.lock:
+        try:
+            added = session.add_agents(config.agent_type, config.count, config.params)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not added:
             return {"error": f"Invalid agent type: {config.agent_type}"}
     return {"message": f"Added {config.count} {config.agent_type}(s)"}
 
-@app.delete("/agents/{agent_id}")
-def remove_agent(agent_id: int):
-    global agents
-    initial_agent_count = len(agents)
-    agents = [agent for agent in agents if agent.agent_id != agent_id]
-    if len(agents) == initial_agent_count:
-        raise HTTPException(status_code=404, detail=f"Agent with ID {agent_id} not found.")
+@router.delete("/agents/{agent_id}")
+def remove_agent(agent_id: int, session: Simulation = Depends(get_session)):
+    with session.lock:
+        if not session.remove_agent(agent_id):
+            raise HTTPException(status_code=404, detail=f"Agent with ID {agent_id} not found.")
     return {"message": f"Agent with ID {agent_id} removed."}
 
-@app.delete("/orders/{order_id}")
-def remove_order(order_id: int):
-    if order_book.cancel_order(order_id):
+@router.delete("/orders/{order_id}")
+def remove_order(order_id: int, session: Simulation = Depends(get_session)):
+    with session.lock:
+        found = session.cancel_order(order_id)
+    if found == "book":
         return {"message": f"Order {order_id} cancelled."}
-    initial_queue_size = len(order_queue)
-    order_queue[:] = [item for item in order_queue if item[1].order_id != order_id]
-    if len(order_queue) < initial_queue_size:
+    if found == "queue":
         return {"message": f"Order {order_id} cancelled from queue."}
     raise HTTPException(status_code=404, detail=f"Order with ID {order_id} not found in book or queue.")
 
-@app.get("/data/book")
-def get_order_book():
-    return {"bids": order_book.bids, "asks": order_book.asks}
-
-@app.get("/data/book/depth")
-def get_book_depth():
-    bid_depth = defaultdict(int)
-    for order in order_book.bids:
-        bid_depth[order.price] += order.quantity
-    ask_depth = defaultdict(int)
-    for order in order_book.asks:
-        ask_depth[order.price] += order.quantity
-    sorted_bids = sorted(
-        [{"price": p, "volume": v} for p, v in bid_depth.items()],
-        key=lambda x: x['price'], reverse=True
-    )
-    sorted_asks = sorted(
-        [{"price": p, "volume": v} for p, v in ask_depth.items()],
-        key=lambda x: x['price']
-    )
-    return {"bids": sorted_bids, "asks": sorted_asks}
-
-@app.get("/data/agent-interactions")
-def get_agent_interactions():
-    nodes = [{"id": agent.agent_id, "type": type(agent).__name__} for agent in agents]
-    link_volumes = defaultdict(int)
-    for trade in trades_log:
-        source_id = trade.aggressor_agent_id
-        target_id = trade.resting_agent_id
-        if source_id == target_id: continue
-        key = tuple(sorted((source_id, target_id)))
-        link_volumes[key] += trade.quantity
-    links = [{"source": k[0], "target": k[1], "value": v} for k, v in link_volumes.items()]
-    return {"nodes": nodes, "links": links}
-    
-@app.get("/data/candlestick")
-def get_candlestick_data(timeframe: int = 10):
-    if not trades_log:
-        return []
-    candles = []
-    chunk_size = timeframe
-    for i in range(0, len(trades_log), chunk_size):
-        chunk = trades_log[i:i + chunk_size]
-        if not chunk: continue
-        prices = [trade.price for trade in chunk]
-        candle = {
-            "time": chunk[0].timestamp, "open": chunk[0].price, "high": max(prices),
-            "low": min(prices), "close": chunk[-1].price, "volume": sum(trade.quantity for trade in chunk)
+@router.get("/data/book")
+def get_order_book(format: str = "json", session: Simulation = Depends(get_session)):
+    def build():
+        book = session.order_book
+        return {
+            "bids": [order.to_dict(book.grid) for order in book.bids],
+            "asks": [order.to_dict(book.grid) for order in book.asks],
         }
-        candles.append(candle)
-    return candles
-
-@app.get("/data/indicators/sma")
-def get_sma_data(period: int = 20):
-    if len(trades_log) < period:
-        return []
-    prices = np.array([trade.price for trade in trades_log])
-    weights = np.repeat(1.0, period) / period
-    sma = np.convolve(prices, weights, 'valid')
-    sma_data = []
-    for i in range(len(sma)):
-        timestamp = trades_log[i + period - 1].timestamp
-        sma_data.append({"time": timestamp, "sma": sma[i]})
-    return sma_data
-
-@app.get("/data/indicators/bbands")
-def get_bbands_data(period: int = 20, std_dev: int = 2):
-    """Calculates Bollinger Bands for the trade prices."""
-    if len(trades_log) < period:
-        return []
-    
-    prices = np.array([trade.price for trade in trades_log])
-    
-    # Calculate middle band (SMA)
-    middle_band = np.convolve(prices, np.repeat(1.0, period) / period, 'valid')
-    
-    # Calculate standard deviation for each window
-    rolling_std = [np.std(prices[i:i+period]) for i in range(len(prices) - period + 1)]
-    
-    upper_band = middle_band + (np.array(rolling_std) * std_dev)
-    lower_band = middle_band - (np.array(rolling_std) * std_dev)
-    
-    bbands_data = []
-    for i in range(len(middle_band)):
-        timestamp = trades_log[i + period - 1].timestamp
-        bbands_data.append({
-            "time": timestamp,
-            "upper": upper_band[i],
-            "middle": middle_band[i],
-            "lower": lower_band[i]
-        })
-        
-    return bbands_data
-
-@app.get("/data/trades")
-def get_trades_log():
-    return trades_log
-
-@app.get("/data/price-history")
-def get_price_history():
-    return [{"time": trade.timestamp, "price": trade.price} for trade in trades_log]
\ No newline at end of file
+    return cached_response(session, ("book",), format, build)
+
+@router.get("/data/book/depth")
+def get_book_depth(levels: int | None = None, session: Simulation = Depends(get_session)):
+    """Returns aggregated volume per price level, best first; ``levels`` keeps only the top N."""
+    if levels is not None and levels < 1:
+        raise HTTPException(status_code=400, detail="Levels must be positive.")
+    with session.lock:
+        return session.book_depth(levels)
+
+@router.get("/data/book/depth/changes")
+def get_book_depth_changes(since: int = 0, session: Simulation = Depends(get_session)):
+    """Returns the levels that changed after book version ``since`` as [price, volume] pairs."""
+    with session.lock:
+        return session.order_book.get_depth_changes(since)
+
+@router.get("/data/agent-interactions")
+def get_agent_interactions(session: Simulation = Depends(get_session)):
+    with session.lock:
+        return session.agent_interactions()
+
+@router.get("/data/candlestick")
+def get_candlestick_data(timeframe: int = 10, unit: str = "trades", cursor: int = 0, limit: int = DEFAULT_PAGE_SIZE,
+                         format: str = "json", session: Simulation = Depends(get_session)):
+    """Returns a page of closed candles plus the candle that is still open."""
+    def build():
+        try:
+            series = session.candle_aggregator.register(unit, timeframe)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        start, stop = page_bounds(len(series.closed), cursor, limit)
+        return {"start": start, "cursor": stop, "items": series.candles(start, stop), "current": series.current}
+    return cached_response(session, ("candlestick", unit, timeframe, cursor, limit), format, build)
+
+@router.get("/data/indicators/sma")
+def get_sma_data(period: int = 20, cursor: int = 0, limit: int = DEFAULT_PAGE_SIZE,
+                 session: Simulation = Depends(get_session)):
+    if not 1 <= period <= MAX_PERIOD:
+        raise HTTPException(status_code=400, detail=f"Period must be between 1 and {MAX_PERIOD}.")
+    with session.lock:
+        indicators = session.indicators
+        start, stop = page_bounds(indicators.length(period), cursor, limit)
+        return {"start": start, "cursor": stop, "items": indicators.sma(period, start, stop)}
+
+@router.get("/data/indicators/bbands")
+def get_bbands_data(period: int = 20, std_dev: int = 2, cursor: int = 0, limit: int = DEFAULT_PAGE_SIZE,
+                    session: Simulation = Depends(get_session)):
+    """Returns a page of Bollinger Band points."""
+    if not 1 <= period <= MAX_PERIOD:
+        raise HTTPException(status_code=400, detail=f"Period must be between 1 and {MAX_PERIOD}.")
+    with session.lock:
+        indicators = session.indicators
+        start, stop = page_bounds(indicators.length(period), cursor, limit)
+        return {"start": start, "cursor": stop, "items": indicators.bbands(period, std_dev, start, stop)}
+
+@router.get("/data/trades")
+def get_trades_log(cursor: int = 0, limit: int = DEFAULT_PAGE_SIZE, format: str = "json",
+                   session: Simulation = Depends(get_session)):
+    def build():
+        trade_store = session.trade_store
+        start, stop = page_bounds(len(trade_store), cursor, limit)
+        return {"start": start, "cursor": stop, "items": trade_store.to_records(start, stop)}
+    return cached_response(session, ("trades", cursor, limit), format, build)
+
+@router.get("/data/price-history")
+def get_price_history(cursor: int = 0, limit: int = DEFAULT_PAGE_SIZE, format: str = "json",
+                      session: Simulation = Depends(get_session)):
+    def build():
+        trade_store = session.trade_store
+        start, stop = page_bounds(len(trade_store), cursor, limit)
+        timestamps = trade_store.column("timestamp", start, stop).tolist()
+        prices = trade_store.column("price", start, stop).tolist()
+        return {"start": start, "cursor": stop, "items": [{"time": t, "price": p} for t, p in zip(timestamps, prices)]}
+    return cached_response(session, ("price-history", cursor, limit), format, build)
+
+EXPORT_MEDIA_TYPES = {"parquet": "application/vnd.apache.parquet", "arrow": "application/vnd.apache.arrow.stream"}
+
+@router.get("/data/export/{table}")
+def export_table(table: str, format: str = "parquet", start_time: float | None = None, end_time: float | None = None,
+                 timeframe: int = 10, unit: str = "trades", session: Simulation = Depends(get_session)):
+    """Streams a whole history table (trades, candles, depth or pnl) as Parquet or an Arrow IPC stream.
+
+    ``start_time``/``end_time`` limit the export to trades (candles,
+    snapshots) in that range of timestamps.
+    """
+    if table not in EXPORT_TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown export table: {table}")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown export format: {format}")
+    with session.lock:
+        try:
+            candles = session.candle_aggregator.register(unit, timeframe) if table == "candles" else None
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        view = session.history_view(candles)
+    try:
+        schema = table_schema(table)
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    # The rows were fixed when the view was taken, so they are encoded
+    # chunk by chunk without holding the session lock.
+    extension = "parquet" if format == "parquet" else "arrow"
+    return StreamingResponse(
+        stream_batches(view.batches(table, start_time, end_time), schema, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{table}.{extension}"'},
+    )
+
+# --- Event stream ---
+def _publish_initial(session: Simulation, client):
+    with session.lock:
+        session.publish(session.stream_update(len(session.trade_store)), [client])
+
+@router.websocket("/ws/stream")
+async def stream_events(websocket: WebSocket, session: Simulation = Depends(get_session)):
+    """Pushes coalesced trades, depth changes, PnL and metrics after every step."""
+    await session.hub.serve(websocket, lambda client: run_in_threadpool(_publish_initial, session, client))
+
+app.include_router(router)
+app.include_router(router, prefix="/sessions/{session_id}")
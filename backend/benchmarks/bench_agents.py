@@ -0,0 +1,64 @@
+"""Cost per decision of per-agent ``act()`` calls versus population-wide draws.
+
+For each population size, times ``--ticks`` decisions made one agent at a
+time (pick an agent, call ``act``) and made through ``Population.draw`` plus
+``Decisions.order``, both against the same resting book.
+
+Run from the ``backend`` directory:
+
+    python -m benchmarks.bench_agents
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from simulation.agents import LiquidityProvider, MarketTaker, NoiseTrader
+from simulation.models import Order
+from simulation.order_book import OrderBook
+from simulation.population import Population
+
+def build_book() -> OrderBook:
+    book = OrderBook()
+    for i in range(50):
+        book.add_order(Order(side="buy", quantity=10, order_type="limit", agent_id=0, price=9990 - i))
+        book.add_order(Order(side="sell", quantity=10, order_type="limit", agent_id=0, price=10010 + i))
+    return book
+
+def build_agents(size: int) -> list:
+    kinds = (LiquidityProvider, NoiseTrader, NoiseTrader, MarketTaker, MarketTaker)
+    return [kinds[i % len(kinds)](agent_id=i + 1) for i in range(size)]
+
+def per_agent(agents: list, book: OrderBook, ticks: int, rng: np.random.Generator) -> float:
+    start = time.perf_counter()
+    for _ in range(ticks):
+        random.choice(agents).act(book, rng)
+    return time.perf_counter() - start
+
+def population(agents: list, book: OrderBook, ticks: int, rng: np.random.Generator) -> float:
+    start = time.perf_counter()
+    decisions = Population(agents).draw(rng, ticks, book.grid)
+    order_at = decisions.order
+    best_bid, best_ask = book.get_best_bid, book.get_best_ask
+    for k in range(ticks):
+        order_at(k, best_bid(), best_ask())
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ticks", type=int, default=50_000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 500, 5000])
+    args = parser.parse_args()
+
+    book = build_book()
+    rng = np.random.default_rng(0)
+    print(f"{'agents':>8} {'act() ns':>10} {'population ns':>14} {'speedup':>8}")
+    for size in args.sizes:
+        agents = build_agents(size)
+        slow = per_agent(agents, book, args.ticks, rng) / args.ticks * 1e9
+        fast = population(agents, book, args.ticks, rng) / args.ticks * 1e9
+        print(f"{size:>8} {slow:>10.0f} {fast:>14.0f} {slow / fast:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
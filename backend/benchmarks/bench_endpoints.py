@@ -0,0 +1,101 @@
+"""Latency of the cursor-based history endpoints versus trade-history size.
+
+A poll that only asks for records after its cursor should cost the same
+whether the simulation has a thousand trades or millions. Cold polls follow
+a state change and build their response; cached polls repeat a request
+within one version of the state and are served from the payload cache.
+
+Run from the ``backend`` directory:
+
+    python -m benchmarks.bench_endpoints
+"""
+import argparse
+import time
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+import app
+from session import DEFAULT_SESSION, Simulation
+from simulation.candles import CandleAggregator
+from simulation.indicators import IndicatorEngine
+from simulation.trade_store import TradeStore
+
+ENDPOINTS = ("/data/trades", "/data/price-history", "/data/candlestick", "/data/indicators/sma")
+# The endpoints above that go through the payload cache (see app.cached_response).
+CACHED_ENDPOINTS = {"/data/trades", "/data/price-history", "/data/candlestick"}
+
+def synthetic_store(trades: int, seed: int) -> TradeStore:
+    """Returns a TradeStore holding ``trades`` random-walk trades."""
+    rng = np.random.default_rng(seed)
+    store = TradeStore(capacity=trades)
+    store.extend({
+        "trade_id": np.arange(1, trades + 1),
+        "price": 100.0 + np.round(np.cumsum(rng.normal(0.0, 0.01, trades)), 2),
+        "quantity": rng.integers(1, 20, trades),
+        "aggressor_order_id": np.arange(trades),
+        "resting_order_id": np.arange(trades),
+        "aggressor_agent_id": rng.integers(1, 10, trades),
+        "resting_agent_id": rng.integers(1, 10, trades),
+        "side": rng.integers(0, 2, trades).astype(np.int8),
+        "timestamp": 1.7e9 + np.arange(trades) * 1e-3,
+        "tick": np.arange(trades) // 3,
+    })
+    return store
+
+def install(store: TradeStore) -> Simulation:
+    """Points the app's default session at ``store``."""
+    session = app.sessions.get(DEFAULT_SESSION)
+    session.trade_store = store
+    session.indicators = IndicatorEngine(store)
+    session.indicators.update()
+    session.candle_aggregator = CandleAggregator(store)
+    session.candle_aggregator.update()
+    session.version += 1  # invalidates cached responses
+    return session
+
+def poll_latency(client: TestClient, path: str, params: dict, repeats: int,
+                 session: Simulation | None = None) -> float:
+    """Returns the mean latency in ms of polling ``path`` with ``params``.
+
+    With ``session``, its version is bumped before every poll, so none of
+    them is served from the payload cache.
+    """
+    start = time.perf_counter()
+    for _ in range(repeats):
+        if session is not None:
+            session.version += 1
+        response = client.get(path, params=params)
+        response.raise_for_status()
+    return (time.perf_counter() - start) * 1e3 / repeats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--new", type=int, default=100, help="records after the client's cursor")
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    client = TestClient(app.app)
+    print(f"{'trades':>10} {'polls':>6} " + " ".join(f"{path:>24}" for path in ENDPOINTS) + "   (ms per poll)")
+    for size in args.sizes:
+        session = install(synthetic_store(size, args.seed))
+        cursors = []
+        for path in ENDPOINTS:
+            if path == "/data/candlestick":
+                total = len(session.candle_aggregator.register("trades", 10).closed)
+            elif path == "/data/indicators/sma":
+                total = session.indicators.length(20)
+            else:
+                total = len(session.trade_store)
+            cursors.append(max(total - args.new, 0))
+        for polls, bumped in (("cold", session), ("cached", None)):
+            # An uncached endpoint has only one timing, shown on the cold row.
+            cells = [f"{poll_latency(client, path, {'cursor': cursor}, args.repeats, bumped):>24.2f}"
+                     if bumped is not None or path in CACHED_ENDPOINTS else f"{'-':>24}"
+                     for path, cursor in zip(ENDPOINTS, cursors)]
+            print(f"{size:>10} {polls:>6} " + " ".join(cells))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Cost of a market order sweeping the book versus the number of levels consumed.
+
+Run from the ``backend`` directory:
+
+    python -m benchmarks.bench_matching
+"""
+import argparse
+import time
+
+from simulation.matching_engine import MatchingEngine
+from simulation.models import Order
+from simulation.order_book import OrderBook
+
+def build_engine(levels: int, orders_per_level: int) -> MatchingEngine:
+    """Returns an engine whose ask side has ``levels`` levels of 10-lot orders."""
+    book = OrderBook()
+    for i in range(levels):
+        price = 10000 + i  # ticks
+        for _ in range(orders_per_level):
+            book.add_order(Order(side="sell", quantity=10, order_type="limit", agent_id=1, price=price))
+    return MatchingEngine(book)
+
+def sweep(levels: int, orders_per_level: int, materialize: bool) -> float:
+    """Times one market buy that consumes every level; returns seconds."""
+    engine = build_engine(levels, orders_per_level)
+    order = Order(side="buy", quantity=levels * orders_per_level * 10, order_type="market", agent_id=2)
+    start = time.perf_counter()
+    if materialize:
+        engine.process_order(order)
+    else:
+        engine.match(order)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--levels", type=int, nargs="+", default=[10, 100, 1_000, 10_000, 100_000])
+    parser.add_argument("--orders-per-level", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'levels':>8} {'fills':>8} {'match ms':>10} {'ns/fill':>9} {'+Trade ms':>10} {'ns/fill':>9}")
+    for levels in args.levels:
+        fills = levels * args.orders_per_level
+        raw = sweep(levels, args.orders_per_level, materialize=False)
+        full = sweep(levels, args.orders_per_level, materialize=True)
+        print(f"{levels:>8} {fills:>8} {raw * 1e3:>10.2f} {raw * 1e9 / fills:>9.0f}"
+              f" {full * 1e3:>10.2f} {full * 1e9 / fills:>9.0f}")
+
+if __name__ == "__main__":
+    main()
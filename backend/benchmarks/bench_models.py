@@ -0,0 +1,83 @@
+"""Memory and construction cost of Order/Trade records.
+
+Compares the slotted, enum-coded records in simulation.models with the
+plain dataclasses they replaced (reproduced below as ``LegacyOrder`` and
+``LegacyTrade``), and with the unchecked fast-path constructor.
+
+Run from the ``backend`` directory:
+
+    python -m benchmarks.bench_models
+"""
+import argparse
+import itertools
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+
+from simulation.models import BUY, LIMIT, Order, Trade
+
+_legacy_ids = itertools.count(1)
+
+@dataclass
+class LegacyOrder:
+    side: str
+    quantity: int
+    order_type: str
+    agent_id: int
+    price: float | None = None
+    order_id: int = field(init=False, default_factory=lambda: next(_legacy_ids))
+    timestamp: float = field(init=False, default_factory=time.time)
+
+    def __post_init__(self):
+        if self.order_type == "limit" and self.price is None:
+            raise ValueError("Limit orders must have a price.")
+        if self.order_type == "market" and self.price is not None:
+            raise ValueError("Market orders should not have a price.")
+        if self.quantity <= 0:
+            raise ValueError("Order quantity must be positive.")
+
+@dataclass
+class LegacyTrade:
+    price: float
+    quantity: int
+    aggressor_order_id: int
+    resting_order_id: int
+    aggressor_agent_id: int
+    resting_agent_id: int
+    side: str
+    trade_id: int = field(default_factory=lambda: next(_legacy_ids))
+    timestamp: float = field(default_factory=time.time)
+
+BUILDERS = {
+    "legacy Order": lambda i: LegacyOrder(side="buy", quantity=10, order_type="limit", agent_id=1, price=100.0 + i % 100),
+    "Order": lambda i: Order(side=BUY, quantity=10, order_type=LIMIT, agent_id=1, price=10000 + i % 100),
+    "Order.unchecked": lambda i: Order.unchecked(BUY, 10, LIMIT, 1, 10000 + i % 100),
+    "legacy Trade": lambda i: LegacyTrade(100.0 + i % 100, 10, i, i + 1, 1, 2, "buy"),
+    "Trade": lambda i: Trade(100.0 + i % 100, 10, i, i + 1, 1, 2, BUY),
+}
+
+def measure(build, count: int) -> tuple[float, float]:
+    """Returns (bytes per record, ns per construction) for ``count`` records."""
+    tracemalloc.start()
+    records = [build(i) for i in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+
+    start = time.perf_counter_ns()
+    records = [build(i) for i in range(count)]
+    elapsed = time.perf_counter_ns() - start
+    return size / count, elapsed / count
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"{'record':>16} {'bytes/record':>13} {'ns/record':>10}")
+    for name, build in BUILDERS.items():
+        per_record, ns = measure(build, args.count)
+        print(f"{name:>16} {per_record:>13.0f} {ns:>10.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Insert/cancel and depth-query cost of OrderBook as resting depth grows.
+
+The depth columns compare the aggregated ladder with summing every resting
+order per price, which is how /data/book/depth used to build it.
+
+Run from the ``backend`` directory:
+
+    python -m benchmarks.bench_order_book
+"""
+import argparse
+import random
+import time
+from collections import defaultdict
+
+from simulation.models import Order
+from simulation.order_book import OrderBook
+
+def build_book(depth: int, rng: random.Random) -> tuple[OrderBook, list[int]]:
+    """Fills a book with ``depth`` resting limit orders on both sides."""
+    book = OrderBook()
+    ids = []
+    for _ in range(depth):
+        if rng.random() < 0.5:
+            order = Order(side="buy", quantity=10, order_type="limit", agent_id=1,
+                          price=rng.randint(9000, 9999))
+        else:
+            order = Order(side="sell", quantity=10, order_type="limit", agent_id=1,
+                          price=rng.randint(10001, 11000))
+        book.add_order(order)
+        ids.append(order.order_id)
+    return book, ids
+
+def measure(depth: int, ops: int, seed: int) -> tuple[float, float]:
+    """Returns (insert ns/op, cancel ns/op) against a book of the given depth."""
+    rng = random.Random(seed)
+    book, ids = build_book(depth, rng)
+    new_orders = [
+        Order(side="buy", quantity=10, order_type="limit", agent_id=2,
+              price=rng.randint(9000, 9999))
+        for _ in range(ops)
+    ]
+    start = time.perf_counter_ns()
+    for order in new_orders:
+        book.add_order(order)
+    insert_ns = (time.perf_counter_ns() - start) / ops
+
+    victims = rng.sample(ids, min(ops, len(ids)))
+    start = time.perf_counter_ns()
+    for order_id in victims:
+        book.cancel_order(order_id)
+    cancel_ns = (time.perf_counter_ns() - start) / max(len(victims), 1)
+    return insert_ns, cancel_ns
+
+def measure_depth(depth: int, repeats: int, seed: int) -> tuple[float, float]:
+    """Returns (top-20 ladder us, per-order aggregation us) for a book of the given depth."""
+    book, _ = build_book(depth, random.Random(seed))
+    start = time.perf_counter_ns()
+    for _ in range(repeats):
+        book.get_depth(20)
+    ladder_us = (time.perf_counter_ns() - start) / repeats / 1e3
+
+    start = time.perf_counter_ns()
+    for _ in range(repeats):
+        for side in (book.bids, book.asks):
+            volumes = defaultdict(int)
+            for order in side:
+                volumes[order.price] += order.quantity
+            sorted(volumes.items(), reverse=side is book.bids)[:20]
+    scan_us = (time.perf_counter_ns() - start) / repeats / 1e3
+    return ladder_us, scan_us
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--depths", type=int, nargs="+", default=[100, 1_000, 10_000, 100_000])
+    parser.add_argument("--ops", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'depth':>10} {'insert ns/op':>14} {'cancel ns/op':>14} {'top-20 us':>12} {'scan us':>12}")
+    for depth in args.depths:
+        insert_ns, cancel_ns = measure(depth, args.ops, args.seed)
+        ladder_us, scan_us = measure_depth(depth, 20, args.seed)
+        print(f"{depth:>10} {insert_ns:>14.0f} {cancel_ns:>14.0f} {ladder_us:>12.1f} {scan_us:>12.1f}")
+
+if __name__ == "__main__":
+    main()
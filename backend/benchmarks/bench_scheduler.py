@@ -0,0 +1,55 @@
+"""Per-tick cost of delivering delayed orders versus the number in flight.
+
+Compares OrderScheduler with the list scan app.py used before it.
+
+Run from the ``backend`` directory:
+
+    python -m benchmarks.bench_scheduler
+"""
+import argparse
+import random
+import time
+
+from simulation.models import Order
+from simulation.scheduler import OrderScheduler
+
+def make_orders(count: int) -> list[Order]:
+    return [Order(side="buy", quantity=1, order_type="market", agent_id=1) for _ in range(count)]
+
+def run_list_scan(in_flight: int, ticks: int, rng: random.Random) -> float:
+    """Keeps ``in_flight`` orders queued, delivering due ones with two list passes per tick."""
+    queue = [(rng.randint(1, in_flight), order) for order in make_orders(in_flight)]
+    start = time.perf_counter()
+    for tick in range(ticks):
+        due = [item for item in queue if item[0] <= tick]
+        queue[:] = [item for item in queue if item[0] > tick]
+        for _, order in due:
+            queue.append((tick + in_flight, order))
+    return time.perf_counter() - start
+
+def run_scheduler(in_flight: int, ticks: int, rng: random.Random) -> float:
+    """Same workload through OrderScheduler."""
+    scheduler = OrderScheduler()
+    for order in make_orders(in_flight):
+        scheduler.schedule(rng.randint(1, in_flight), order)
+    start = time.perf_counter()
+    for tick in range(ticks):
+        for order in scheduler.pop_due(tick):
+            scheduler.schedule(tick + in_flight, order)
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--in-flight", type=int, nargs="+", default=[10, 100, 1_000, 10_000])
+    parser.add_argument("--ticks", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'in flight':>10} {'list scan us/tick':>18} {'scheduler us/tick':>18}")
+    for in_flight in args.in_flight:
+        scan = run_list_scan(in_flight, args.ticks, random.Random(args.seed))
+        heap = run_scheduler(in_flight, args.ticks, random.Random(args.seed))
+        print(f"{in_flight:>10} {scan * 1e6 / args.ticks:>18.1f} {heap * 1e6 / args.ticks:>18.1f}")
+
+if __name__ == "__main__":
+    main()
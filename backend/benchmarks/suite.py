@@ -0,0 +1,238 @@
+"""The benchmark suite for the simulator core, with regression tracking.
+
+Runs four groups of seeded, deterministic workloads and records one result
+per measurement:
+
+- ``book``: insert, cancel and full-book sweep cost at resting depths from
+  10^2 to 10^6 orders;
+- ``engine``: end-to-end ticks/sec of the headless engine for each agent mix;
+- ``endpoints``: latency of the candlestick, bbands, depth and interactions
+  endpoints versus trade-history size; endpoints served from the payload
+  cache are timed for cold polls after a state change and for cached polls
+  repeated within one state version;
+- ``memory``: bytes per resting order and per stored trade.
+
+Timings are the best of ``--repeats`` runs. ``--output`` writes the results
+to JSON; ``--baseline`` compares them with a saved run, prints the change
+of every result and exits with status 1 when any got worse by more than
+``--threshold``.
+
+Run from the ``backend`` directory:
+
+    python -m benchmarks.suite --output baseline.json
+    python -m benchmarks.suite --baseline baseline.json --threshold 0.1
+    python -m benchmarks.suite --quick --only book engine
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks import bench_endpoints, bench_matching, bench_order_book
+from simulation.accounting import Ledger
+from simulation.engine import SimulationEngine, build_agents
+from simulation.trade_store import TradeStore
+
+GROUPS = ("book", "engine", "endpoints", "memory")
+
+BOOK_DEPTHS = (100, 1_000, 10_000, 100_000, 1_000_000)
+HISTORY_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+MIXES = {
+    "default": {"LiquidityProvider": 1, "NoiseTrader": 2, "MarketTaker": 2},
+    "noise": {"LiquidityProvider": 1, "NoiseTrader": 9},
+    "makers": {"LiquidityProvider": 8, "NoiseTrader": 1, "MarketTaker": 1},
+    "takers": {"LiquidityProvider": 2, "MarketTaker": 8},
+    "crowd": {"LiquidityProvider": 100, "NoiseTrader": 400, "MarketTaker": 500},
+}
+ENDPOINTS = {
+    "candlestick": "/data/candlestick",
+    "bbands": "/data/indicators/bbands",
+    "depth": "/data/book/depth",
+    "interactions": "/data/agent-interactions",
+}
+# The endpoints above that go through the payload cache (see app.cached_response).
+CACHED_ENDPOINTS = {"candlestick"}
+
+def result(group: str, name: str, value: float, unit: str, higher_is_better: bool = False, **params) -> dict:
+    return {"group": group, "name": name, "params": params, "value": value, "unit": unit,
+            "higher_is_better": higher_is_better}
+
+def result_key(entry: dict) -> str:
+    params = ",".join(f"{name}={value}" for name, value in sorted(entry["params"].items()))
+    return f"{entry['group']}.{entry['name']}[{params}]"
+
+def best_of(repeats: int, measure) -> float:
+    return min(measure() for _ in range(repeats))
+
+def bench_book(depths: list[int], ops: int, seed: int, repeats: int) -> list[dict]:
+    results = []
+    for depth in depths:
+        timings = [bench_order_book.measure(depth, ops, seed) for _ in range(repeats)]
+        results.append(result("book", "insert", min(t[0] for t in timings), "ns/op", depth=depth))
+        results.append(result("book", "cancel", min(t[1] for t in timings), "ns/op", depth=depth))
+        # A market order consuming the whole ask side, four orders per level.
+        levels = max(depth // 4, 1)
+        seconds = best_of(repeats, lambda: bench_matching.sweep(levels, 4, materialize=False))
+        results.append(result("book", "sweep", seconds * 1e9 / (levels * 4), "ns/fill", depth=depth))
+    return results
+
+def bench_engine(ticks: int, seed: int, repeats: int) -> list[dict]:
+    results = []
+    for mix, counts in MIXES.items():
+        rate = max(SimulationEngine(build_agents(counts), seed=seed).run(ticks).ticks_per_sec
+                   for _ in range(repeats))
+        results.append(result("engine", "ticks_per_sec", rate, "ticks/s", higher_is_better=True, mix=mix))
+    return results
+
+def install_history(size: int, seed: int):
+    """Gives the app's default session ``size`` synthetic trades, a settled ledger and a resting book."""
+    session = bench_endpoints.install(bench_endpoints.synthetic_store(size, seed))
+    session.ledger = Ledger()
+    session.ledger.apply(session.trade_store)
+    session.order_book, _ = bench_order_book.build_book(1_000, random.Random(seed))
+    return session
+
+def bench_endpoints_latency(sizes: list[int], new: int, seed: int, repeats: int) -> list[dict]:
+    client = bench_endpoints.TestClient(bench_endpoints.app.app)
+    results = []
+    for size in sizes:
+        session = install_history(size, seed)
+        # The paged endpoints are polled the way the dashboard does: from a
+        # cursor ``new`` records before the end of the series.
+        cursors = {
+            "candlestick": len(session.candle_aggregator.register("trades", 10).closed) - new,
+            "bbands": session.indicators.length(20) - new,
+        }
+        for name, path in ENDPOINTS.items():
+            params = {"cursor": max(cursors[name], 0)} if name in cursors else {}
+            if name not in CACHED_ENDPOINTS:
+                latency = best_of(repeats, lambda: bench_endpoints.poll_latency(client, path, params, 20))
+                results.append(result("endpoints", name, latency, "ms", trades=size))
+                continue
+            for polls, bumped in (("cold", session), ("cached", None)):
+                latency = best_of(repeats, lambda: bench_endpoints.poll_latency(client, path, params, 20, bumped))
+                results.append(result("endpoints", name, latency, "ms", trades=size, polls=polls))
+    return results
+
+def traced_bytes(build) -> int:
+    """Returns the memory still allocated by ``build()`` once it returns."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return size
+
+def fill_store(count: int, seed: int) -> TradeStore:
+    """Appends ``count`` trades to a TradeStore in blocks, as a running simulation does."""
+    rng = np.random.default_rng(seed)
+    store = TradeStore()
+    for start in range(0, count, 1_000):
+        n = min(1_000, count - start)
+        store.extend({
+            "trade_id": np.arange(start, start + n), "price": 100.0 + rng.random(n),
+            "quantity": rng.integers(1, 20, n), "aggressor_order_id": np.arange(n),
+            "resting_order_id": np.arange(n), "aggressor_agent_id": rng.integers(1, 10, n),
+            "resting_agent_id": rng.integers(1, 10, n), "side": rng.integers(0, 2, n).astype(np.int8),
+            "timestamp": np.full(n, 1.7e9), "tick": np.arange(start, start + n),
+        })
+    return store
+
+def bench_memory(depths: list[int], sizes: list[int], seed: int) -> list[dict]:
+    # Totals include preallocated capacity, so small sizes show the amortized cost.
+    results = []
+    for depth in depths:
+        size = traced_bytes(lambda: bench_order_book.build_book(depth, random.Random(seed)))
+        results.append(result("memory", "resting_order", size / depth, "bytes", depth=depth))
+    for count in sizes:
+        size = traced_bytes(lambda: fill_store(count, seed))
+        results.append(result("memory", "trade", size / count, "bytes", trades=count))
+    return results
+
+def run(args) -> dict:
+    depths = [d for d in BOOK_DEPTHS if d <= 10_000] if args.quick else list(BOOK_DEPTHS)
+    sizes = [s for s in HISTORY_SIZES if s <= 100_000] if args.quick else list(HISTORY_SIZES)
+    ticks = 20_000 if args.quick else 200_000
+    results = []
+    for group in args.only:
+        started = time.perf_counter()
+        if group == "book":
+            results += bench_book(depths, args.ops, args.seed, args.repeats)
+        elif group == "engine":
+            results += bench_engine(ticks, args.seed, args.repeats)
+        elif group == "endpoints":
+            results += bench_endpoints_latency(sizes, 100, args.seed, args.repeats)
+        else:
+            results += bench_memory(depths, sizes, args.seed)
+        print(f"# {group}: {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+            "numpy": np.__version__, "machine": platform.machine(), "seed": args.seed, "quick": args.quick,
+        },
+        "results": results,
+    }
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Prints every result next to its baseline and returns the keys that regressed beyond ``threshold``."""
+    previous = {result_key(entry): entry for entry in baseline["results"]}
+    regressions = []
+    print(f"{'benchmark':<48} {'baseline':>12} {'current':>12} {'change':>8}")
+    for entry in current["results"]:
+        key = result_key(entry)
+        old = previous.get(key)
+        if old is None or not old["value"]:
+            print(f"{key:<48} {'-':>12} {entry['value']:>12.4g}")
+            continue
+        change = (entry["value"] - old["value"]) / old["value"]
+        worse = -change if entry["higher_is_better"] else change
+        flag = ""
+        if worse > threshold:
+            regressions.append(key)
+            flag = "  REGRESSION"
+        print(f"{key:<48} {old['value']:>12.4g} {entry['value']:>12.4g} {change:>+8.1%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=GROUPS, default=list(GROUPS))
+    parser.add_argument("--quick", action="store_true", help="smaller depths, histories and runs")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--ops", type=int, default=10_000, help="inserts and cancels per book depth")
+    parser.add_argument("--repeats", type=int, default=3, help="timings keep the best of this many runs")
+    parser.add_argument("--output", default=None, help="write the results to this JSON file")
+    parser.add_argument("--results", default=None, help="compare this results file instead of running")
+    parser.add_argument("--baseline", default=None, help="compare with the results saved in this file")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative slowdown (or growth) that counts as a regression")
+    args = parser.parse_args()
+    if args.repeats < 1 or args.threshold < 0:
+        parser.error("--repeats must be positive and --threshold non-negative.")
+
+    if args.results:
+        with open(args.results) as f:
+            current = json.load(f)
+    else:
+        current = run(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}.")
+            sys.exit(1)
+    elif not args.output:
+        for entry in current["results"]:
+            print(f"{result_key(entry):<48} {entry['value']:>12.4g} {entry['unit']}")
+
+if __name__ == "__main__":
+    main()
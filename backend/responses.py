@@ -0,0 +1,65 @@
+"""Response bodies for the high-volume endpoints, encoded once per simulation version.
+
+Payloads are encoded as JSON (through orjson when it is installed) or as
+msgpack when the client asks for it with ``format=msgpack``. A session's
+``PayloadCache`` keeps the encoded bodies until its version changes, so
+dashboards polling between steps are served bytes from memory.
+"""
+import json
+from collections import OrderedDict
+from typing import Any, Callable
+
+try:
+    import orjson
+except ImportError:  # the standard library encoder is the fallback
+    orjson = None
+
+from simulation.metrics import METRICS
+
+RESPONSE_FORMATS = ("json", "msgpack")
+MEDIA_TYPES = {"json": "application/json", "msgpack": "application/msgpack"}
+
+def encode_json(payload: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+def encode_msgpack(payload: Any) -> bytes:
+    try:
+        import msgpack
+    except ImportError:
+        raise RuntimeError("msgpack responses need msgpack; install it with `pip install msgpack`.") from None
+    return msgpack.packb(payload)
+
+ENCODERS: dict[str, Callable[[Any], bytes]] = {"json": encode_json, "msgpack": encode_msgpack}
+
+CACHE_HITS = METRICS.counter("mms_payload_cache_hits_total", "Responses served from the payload cache.")
+CACHE_MISSES = METRICS.counter("mms_payload_cache_misses_total", "Responses built and encoded.")
+
+class PayloadCache:
+    """Encoded bodies by request key, valid for one version of a session's state.
+
+    The first lookup for a newer version drops every older body. Within a
+    version at most ``max_entries`` bodies are kept, oldest dropped first.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.version = None
+        self._bodies: OrderedDict[tuple, bytes] = OrderedDict()
+
+    def get(self, version: int, key: tuple, format: str, build: Callable[[], Any]) -> bytes:
+        """Returns the body for ``key`` in ``format``, building and encoding the payload on a miss."""
+        if version != self.version:
+            self._bodies.clear()
+            self.version = version
+        body = self._bodies.get((key, format))
+        if body is not None:
+            CACHE_HITS.inc()
+            return body
+        CACHE_MISSES.inc()
+        body = ENCODERS[format](build())
+        self._bodies[(key, format)] = body
+        if len(self._bodies) > self.max_entries:
+            self._bodies.popitem(last=False)
+        return body
@@ -0,0 +1,387 @@
+import glob
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+from simulation.accounting import Ledger
+from simulation.agents import AGENT_TYPES, RESERVED_PARAMS, Agent, LiquidityProvider, MarketTaker, NoiseTrader
+from simulation.candles import CandleAggregator, CandleSeries
+from simulation.depth_history import DepthHistory
+from simulation.export import HistoryView
+from simulation.indicators import IndicatorEngine
+from simulation.journal import JournalWriter, replay
+from simulation.matching_engine import MatchingEngine
+from simulation.metrics import METRICS, phase_histogram
+from simulation.models import LIMIT, Order
+from simulation.order_book import OrderBook
+from simulation.population import Population
+from simulation.scheduler import OrderScheduler
+from simulation.trade_store import TradeStore
+from responses import PayloadCache
+from streaming import EventHub
+
+DEFAULT_SESSION = "default"
+
+# Step phases, observed once per tick that has work for them; "book_insert" is
+# the resting of limit order remainders, and "book_cancel" the API's cancels.
+AGENT_TIME = phase_histogram("agent")
+SCHEDULER_TIME = phase_histogram("scheduler")
+MATCH_TIME = phase_histogram("match")
+ACCOUNTING_TIME = phase_histogram("accounting")
+ANALYTICS_TIME = phase_histogram("analytics")
+BOOK_INSERT_TIME = phase_histogram("book_insert")
+BOOK_CANCEL_TIME = phase_histogram("book_cancel")
+SERIALIZE_TIME = phase_histogram("serialize")
+STEPS = METRICS.counter("mms_steps_total", "Step requests run.")
+TICKS = METRICS.counter("mms_ticks_total", "Simulation ticks run.")
+ORDERS = METRICS.counter("mms_orders_total", "Orders sent by agents.")
+FILLS = METRICS.counter("mms_fills_total", "Fills executed.")
+
+class Simulation:
+    """One independent market behind the API: book, agents, history and stream.
+
+    Every method that touches the market must be called while holding
+    ``lock``; ``SessionRegistry`` hands sessions out to the endpoints and
+    the endpoints take the lock around each request.
+
+    ``version`` counts the changes to the market; responses rendered from
+    it are cached in ``payloads`` until it changes.
+
+    With a ``journal_dir`` every run (from one reset to the next) is
+    journaled to its own file there, snapshotted every ``snapshot_every``
+    ticks, and can be picked up again with ``resume()``.
+    """
+
+    def __init__(self, session_id: str, journal_dir: str | None = None, snapshot_every: int = 100_000):
+        self.session_id = session_id
+        self.journal_dir = journal_dir
+        self.snapshot_every = snapshot_every
+        self.journal: JournalWriter | None = None
+        self.lock = threading.Lock()
+        self.hub = EventHub()
+        self.last_used = time.monotonic()
+        self.version = 0
+        self.payloads = PayloadCache()
+        self.reset()
+
+    def reset(self):
+        self._close_journal()
+        self.version += 1
+        self.current_tick = 0
+        self.rng = np.random.default_rng()
+        self.order_queue = OrderScheduler()
+        self.order_book = OrderBook()
+        self.hub.resync_depth()
+        self.matching_engine = MatchingEngine(self.order_book)
+        self.trade_store = TradeStore()
+        self.indicators = IndicatorEngine(self.trade_store)
+        self.candle_aggregator = CandleAggregator(self.trade_store)
+        self.depth_history = DepthHistory()
+        self.agents: list[Agent] = [
+            LiquidityProvider(agent_id=1),
+            NoiseTrader(agent_id=2),
+            MarketTaker(agent_id=3),
+        ]
+        self._population: Population | None = None
+        self.ledger = Ledger()
+        for agent in self.agents:
+            self.ledger.open(agent.agent_id)
+        if self.journal_dir is not None:
+            path = os.path.join(self.journal_dir, f"{self.session_id}.{time.time_ns()}.journal")
+            self.journal = JournalWriter(path, self.order_book.grid.tick_size)
+            for agent in self.agents:
+                self.journal.agent_added(-1, agent)
+            self.journal.flush()
+            self._next_snapshot = self.snapshot_every
+
+    def resume(self, path: str):
+        """Replaces the market with the one recorded in the journal at ``path`` and keeps journaling to it."""
+        state = replay(path)
+        self._close_journal()
+        self.version += 1
+        self.current_tick = state.tick
+        self.order_queue = state.scheduler
+        self.order_book = state.order_book
+        self.hub.resync_depth()
+        self.matching_engine = state.matching_engine
+        self.trade_store = state.trade_store
+        self.indicators = IndicatorEngine(self.trade_store)
+        self.indicators.update()
+        self.candle_aggregator = CandleAggregator(self.trade_store)
+        self.candle_aggregator.update()
+        self.depth_history = DepthHistory()
+        self.agents = state.agents
+        self._population = None
+        self.ledger = state.ledger
+        self.journal = JournalWriter(path, self.order_book.grid.tick_size, append=True)
+        self._next_snapshot = self.current_tick + self.snapshot_every
+
+    def close(self):
+        """Flushes and closes the session's journal; call it when dropping the session."""
+        self._close_journal()
+
+    def _close_journal(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
+    def step(self, count: int) -> list[Order]:
+        """Runs ``count`` ticks and returns the orders the agents queued."""
+        self.version += 1
+        trades_start = len(self.trade_store)
+        newly_queued_orders = []
+        fills = self.matching_engine.fills
+        perf_counter = time.perf_counter
+        decisions = None
+        if self.agents and count > 0:
+            started = perf_counter()
+            if self._population is None:
+                self._population = Population(self.agents)
+            decisions = self._population.draw(self.rng, count, self.order_book.grid)
+            AGENT_TIME.observe(perf_counter() - started)
+        for k in range(count):
+            started = perf_counter()
+            due = self.order_queue.pop_due(self.current_tick)
+            SCHEDULER_TIME.observe(perf_counter() - started)
+            if due:
+                match_time = insert_time = 0.0
+                for order in due:
+                    started = perf_counter()
+                    self.matching_engine.match(order, rest=False)
+                    matched = perf_counter()
+                    match_time += matched - started
+                    if order.order_type is LIMIT and order.quantity > 0:
+                        self.order_book.add_order(order)
+                        insert_time += perf_counter() - matched
+                MATCH_TIME.observe(match_time)
+                BOOK_INSERT_TIME.observe(insert_time)
+            if fills.size:
+                started = perf_counter()
+                FILLS.inc(fills.size)
+                self.ledger.apply(fills)
+                self.trade_store.append_fills(fills, self.current_tick)
+                fills.clear()
+                ACCOUNTING_TIME.observe(perf_counter() - started)
+            if decisions is not None:
+                started = perf_counter()
+                new_order = decisions.order(k, self.order_book.get_best_bid(), self.order_book.get_best_ask())
+                AGENT_TIME.observe(perf_counter() - started)
+                if new_order:
+                    latency = decisions.latency[k]
+                    started = perf_counter()
+                    self.order_queue.schedule(self.current_tick + latency, new_order)
+                    SCHEDULER_TIME.observe(perf_counter() - started)
+                    newly_queued_orders.append(new_order)
+                    if self.journal is not None:
+                        self.journal.submit(self.current_tick, new_order, latency)
+            if self.current_tick % self.depth_history.every == 0:
+                self.depth_history.sample(self.current_tick, self.order_book)
+            self.current_tick += 1
+        started = perf_counter()
+        self.indicators.update()
+        self.candle_aggregator.update()
+        ANALYTICS_TIME.observe(perf_counter() - started)
+        STEPS.inc()
+        TICKS.inc(count)
+        ORDERS.inc(len(newly_queued_orders))
+        if self.journal is not None:
+            self.journal.trades(self.trade_store, trades_start)
+            self.journal.clock(self.current_tick - 1)
+            if self.current_tick >= self._next_snapshot:
+                self.journal.snapshot(self.current_tick, self.order_book, self.order_queue, self.ledger,
+                                      self.agents, self.matching_engine.next_trade_id)
+                self._next_snapshot = self.current_tick + self.snapshot_every
+            else:
+                self.journal.flush()
+        if self.hub.clients:
+            with SERIALIZE_TIME.time():
+                update = self.stream_update(trades_start)
+            self.publish(update)
+        return newly_queued_orders
+
+    def add_agents(self, agent_type: str, count: int, params: dict[str, float] | None = None) -> bool:
+        """Adds ``count`` agents of ``agent_type``; returns False for an unknown type.
+
+        ``params`` overrides the type's default parameters (and may set
+        ``latency``); unknown, reserved or out-of-range ones raise ``ValueError``.
+        """
+        agent_class = AGENT_TYPES.get(agent_type)
+        if agent_class is None:
+            return False
+        reserved = (params or {}).keys() & RESERVED_PARAMS
+        if reserved:
+            raise ValueError(f"Reserved parameters: {', '.join(sorted(reserved))}")
+        last_id = max([agent.agent_id for agent in self.agents]) if self.agents else 0
+        agents = [agent_class(agent_id=last_id + i + 1, **(params or {})) for i in range(count)]
+        self.version += 1
+        self._population = None
+        for agent in agents:
+            self.agents.append(agent)
+            self.ledger.open(agent.agent_id)
+            if self.journal is not None:
+                self.journal.agent_added(self.current_tick - 1, agent)
+        if self.journal is not None:
+            self.journal.flush()
+        return True
+
+    def remove_agent(self, agent_id: int) -> bool:
+        initial_agent_count = len(self.agents)
+        self.agents = [agent for agent in self.agents if agent.agent_id != agent_id]
+        self.version += 1
+        self._population = None
+        self.ledger.close(agent_id)
+        removed = len(self.agents) != initial_agent_count
+        if removed and self.journal is not None:
+            self.journal.agent_removed(self.current_tick - 1, agent_id)
+            self.journal.flush()
+        return removed
+
+    def cancel_order(self, order_id: int) -> str | None:
+        """Cancels a resting or queued order; returns where it was found."""
+        started = time.perf_counter()
+        cancelled = self.order_book.cancel_order(order_id)
+        BOOK_CANCEL_TIME.observe(time.perf_counter() - started)
+        if cancelled:
+            found = "book"
+        elif self.order_queue.cancel(order_id):
+            found = "queue"
+        else:
+            return None
+        self.version += 1
+        if self.journal is not None:
+            self.journal.cancel(self.current_tick - 1, order_id)
+            self.journal.flush()
+        return found
+
+    def market_metrics(self) -> dict:
+        return {
+            "total_volume": self.indicators.total_volume,
+            "volatility": self.indicators.volatility,
+            "trade_count": len(self.trade_store)
+        }
+
+    def pnl(self) -> list[dict]:
+        last_trade_price = self.trade_store.last_price or 100.0
+        pnl_data = []
+        for agent in self.agents:
+            account = self.ledger.accounts[agent.agent_id]
+            portfolio_value = account.cash + account.shares * last_trade_price
+            pnl_data.append({
+                "agent_id": agent.agent_id, "type": type(agent).__name__,
+                "portfolio": {"cash": account.cash, "shares": account.shares},
+                "portfolio_value": portfolio_value, "pnl": portfolio_value - self.ledger.initial_cash,
+                "realized_pnl": account.realized_pnl, "unrealized_pnl": account.unrealized_pnl(last_trade_price),
+                "volume": account.volume,
+            })
+        return pnl_data
+
+    def book_depth(self, levels: int | None = None) -> dict:
+        return self.order_book.get_depth(levels)
+
+    def agent_interactions(self) -> dict:
+        nodes = [{"id": agent.agent_id, "type": type(agent).__name__} for agent in self.agents]
+        return {"nodes": nodes, "links": self.ledger.interactions()}
+
+    def history_view(self, candles: CandleSeries | None = None) -> HistoryView:
+        """Captures the history so far for export; ``candles`` picks the candle timeframe."""
+        return HistoryView.capture(self.trade_store, self.order_book.grid, candles,
+                                   self.depth_history, self.ledger.initial_cash)
+
+    def publish(self, update: dict, clients: list | None = None):
+        """Offers ``update`` to the stream clients, each with the depth changes it has not been sent."""
+        self.hub.publish(update, self.order_book.get_depth_changes, clients)
+
+    def stream_update(self, trades_start: int) -> dict:
+        """Builds one update for the event stream; computed once and shared by all clients.
+
+        Depth is added per client by ``publish``.
+        """
+        return {
+            "tick": self.current_tick,
+            "trades": self.trade_store.to_records(trades_start),
+            "trades_cursor": len(self.trade_store),
+            "pnl": self.pnl(),
+            "metrics": self.market_metrics(),
+            "interactions": self.agent_interactions(),
+        }
+
+class SessionRegistry:
+    """Simulations keyed by session id, evicted when idle or over capacity.
+
+    A session idle for longer than ``ttl`` seconds is dropped, and once there
+    are more than ``max_sessions`` the least recently used ones go first.
+    The default session backs the unprefixed routes and is never evicted.
+    Sessions with connected stream clients are kept as well.
+
+    With a ``journal_dir`` sessions journal their runs there, and the
+    default session resumes from its latest journal when it is created.
+    """
+
+    def __init__(self, max_sessions: int = 32, ttl: float = 3600.0, journal_dir: str | None = None):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.journal_dir = journal_dir
+        if journal_dir is not None:
+            os.makedirs(journal_dir, exist_ok=True)
+        self._sessions: OrderedDict[str, Simulation] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self) -> Simulation:
+        with self._lock:
+            session = Simulation(uuid.uuid4().hex, self.journal_dir)
+            self._sessions[session.session_id] = session
+            self._evict()
+            return session
+
+    def get(self, session_id: str) -> Simulation | None:
+        """Returns the session and marks it as used; the default session is created on demand."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                if session_id != DEFAULT_SESSION:
+                    return None
+                session = self._sessions[session_id] = self._open_default()
+            session.last_used = time.monotonic()
+            self._sessions.move_to_end(session_id)
+            self._evict()
+            return session
+
+    def remove(self, session_id: str) -> bool:
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is None:
+                return False
+            with session.lock:
+                session.close()
+            return True
+
+    def _open_default(self) -> Simulation:
+        journals = []
+        if self.journal_dir is not None:
+            journals = sorted(glob.glob(os.path.join(glob.escape(self.journal_dir), f"{DEFAULT_SESSION}.*.journal")))
+        if not journals:
+            return Simulation(DEFAULT_SESSION, self.journal_dir)
+        # Built without the directory, so no new journal is started before resuming the latest one.
+        session = Simulation(DEFAULT_SESSION)
+        session.journal_dir = self.journal_dir
+        session.resume(journals[-1])
+        return session
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _evict(self):
+        expires = time.monotonic() - self.ttl
+        excess = len(self._sessions) - self.max_sessions
+        for session_id, session in list(self._sessions.items()):
+            if session_id == DEFAULT_SESSION or session.hub.clients:
+                continue
+            if excess > 0 or session.last_used < expires:
+                del self._sessions[session_id]
+                with session.lock:
+                    session.close()
+                excess -= 1
@@ -0,0 +1,87 @@
+from .fills import SIDE_BUY, FillBuffer
+
+INITIAL_CASH = 100000.0
+
+class Account:
+    """Cash, position and PnL of one agent, valued at average cost."""
+
+    __slots__ = ("cash", "shares", "avg_price", "realized_pnl", "volume")
+
+    def __init__(self, cash: float = INITIAL_CASH):
+        self.cash = cash
+        self.shares = 0
+        self.avg_price = 0.0  # average entry price of the open position
+        self.realized_pnl = 0.0
+        self.volume = 0
+
+    def trade(self, price: float, quantity: int):
+        """Books a fill: a positive ``quantity`` buys, a negative one sells."""
+        self.cash -= price * quantity
+        self.volume += abs(quantity)
+        shares = self.shares
+        if shares == 0 or (shares > 0) == (quantity > 0):
+            self.avg_price = (self.avg_price * shares + price * quantity) / (shares + quantity)
+        else:
+            closed = min(abs(quantity), abs(shares))
+            self.realized_pnl += (price - self.avg_price) * closed * (1 if shares > 0 else -1)
+            if abs(quantity) > abs(shares):
+                self.avg_price = price
+            elif abs(quantity) == abs(shares):
+                self.avg_price = 0.0
+        self.shares = shares + quantity
+
+    def unrealized_pnl(self, mark: float) -> float:
+        return (mark - self.avg_price) * self.shares
+
+class Ledger:
+    """Per-agent accounts and pairwise traded volume, updated fill by fill.
+
+    Each fill costs O(1), so reading PnL is O(agents) and reading the
+    interaction graph is O(edges) however long the trade history grows.
+    A fill is only settled when both agents still have an account, while
+    the interaction between them is always counted.
+    """
+
+    def __init__(self, initial_cash: float = INITIAL_CASH):
+        self.initial_cash = initial_cash
+        self.accounts: dict[int, Account] = {}
+        self.links: dict[tuple[int, int], int] = {}  # (lower id, higher id) -> volume
+
+    def open(self, agent_id: int) -> Account:
+        account = self.accounts.get(agent_id)
+        if account is None:
+            account = self.accounts[agent_id] = Account(self.initial_cash)
+        return account
+
+    def close(self, agent_id: int):
+        self.accounts.pop(agent_id, None)
+
+    def apply(self, fills: FillBuffer):
+        """Settles every fill in ``fills`` and adds it to the interaction graph."""
+        accounts = self.accounts
+        links = self.links
+        rows = zip(
+            fills.column("price").tolist(), fills.column("quantity").tolist(),
+            fills.column("aggressor_agent_id").tolist(), fills.column("resting_agent_id").tolist(),
+            fills.column("side").tolist(),
+        )
+        for price, quantity, aggressor_agent_id, resting_agent_id, side in rows:
+            aggressor = accounts.get(aggressor_agent_id)
+            resting = accounts.get(resting_agent_id)
+            if aggressor is not None and resting is not None:
+                signed = quantity if side == SIDE_BUY else -quantity
+                aggressor.trade(price, signed)
+                resting.trade(price, -signed)
+            if aggressor_agent_id != resting_agent_id:
+                if aggressor_agent_id < resting_agent_id:
+                    pair = (aggressor_agent_id, resting_agent_id)
+                else:
+                    pair = (resting_agent_id, aggressor_agent_id)
+                links[pair] = links.get(pair, 0) + quantity
+
+    def interactions(self) -> list[dict]:
+        """Returns one link per pair of agents that traded, with their total volume."""
+        return [
+            {"source": source, "target": target, "value": value}
+            for (source, target), value in sorted(self.links.items())
+        ]
@@ -1,70 +1,169 @@
 import abc
-import random
-from .models import Order
+import numpy as np
+from .models import BUY, LIMIT, MARKET, SELL, Order
 from .order_book import OrderBook
 
+AGENT_TYPES: dict[str, type["Agent"]] = {}
+
+_default_rng = np.random.default_rng()
+
+# Constructor arguments that cannot be given as strategy parameters.
+RESERVED_PARAMS = frozenset({"agent_id", "symbols"})
+
+def register_agent_type(agent_class: type["Agent"]) -> type["Agent"]:
+    """Class decorator that makes an agent type available by name (API, CLI, journals)."""
+    AGENT_TYPES[agent_class.__name__] = agent_class
+    return agent_class
+
 class Agent(abc.ABC):
-    """An abstract base class for all trading agents."""
-    def __init__(self, agent_id: int, latency: int = 1):
+    """An abstract base class for all trading agents.
+
+    An agent is only an id, a latency and its strategy parameters; the
+    decisions are made by the agent's class for a whole cohort at once.
+    ``decide`` receives one NumPy array per parameter, holding the
+    parameters of the agent behind each decision, and returns these
+    columns of equal length:
+
+    - ``acts``, ``is_buy``, ``is_limit`` (bool) and ``quantity`` (int);
+    - ``scale``, ``offset`` and ``fallback``, which price a limit order from
+      the market at the tick it is sent: ``round(reference * scale) + offset``
+      ticks, where the reference is the best bid for a buy and the best ask
+      for a sell, or the ``fallback`` price while that side is empty.
+
+    ``Population`` (simulation/population.py) gathers the parameters and
+    turns decisions into orders. On a multi-symbol exchange an agent sends
+    each of its orders to every symbol in ``symbols`` (None for all of them).
+    """
+    latency: int = 1
+    defaults: dict[str, float] = {}
+
+    def __init__(self, agent_id: int, latency: int | None = None, symbols: tuple[str, ...] | None = None,
+                 **params: float):
+        unknown = params.keys() - self.defaults.keys()
+        if unknown:
+            raise ValueError(f"Unknown parameters for {type(self).__name__}: {', '.join(sorted(unknown))}")
+        if latency is not None:
+            if not (latency >= 0 and latency == int(latency)):
+                raise ValueError("Latency must be a non-negative whole number of ticks.")
+            latency = int(latency)
         self.agent_id = agent_id
-        self.latency = latency
-        self.portfolio = {'cash': 100000.0, 'shares': 0}
+        self.latency = type(self).latency if latency is None else latency
+        self.symbols = tuple(symbols) if symbols is not None else None
+        self.params = {**self.defaults, **params}
+        self.validate(self.params)
+
+    @classmethod
+    def validate(cls, params: dict[str, float]):
+        """Raises ``ValueError`` if a parameter is out of range for this type."""
+        pass
 
+    @classmethod
     @abc.abstractmethod
-    def act(self, order_book: OrderBook) -> Order | None:
-        """The agent's logic to decide what order to place, if any."""
+    def decide(cls, rng: np.random.Generator, n: int, params: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        """Draws ``n`` decisions for agents of this type."""
         pass
 
+    def act(self, order_book: OrderBook, rng: np.random.Generator | None = None) -> Order | None:
+        """Makes one decision for this agent alone, against the book as it is now."""
+        drawn = self.decide(rng or _default_rng, 1, {name: np.array([value]) for name, value in self.params.items()})
+        if not drawn["acts"][0]:
+            return None
+        is_buy = bool(drawn["is_buy"][0])
+        side = BUY if is_buy else SELL
+        quantity = int(drawn["quantity"][0])
+        if not drawn["is_limit"][0]:
+            return Order(side=side, quantity=quantity, order_type=MARKET, agent_id=self.agent_id)
+        reference = order_book.get_best_bid() if is_buy else order_book.get_best_ask()
+        reference = reference or order_book.grid.to_ticks(float(drawn["fallback"][0]))
+        price = round(reference * float(drawn["scale"][0])) + int(drawn["offset"][0])
+        return Order(side=side, quantity=quantity, order_type=LIMIT, agent_id=self.agent_id, price=price)
+
+def _check_probability(params: dict[str, float], name: str):
+    if not 0 <= params[name] <= 1:
+        raise ValueError(f"{name} must be between 0 and 1.")
+
+def _check_quantity(params: dict[str, float], name: str):
+    if not (params[name] >= 1 and params[name] == int(params[name])):
+        raise ValueError(f"{name} must be a positive whole number.")
+
+@register_agent_type
 class NoiseTrader(Agent):
     """A trader that places random orders to create market noise."""
-    def __init__(self, agent_id: int):
-        super().__init__(agent_id, latency=5)
+    latency = 5
+    defaults = {"act_probability": 0.5, "limit_probability": 0.5, "max_quantity": 10, "band": 0.05}
 
-    def act(self, order_book: OrderBook) -> Order | None:
-        if random.random() < 0.5:
-            return None
-        side = random.choice(["buy", "sell"])
-        quantity = random.randint(1, 10)
-        order_type = random.choice(["market", "limit"])
-        price = None
-        if order_type == "limit":
-            best_bid = order_book.get_best_bid() or 100
-            best_ask = order_book.get_best_ask() or 100
-            if side == "buy":
-                price = round(random.uniform(best_bid * 0.95, best_bid * 1.05), 2)
-            else:
-                price = round(random.uniform(best_ask * 0.95, best_ask * 1.05), 2)
-        return Order(
-            agent_id=self.agent_id, side=side, quantity=quantity, order_type=order_type, price=price
-        )
+    @classmethod
+    def validate(cls, params: dict[str, float]):
+        _check_probability(params, "act_probability")
+        _check_probability(params, "limit_probability")
+        _check_quantity(params, "max_quantity")
+        if not 0 <= params["band"] < 1:
+            raise ValueError("band must be at least 0 and below 1.")
 
+    @classmethod
+    def decide(cls, rng: np.random.Generator, n: int, params: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        # Limit prices are uniform within ``band`` of the best price on the order's side.
+        band = params["band"]
+        return {
+            "acts": rng.random(n) < params["act_probability"],
+            "is_buy": rng.random(n) < 0.5,
+            "quantity": np.floor(rng.random(n) * params["max_quantity"]).astype(np.int64) + 1,
+            "is_limit": rng.random(n) < params["limit_probability"],
+            "scale": 1 - band + 2 * band * rng.random(n),
+            "offset": np.zeros(n, dtype=np.int64),
+            "fallback": np.full(n, 100.0),
+        }
+
+@register_agent_type
 class MarketTaker(Agent):
     """An agent that only takes liquidity by placing market orders."""
-    def __init__(self, agent_id: int):
-        super().__init__(agent_id, latency=2)
+    latency = 2
+    defaults = {"act_probability": 0.2, "min_quantity": 5, "max_quantity": 20}
 
-    def act(self, order_book: OrderBook) -> Order | None:
-        if random.random() < 0.8:
-            return None
-        side = random.choice(["buy", "sell"])
-        quantity = random.randint(5, 20)
-        return Order(agent_id=self.agent_id, side=side, quantity=quantity, order_type="market")
+    @classmethod
+    def validate(cls, params: dict[str, float]):
+        _check_probability(params, "act_probability")
+        _check_quantity(params, "min_quantity")
+        _check_quantity(params, "max_quantity")
+        if params["min_quantity"] > params["max_quantity"]:
+            raise ValueError("min_quantity must not exceed max_quantity.")
+
+    @classmethod
+    def decide(cls, rng: np.random.Generator, n: int, params: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        low = params["min_quantity"]
+        return {
+            "acts": rng.random(n) < params["act_probability"],
+            "is_buy": rng.random(n) < 0.5,
+            "quantity": np.floor(low + rng.random(n) * (params["max_quantity"] - low + 1)).astype(np.int64),
+            "is_limit": np.zeros(n, dtype=bool),
+            "scale": np.ones(n),
+            "offset": np.zeros(n, dtype=np.int64),
+            "fallback": np.full(n, 100.0),
+        }
 
+@register_agent_type
 class LiquidityProvider(Agent):
     """An agent that provides liquidity by placing limit orders on both sides."""
-    def __init__(self, agent_id: int):
-        super().__init__(agent_id, latency=1)
-
-    def act(self, order_book: OrderBook) -> Order | None:
-        best_bid = order_book.get_best_bid() or 99.9
-        best_ask = order_book.get_best_ask() or 100.1
-        bid_price = round(best_bid - 0.01, 2)
-        ask_price = round(best_ask + 0.01, 2)
-        if random.random() < 0.5:
-             return Order(
-                agent_id=self.agent_id, side="buy", quantity=10, order_type="limit", price=bid_price
-            )
-        else:
-             return Order(
-                agent_id=self.agent_id, side="sell", quantity=10, order_type="limit", price=ask_price
-            )
\ No newline at end of file
+    latency = 1
+    defaults = {"quantity": 10, "offset_ticks": 1}
+
+    @classmethod
+    def validate(cls, params: dict[str, float]):
+        _check_quantity(params, "quantity")
+        if not (params["offset_ticks"] >= 0 and params["offset_ticks"] == int(params["offset_ticks"])):
+            raise ValueError("offset_ticks must be a non-negative whole number.")
+
+    @classmethod
+    def decide(cls, rng: np.random.Generator, n: int, params: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        # Quotes ``offset_ticks`` outside the current best price of a random side.
+        is_buy = rng.random(n) < 0.5
+        offset = params["offset_ticks"].astype(np.int64)
+        return {
+            "acts": np.ones(n, dtype=bool),
+            "is_buy": is_buy,
+            "quantity": params["quantity"].astype(np.int64),
+            "is_limit": np.ones(n, dtype=bool),
+            "scale": np.ones(n),
+            "offset": np.where(is_buy, -offset, offset),
+            "fallback": np.where(is_buy, 99.9, 100.1),
+        }
@@ -0,0 +1,134 @@
+from collections import OrderedDict
+
+import numpy as np
+from .columnar import ColumnStore
+from .trade_store import TradeStore
+
+CANDLE_SCHEMA = {
+    "time": np.float64,
+    "open": np.float64,
+    "high": np.float64,
+    "low": np.float64,
+    "close": np.float64,
+    "volume": np.int64,
+}
+
+# A timeframe is bucketed by trade count, by simulation tick or by wall-clock seconds.
+CANDLE_UNITS = ("trades", "ticks", "seconds")
+
+# Trades are folded in blocks of at most this many rows when backfilling.
+_BLOCK = 65536
+
+MAX_CANDLE_SIZE = 1_000_000
+# Timeframes other than the default ones are kept for the most recently
+# requested few only; an evicted series is rebuilt on demand.
+MAX_EXTRA_SERIES = 4
+
+class CandleSeries:
+    """OHLCV candles for one timeframe.
+
+    Closed candles live in a ``ColumnStore``; the candle still being built is
+    kept separately in ``current`` together with its bucket key.
+    """
+
+    def __init__(self, unit: str, size: int):
+        self.unit = unit
+        self.size = size
+        self.closed = ColumnStore(CANDLE_SCHEMA, 256)
+        self.current: dict | None = None
+        self._bucket = None
+
+    def update(self, keys: np.ndarray, prices: np.ndarray, quantities: np.ndarray, timestamps: np.ndarray):
+        """Folds a block of trades whose bucket keys are ``keys``."""
+        if not len(keys):
+            return
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+        ends = np.append(starts[1:], len(keys)) - 1
+        block = {
+            "time": timestamps[starts],
+            "open": prices[starts],
+            "high": np.maximum.reduceat(prices, starts),
+            "low": np.minimum.reduceat(prices, starts),
+            "close": prices[ends],
+            "volume": np.add.reduceat(quantities, starts),
+        }
+
+        current = self.current
+        if current is not None:
+            if keys[0] == self._bucket:
+                # The first segment continues the open candle.
+                block["time"][0] = current["time"]
+                block["open"][0] = current["open"]
+                block["high"][0] = max(block["high"][0], current["high"])
+                block["low"][0] = min(block["low"][0], current["low"])
+                block["volume"][0] += current["volume"]
+            else:
+                self.closed.extend({name: np.array([value]) for name, value in current.items()})
+
+        self.closed.extend({name: values[:-1] for name, values in block.items()})
+        self.current = {name: values[-1].item() for name, values in block.items()}
+        self._bucket = keys[-1]
+
+    def candles(self, start: int = 0, stop: int | None = None) -> list[dict]:
+        """Returns closed candles ``[start, stop)`` as plain dicts."""
+        columns = {name: values.tolist() for name, values in self.closed.columns(start, stop).items()}
+        names = list(columns)
+        return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+class CandleAggregator:
+    """Keeps open candles for several timeframes at once, fed from a ``TradeStore``.
+
+    ``update()`` folds in only the trades appended since the previous call,
+    so the cost per call is proportional to the new trades. The series of
+    ``timeframes`` always stay live; at most ``MAX_EXTRA_SERIES`` others are
+    kept, least recently requested evicted first.
+    """
+
+    def __init__(self, trades: TradeStore, timeframes: tuple[tuple[str, int], ...] = (("trades", 10), ("trades", 30))):
+        self.trades = trades
+        self.series: OrderedDict[tuple[str, int], CandleSeries] = OrderedDict()
+        self.default_timeframes = frozenset(timeframes)
+        self.processed = 0
+        for unit, size in timeframes:
+            self.register(unit, size)
+
+    def register(self, unit: str, size: int) -> CandleSeries:
+        """Returns the series for a timeframe, backfilling it from the history if it is new."""
+        if unit not in CANDLE_UNITS:
+            raise ValueError(f"Unknown candle unit: {unit}")
+        if not 1 <= size <= MAX_CANDLE_SIZE:
+            raise ValueError(f"Candle size must be between 1 and {MAX_CANDLE_SIZE}.")
+        series = self.series.get((unit, size))
+        if series is None:
+            series = CandleSeries(unit, size)
+            for start in range(0, self.processed, _BLOCK):
+                self._fold(series, start, min(start + _BLOCK, self.processed))
+            self.series[(unit, size)] = series
+            extra = [key for key in self.series if key not in self.default_timeframes]
+            for evicted in extra[:-MAX_EXTRA_SERIES]:
+                del self.series[evicted]
+        else:
+            self.series.move_to_end((unit, size))
+        return series
+
+    def _fold(self, series: CandleSeries, start: int, stop: int):
+        trades = self.trades
+        if series.unit == "trades":
+            keys = np.arange(start, stop) // series.size
+        elif series.unit == "ticks":
+            keys = trades.column("tick", start, stop) // series.size
+        else:
+            keys = np.floor_divide(trades.column("timestamp", start, stop), series.size).astype(np.int64)
+        series.update(
+            keys, trades.column("price", start, stop),
+            trades.column("quantity", start, stop), trades.column("timestamp", start, stop),
+        )
+
+    def update(self):
+        """Folds every trade appended to the store since the last call."""
+        start, stop = self.processed, len(self.trades)
+        if start == stop:
+            return
+        for series in self.series.values():
+            self._fold(series, start, stop)
+        self.processed = stop
@@ -0,0 +1,64 @@
+import numpy as np
+
+class ColumnStore:
+    """Parallel, growable NumPy columns that share a single row count.
+
+    Each column in ``schema`` is exposed as an attribute holding the full
+    backing array; only the first ``size`` rows are meaningful. Capacity
+    doubles when an append does not fit, so appends are amortized O(1) and
+    ``column()``/``columns()`` return zero-copy views.
+    """
+
+    def __init__(self, schema: dict[str, np.dtype], capacity: int = 1024):
+        self.schema = schema
+        self.size = 0
+        self.capacity = max(capacity, 1)
+        for name, dtype in schema.items():
+            setattr(self, name, np.empty(self.capacity, dtype=dtype))
+
+    def reserve(self, extra: int):
+        """Ensures there is room for ``extra`` more rows."""
+        needed = self.size + extra
+        if needed <= self.capacity:
+            return
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        for name, dtype in self.schema.items():
+            column = np.empty(capacity, dtype=dtype)
+            column[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, column)
+        self.capacity = capacity
+
+    def grow(self):
+        """Doubles the capacity, keeping the rows recorded so far."""
+        self.reserve(self.capacity - self.size + 1)
+
+    def column(self, name: str, start: int = 0, stop: int | None = None) -> np.ndarray:
+        """Returns a view of rows ``[start, stop)`` of one column."""
+        stop = self.size if stop is None else min(stop, self.size)
+        return getattr(self, name)[start:stop]
+
+    def columns(self, start: int = 0, stop: int | None = None) -> dict[str, np.ndarray]:
+        """Returns views of rows ``[start, stop)`` of every column, keyed by name."""
+        return {name: self.column(name, start, stop) for name in self.schema}
+
+    def extend(self, columns: dict[str, np.ndarray]):
+        """Appends a block of rows given as one array per column.
+
+        The first column must be an array; later ones may be scalars, which
+        are broadcast over the block.
+        """
+        count = len(next(iter(columns.values())))
+        self.reserve(count)
+        start, stop = self.size, self.size + count
+        for name in self.schema:
+            getattr(self, name)[start:stop] = columns[name]
+        self.size = stop
+
+    def clear(self):
+        """Forgets all rows without releasing the arrays."""
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
@@ -0,0 +1,48 @@
+import time
+
+import numpy as np
+from .columnar import ColumnStore
+from .models import Side
+from .order_book import OrderBook
+
+DEPTH_SCHEMA = {
+    "tick": np.int64,
+    "timestamp": np.float64,
+    "side": np.int8,
+    "level": np.int16,
+    "price": np.int64,  # ticks
+    "volume": np.int64,
+}
+
+_SIDE_BUY = int(Side.BUY)
+_SIDE_SELL = int(Side.SELL)
+
+class DepthHistory(ColumnStore):
+    """Snapshots of the best ``levels`` price levels per side, taken every ``every`` ticks.
+
+    One row per level per snapshot, level 0 being the best price.
+    """
+
+    def __init__(self, levels: int = 10, every: int = 100, capacity: int = 4096):
+        if levels < 1 or every < 1:
+            raise ValueError("Depth history levels and interval must be positive.")
+        super().__init__(DEPTH_SCHEMA, capacity)
+        self.levels = levels
+        self.every = every
+
+    def sample(self, tick: int, order_book: OrderBook):
+        """Appends a snapshot of ``order_book`` as it is on ``tick``."""
+        bids = order_book.bids.depth(self.levels)
+        asks = order_book.asks.depth(self.levels)
+        count = len(bids) + len(asks)
+        if not count:
+            return
+        levels = bids + asks
+        self.extend({
+            "tick": np.full(count, tick, dtype=np.int64),
+            "timestamp": time.time(),
+            "side": [_SIDE_BUY] * len(bids) + [_SIDE_SELL] * len(asks),
+            "level": [*range(len(bids)), *range(len(asks))],
+            "price": [price for price, _ in levels],
+            "volume": [volume for _, volume in levels],
+        })
@@ -0,0 +1,249 @@
+"""A headless, high-throughput simulation engine.
+
+Runs the same market as the API (one book, one matching engine, agents with
+latency) without FastAPI or plotting. Agent selections and the random parts
+of every decision are drawn in NumPy batches from a seeded generator, so a
+run is reproducible from its seed (for a given batch size).
+
+Run from the ``backend`` directory:
+
+    python -m simulation.engine --ticks 1000000 --seed 42
+"""
+import argparse
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from .accounting import Ledger
+from .agents import AGENT_TYPES, Agent
+from .depth_history import DepthHistory
+from .journal import JournalWriter, replay
+from .matching_engine import MatchingEngine
+from .population import Population
+from .profiling import profile_call
+from .order_book import OrderBook
+from .scheduler import OrderScheduler
+from .ticks import DEFAULT_TICK_SIZE
+from .trade_store import TradeStore
+
+@dataclass
+class RunStats:
+    """Summary of one ``SimulationEngine.run`` call."""
+    ticks: int
+    orders: int
+    trades: int
+    volume: int
+    elapsed: float
+    mean_spread: float | None
+    last_price: float | None
+
+    @property
+    def ticks_per_sec(self) -> float:
+        return self.ticks / self.elapsed if self.elapsed > 0 else float("inf")
+
+class SimulationEngine:
+    """A self-contained simulation with no module-level state.
+
+    Each tick delivers the orders whose latency has elapsed to the matching
+    engine, then lets one randomly selected agent decide.
+    """
+
+    def __init__(self, agents: list[Agent], seed: int | None = None, batch_size: int = 65536,
+                 tick_size: float = DEFAULT_TICK_SIZE, journal: JournalWriter | None = None,
+                 snapshot_every: int = 0, depth_history: DepthHistory | None = None):
+        self.agents = agents
+        self.ledger = Ledger()
+        for agent in agents:
+            self.ledger.open(agent.agent_id)
+        self.rng = np.random.default_rng(seed)
+        self.batch_size = batch_size
+        self.order_book = OrderBook(tick_size)
+        self.matching_engine = MatchingEngine(self.order_book)
+        self.trade_store = TradeStore()
+        self.scheduler = OrderScheduler()
+        self.tick = 0
+        self.depth_history = depth_history
+        self.journal = journal
+        self.snapshot_every = snapshot_every
+        self._journaled_trades = 0
+        if journal is not None:
+            for agent in agents:
+                journal.agent_added(-1, agent)
+
+    @classmethod
+    def resume(cls, path: str, seed: int | None = None, batch_size: int = 65536,
+               snapshot_every: int = 0) -> "SimulationEngine":
+        """Rebuilds an engine from the journal at ``path`` and keeps appending to it."""
+        state = replay(path)
+        engine = cls(state.agents, seed=seed, batch_size=batch_size,
+                     tick_size=state.order_book.grid.tick_size, snapshot_every=snapshot_every)
+        engine.order_book = state.order_book
+        engine.matching_engine = state.matching_engine
+        engine.trade_store = state.trade_store
+        engine.scheduler = state.scheduler
+        engine.ledger = state.ledger
+        engine.tick = state.tick
+        engine.journal = JournalWriter(path, state.order_book.grid.tick_size, append=True)
+        engine._journaled_trades = len(engine.trade_store)
+        return engine
+
+    def snapshot(self) -> str:
+        """Snapshots the current state next to the journal and returns the file written."""
+        self._journal_trades()
+        return self.journal.snapshot(self.tick, self.order_book, self.scheduler, self.ledger,
+                                     self.agents, self.matching_engine.next_trade_id)
+
+    def _journal_trades(self):
+        """Hands the trades made since the last call to the journal."""
+        self.journal.trades(self.trade_store, self._journaled_trades)
+        self._journaled_trades = len(self.trade_store)
+
+    def run(self, ticks: int) -> RunStats:
+        """Advances the simulation by ``ticks`` ticks and returns summary statistics."""
+        book = self.order_book
+        match = self.matching_engine.match
+        fills = self.matching_engine.fills
+        trade_store = self.trade_store
+        ledger = self.ledger
+        journal = self.journal
+        snapshot_every = self.snapshot_every if journal is not None else 0
+        depth_history = self.depth_history
+        depth_every = depth_history.every if depth_history is not None else 0
+        pop_due = self.scheduler.pop_due
+        schedule = self.scheduler.schedule
+        population = Population(self.agents)
+        grid = book.grid
+        best_bid = book.get_best_bid
+        best_ask = book.get_best_ask
+        trades_before = len(trade_store)
+        orders = 0
+        spread_sum = 0  # in ticks
+        spread_samples = 0
+
+        started = time.perf_counter()
+        remaining = ticks
+        while remaining > 0 and population:
+            n = min(remaining, self.batch_size)
+            decisions = population.draw(self.rng, n, grid)
+            acts = decisions.acts
+            latency = decisions.latency
+            order_at = decisions.order
+            tick = self.tick
+            for k in range(n):
+                if snapshot_every and tick % snapshot_every == 0 and tick:
+                    self.tick = tick
+                    self.snapshot()
+                due = pop_due(tick)
+                if due:
+                    for order in due:
+                        match(order)
+                    if fills.size:
+                        ledger.apply(fills)
+                        trade_store.append_fills(fills, tick)
+                        fills.clear()
+                if depth_every and tick % depth_every == 0:
+                    depth_history.sample(tick, book)
+                # One snapshot of the best prices serves the spread and the decision.
+                bid = best_bid()
+                ask = best_ask()
+                if bid is not None and ask is not None:
+                    spread_sum += ask - bid
+                    spread_samples += 1
+                if acts[k]:
+                    order = order_at(k, bid, ask)
+                    schedule(tick + latency[k], order)
+                    if journal is not None:
+                        journal.submit(tick, order, latency[k])
+                    orders += 1
+                tick += 1
+            self.tick = tick
+            remaining -= n
+            if journal is not None:
+                self._journal_trades()
+                journal.flush()
+        if journal is not None:
+            journal.clock(self.tick - 1)
+            journal.flush()
+        elapsed = time.perf_counter() - started
+
+        return RunStats(
+            ticks=ticks,
+            orders=orders,
+            trades=len(trade_store) - trades_before,
+            volume=int(trade_store.column("quantity", trades_before).sum()),
+            elapsed=elapsed,
+            mean_spread=book.grid.to_price(spread_sum) / spread_samples if spread_samples else None,
+            last_price=trade_store.last_price,
+        )
+
+def build_agents(counts: dict[str, int]) -> list[Agent]:
+    """Creates agents with consecutive ids from a {type name: count} mapping."""
+    agents = []
+    for name, count in counts.items():
+        agent_class = AGENT_TYPES[name]
+        for _ in range(count):
+            agents.append(agent_class(agent_id=len(agents) + 1))
+    return agents
+
+def parse_counts(specs: list[str]) -> dict[str, int]:
+    """Parses ``Type=count`` pairs, e.g. ``NoiseTrader=5``."""
+    counts = {}
+    for spec in specs:
+        name, _, count = spec.partition("=")
+        if name not in AGENT_TYPES:
+            raise ValueError(f"Invalid agent type: {name}")
+        counts[name] = int(count or 1)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a headless market simulation.")
+    parser.add_argument("--ticks", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--agents", nargs="+", default=["LiquidityProvider=1", "NoiseTrader=2", "MarketTaker=2"],
+                        help="agent mix as Type=count pairs")
+    parser.add_argument("--tick-size", type=float, default=DEFAULT_TICK_SIZE)
+    parser.add_argument("--journal", default=None, help="write an event journal to this file")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue the run recorded in --journal instead of starting a new one")
+    parser.add_argument("--snapshot-every", type=int, default=0,
+                        help="snapshot the journaled state every N ticks (0 disables)")
+    parser.add_argument("--profile", default=None,
+                        help="sample the run and write folded stacks (for flame graphs) to this file")
+    parser.add_argument("--profile-interval", type=float, default=1.0, help="sampling interval in milliseconds")
+    args = parser.parse_args()
+
+    try:
+        counts = parse_counts(args.agents)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.tick_size <= 0:
+        parser.error("Tick size must be positive.")
+    if args.resume and not args.journal:
+        parser.error("--resume needs --journal.")
+    if args.profile_interval <= 0:
+        parser.error("Profile interval must be positive.")
+    if args.resume:
+        engine = SimulationEngine.resume(args.journal, seed=args.seed, snapshot_every=args.snapshot_every)
+    else:
+        journal = JournalWriter(args.journal, args.tick_size) if args.journal else None
+        engine = SimulationEngine(build_agents(counts), seed=args.seed, tick_size=args.tick_size,
+                                  journal=journal, snapshot_every=args.snapshot_every)
+    if args.profile:
+        stats, profiler = profile_call(engine.run, args.ticks, interval=args.profile_interval / 1000)
+        profiler.write(args.profile)
+    else:
+        stats = engine.run(args.ticks)
+    if engine.journal is not None:
+        engine.journal.close()
+    print(f"ticks:        {stats.ticks}")
+    print(f"orders:       {stats.orders}")
+    print(f"trades:       {stats.trades} (volume {stats.volume})")
+    print(f"mean spread:  {stats.mean_spread}")
+    print(f"last price:   {stats.last_price}")
+    print(f"elapsed:      {stats.elapsed:.2f}s ({stats.ticks_per_sec:,.0f} ticks/sec)")
+    if args.profile:
+        print(f"profile:      {profiler.samples} samples written to {args.profile}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,425 @@
+"""A multi-symbol exchange, optionally sharded across worker processes.
+
+``Exchange`` keeps one order book, matching engine, trade store and ledger
+per symbol and routes every order by its ``symbol``. ``ShardedExchange``
+runs a market of many symbols. It draws the agents' decisions centrally
+from one seeded generator, as ``SimulationEngine`` does. Each order then
+goes to the shard that owns its symbol. A shard is an ``Exchange``, either
+in this process or in a worker process fed through a ``SharedQueue``.
+
+Agents whose ``symbols`` hold several symbols (or None, for all of them)
+send every decision to each of those books, which correlates the order
+flow of the symbols they share. Order ids are assigned centrally too, so
+every symbol sees the same orders in the same sequence whatever the number
+of workers. Its trades are therefore reproducible from the seed.
+
+Run from the ``backend`` directory:
+
+    python -m simulation.exchange --symbols 24 --workers 4 --ticks 1000000 --seed 42
+"""
+import argparse
+import multiprocessing
+import time
+from dataclasses import dataclass
+from queue import Empty
+
+import numpy as np
+
+from .accounting import Ledger
+from .agents import AGENT_TYPES, Agent
+from .engine import parse_counts
+from .matching_engine import MatchingEngine
+from .models import BUY, LIMIT, MARKET, SELL, Order
+from .order_book import OrderBook
+from .population import Population
+from .scheduler import OrderScheduler
+from .shared_queue import POLL_INTERVAL, PeerExited, SharedQueue
+from .ticks import DEFAULT_TICK_SIZE, TickGrid
+from .trade_store import TradeStore
+
+# One decided order. ``symbol`` indexes the exchange's symbol list, and the
+# price fields follow ``Decisions.order``: a limit order is priced
+# ``round(reference * scale) + offset`` ticks when it is sent.
+ORDER_DTYPE = np.dtype([
+    ("tick", np.int64), ("order_id", np.int64), ("agent_id", np.int64), ("symbol", np.int32),
+    ("latency", np.int32), ("quantity", np.int64), ("offset", np.int64), ("fallback", np.int64),
+    ("scale", np.float64), ("is_buy", np.bool_), ("is_limit", np.bool_),
+])
+
+# Signals sent to shard workers.
+REPORT = -1
+STOP = -2
+
+class Market:
+    """The book, matching engine, trades and accounts of one symbol."""
+
+    def __init__(self, symbol: str, tick_size: float = DEFAULT_TICK_SIZE, agent_ids: list[int] = ()):
+        self.symbol = symbol
+        self.order_book = OrderBook(tick_size)
+        self.matching_engine = MatchingEngine(self.order_book)
+        self.trade_store = TradeStore()
+        self.ledger = Ledger()
+        for agent_id in agent_ids:
+            self.ledger.open(agent_id)
+
+class Exchange:
+    """A registry of markets keyed by symbol, with one scheduler for delayed orders.
+
+    Every market matches with price-time priority on its own; orders for
+    different symbols never interact, so a set of symbols can be split
+    over several exchanges.
+    """
+
+    def __init__(self, symbols: list[str], tick_size: float = DEFAULT_TICK_SIZE, agent_ids: list[int] = ()):
+        self.grid = TickGrid(tick_size)
+        self.markets = {symbol: Market(symbol, tick_size, agent_ids) for symbol in symbols}
+        self.scheduler = OrderScheduler()
+
+    def __getitem__(self, symbol: str) -> Market:
+        return self.markets[symbol]
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.markets
+
+    def _market(self, order: Order) -> Market:
+        market = self.markets.get(order.symbol)
+        if market is None:
+            raise ValueError(f"Unknown symbol: {order.symbol}")
+        return market
+
+    def submit(self, order: Order, tick: int = 0) -> int:
+        """Matches ``order`` on its symbol's book now; returns the number of fills."""
+        market = self._market(order)
+        fills = market.matching_engine.fills
+        filled = market.matching_engine.match(order)
+        if fills.size:
+            market.ledger.apply(fills)
+            market.trade_store.append_fills(fills, tick)
+            fills.clear()
+        return filled
+
+    def schedule(self, tick: int, order: Order):
+        """Queues ``order`` to reach its symbol's matching engine on ``tick``."""
+        self._market(order)
+        self.scheduler.schedule(tick, order)
+
+    def advance(self, tick: int):
+        """Delivers every scheduled order due on or before ``tick``, each on its own due tick."""
+        scheduler = self.scheduler
+        while (due_tick := scheduler.next_tick()) is not None and due_tick <= tick:
+            for order in scheduler.pop_due(due_tick):
+                self.submit(order, due_tick)
+
+    def process(self, rows: np.ndarray, symbols: list[str], until: int | None = None):
+        """Runs a batch of decided orders (``ORDER_DTYPE`` rows, by tick), then every tick up to ``until``.
+
+        ``rows["symbol"]`` indexes ``symbols``; every row must be for a
+        symbol of this exchange. As in ``SimulationEngine.run``, the orders
+        due on a tick are matched before the decisions of that tick are
+        priced against the book.
+        """
+        markets = [self.markets.get(symbol) for symbol in symbols]
+        schedule = self.scheduler.schedule
+        next_tick = self.scheduler.next_tick
+        columns = (rows[name].tolist() for name in ORDER_DTYPE.names)
+        for tick, order_id, agent_id, symbol, latency, quantity, offset, fallback, scale, is_buy, is_limit \
+                in zip(*columns):
+            due_tick = next_tick()
+            if due_tick is not None and due_tick <= tick:
+                self.advance(tick)
+            book = markets[symbol].order_book
+            if is_buy:
+                side, reference = BUY, book.get_best_bid()
+            else:
+                side, reference = SELL, book.get_best_ask()
+            if is_limit:
+                price = round((reference or fallback) * scale) + offset
+                order = Order.unchecked(side, quantity, LIMIT, agent_id, price, symbols[symbol])
+            else:
+                order = Order.unchecked(side, quantity, MARKET, agent_id, None, symbols[symbol])
+            order.order_id = order_id
+            schedule(tick + latency, order)
+        if until is not None:
+            self.advance(until)
+
+    def summary(self) -> dict[str, tuple[int, int, float | None]]:
+        """Returns (trades, volume, last price) per symbol."""
+        return {
+            symbol: (len(market.trade_store), int(market.trade_store.column("quantity").sum()),
+                     market.trade_store.last_price)
+            for symbol, market in self.markets.items()
+        }
+
+    def trades(self) -> dict[str, dict[str, np.ndarray]]:
+        """Returns the trade columns of every symbol."""
+        return {symbol: market.trade_store.columns() for symbol, market in self.markets.items()}
+
+def _serve_shard(symbols: list[str], owned: list[str], tick_size: float, agent_ids: list[int],
+                 queue: SharedQueue, results):
+    """The loop of a shard worker process: runs batches until it is told to stop."""
+    exchange = Exchange(owned, tick_size, agent_ids)
+    while True:
+        try:
+            batch = queue.get()
+        except PeerExited:  # the parent is gone
+            break
+        if isinstance(batch, int):
+            if batch == REPORT:
+                results.put(exchange.summary())
+                continue
+            results.put(exchange.trades())
+            break
+        # A batch ends with a row for no symbol that carries its last tick;
+        # the queue may have split the batch before it.
+        if len(batch) and batch["symbol"][-1] < 0:
+            exchange.process(batch[:-1], symbols, int(batch["tick"][-1]))
+        else:
+            exchange.process(batch, symbols)
+    queue.close()
+
+@dataclass
+class ExchangeStats:
+    """Summary of one ``ShardedExchange.run`` call."""
+    ticks: int
+    orders: int
+    trades: int
+    volume: int
+    elapsed: float
+    workers: int
+
+    @property
+    def orders_per_sec(self) -> float:
+        return self.orders / self.elapsed if self.elapsed > 0 else float("inf")
+
+class ShardedExchange:
+    """A market of several symbols whose matching runs in ``workers`` processes.
+
+    Symbol ``i`` belongs to shard ``i % workers``. With ``workers=0`` the
+    whole exchange runs in this process, which gives the same trades.
+    Use it as a context manager, or call ``close()`` to stop the workers;
+    ``close()`` also collects every symbol's trades into ``self.trades``.
+    If a worker dies, the others are stopped and every call raises
+    ``RuntimeError``.
+    """
+
+    def __init__(self, symbols: list[str], agents: list[Agent], workers: int = 0, seed: int | None = None,
+                 batch_size: int = 65536, tick_size: float = DEFAULT_TICK_SIZE):
+        if not symbols or len(set(symbols)) != len(symbols):
+            raise ValueError("Symbols must be unique and non-empty.")
+        if workers < 0:
+            raise ValueError("Workers must not be negative.")
+        self.symbols = list(symbols)
+        index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        baskets = []
+        for agent in agents:
+            unknown = set(agent.symbols or ()) - index.keys()
+            if unknown:
+                raise ValueError(f"Unknown symbols for agent {agent.agent_id}: {', '.join(sorted(unknown))}")
+            baskets.append([index[symbol] for symbol in agent.symbols or self.symbols])
+        self.agents = agents
+        self.population = Population(agents)
+        self._basket_sizes = np.array([len(basket) for basket in baskets], dtype=np.int64)
+        self._basket_starts = np.cumsum(self._basket_sizes) - self._basket_sizes
+        self._baskets = np.array([symbol for basket in baskets for symbol in basket], dtype=np.int32)
+        self.grid = TickGrid(tick_size)
+        self.rng = np.random.default_rng(seed)
+        self.batch_size = batch_size
+        self.workers = workers
+        self.tick = 0
+        self.next_order_id = 1
+        self.trades: dict[str, dict[str, np.ndarray]] | None = None
+        self._error: str | None = None
+        self._totals = (0, 0)  # trades and volume up to the last run
+
+        agent_ids = [agent.agent_id for agent in agents]
+        self.shard_of = np.arange(len(self.symbols)) % max(workers, 1)
+        if workers == 0:
+            self._local = Exchange(self.symbols, tick_size, agent_ids)
+            return
+        self._local = None
+        context = multiprocessing.get_context()
+        self._results = context.Queue()
+        self._queues = []
+        self._processes = []
+        for shard in range(workers):
+            owned = [symbol for i, symbol in enumerate(self.symbols) if self.shard_of[i] == shard]
+            queue = SharedQueue(ORDER_DTYPE, context=context)
+            process = context.Process(
+                target=_serve_shard, args=(self.symbols, owned, tick_size, agent_ids, queue, self._results),
+                name=f"exchange-shard-{shard}", daemon=True,
+            )
+            process.start()
+            queue.peer = process
+            self._queues.append(queue)
+            self._processes.append(process)
+
+    def __enter__(self) -> "ShardedExchange":
+        return self
+
+    def __exit__(self, *exc):
+        if self._error is None:
+            self.close()
+
+    def _worker_died(self) -> RuntimeError:
+        """Stops every worker after one of them has died and returns the error to raise."""
+        dead = [process for process in self._processes if process.exitcode not in (None, 0)]
+        for process in self._processes:
+            process.terminate()
+            process.join()
+        for queue in self._queues:
+            queue.close()
+        self._processes, self._queues = [], []
+        self._error = "Exchange worker died: " + ", ".join(
+            f"{process.name} (exit code {process.exitcode})" for process in dead)
+        return RuntimeError(self._error)
+
+    def _check(self):
+        if self._error is not None:
+            raise RuntimeError(self._error)
+
+    def _signal(self, code: int):
+        try:
+            for queue in self._queues:
+                queue.put_signal(code)
+        except PeerExited:
+            raise self._worker_died() from None
+
+    def _receive(self) -> dict:
+        """Merges one result from every worker, waiting no longer than they stay alive."""
+        merged = {}
+        for _ in self._processes:
+            while True:
+                try:
+                    merged.update(self._results.get(timeout=POLL_INTERVAL))
+                    break
+                except Empty:
+                    if any(process.exitcode not in (None, 0) for process in self._processes):
+                        raise self._worker_died() from None
+        return merged
+
+    def _draw(self, n: int) -> np.ndarray:
+        """Draws the decisions of the next ``n`` ticks as ``ORDER_DTYPE`` rows, one per basket symbol."""
+        columns = self.population.draw_columns(self.rng, n)
+        acting = np.flatnonzero(columns["acts"])
+        selected = columns["selected"][acting]
+        sizes = self._basket_sizes[selected]
+        k = np.repeat(acting, sizes)
+        # The position of each row within its agent's basket.
+        ends = np.cumsum(sizes)
+        within = np.arange(len(k)) - np.repeat(ends - sizes, sizes)
+        rows = np.empty(len(k), dtype=ORDER_DTYPE)
+        rows["tick"] = self.tick + k
+        rows["order_id"] = self.next_order_id + np.arange(len(k))
+        rows["symbol"] = self._baskets[np.repeat(self._basket_starts[selected], sizes) + within]
+        for name in ("agent_id", "latency", "quantity", "offset", "scale", "is_buy", "is_limit"):
+            rows[name] = columns[name][k]
+        rows["fallback"] = self.grid.to_ticks_array(columns["fallback"][k])
+        self.next_order_id += len(k)
+        return rows
+
+    def _summary(self) -> dict[str, tuple[int, int, float | None]]:
+        if self._local is not None:
+            return self._local.summary()
+        self._signal(REPORT)
+        return self._receive()
+
+    def run(self, ticks: int) -> ExchangeStats:
+        """Advances every symbol by ``ticks`` ticks and returns summary statistics."""
+        self._check()
+        end_row = np.zeros(1, dtype=ORDER_DTYPE)
+        end_row["symbol"] = -1
+        orders = 0
+        started = time.perf_counter()
+        remaining = ticks
+        while remaining > 0 and len(self.population):
+            n = min(remaining, self.batch_size)
+            rows = self._draw(n)
+            orders += len(rows)
+            until = self.tick + n - 1
+            if self._local is not None:
+                self._local.process(rows, self.symbols, until)
+            else:
+                end_row["tick"] = until
+                shard_of_row = self.shard_of[rows["symbol"]]
+                try:
+                    for shard, queue in enumerate(self._queues):
+                        queue.put(np.concatenate((rows[shard_of_row == shard], end_row)))
+                except PeerExited:
+                    raise self._worker_died() from None
+            self.tick += n
+            remaining -= n
+        summary = self._summary()
+        elapsed = time.perf_counter() - started
+
+        trades = sum(count for count, _, _ in summary.values())
+        volume = sum(volume for _, volume, _ in summary.values())
+        previous_trades, previous_volume = self._totals
+        self._totals = (trades, volume)
+        self.last_prices = {symbol: summary[symbol][2] for symbol in self.symbols}
+        return ExchangeStats(ticks=ticks, orders=orders, trades=trades - previous_trades,
+                             volume=volume - previous_volume, elapsed=elapsed, workers=self.workers)
+
+    def close(self) -> dict[str, dict[str, np.ndarray]]:
+        """Stops the workers and returns the trade columns of every symbol."""
+        if self.trades is not None:
+            return self.trades
+        self._check()
+        if self._local is not None:
+            self.trades = self._local.trades()
+            return self.trades
+        self._signal(STOP)
+        trades = self._receive()
+        for process in self._processes:
+            process.join()
+        for queue in self._queues:
+            queue.close()
+        self.trades = {symbol: trades[symbol] for symbol in self.symbols}
+        return self.trades
+
+def build_agents(symbols: list[str], counts: dict[str, int], index_traders: int) -> list[Agent]:
+    """Gives every symbol its own agents of the given counts, plus NoiseTraders trading every symbol."""
+    agents = []
+    for symbol in symbols:
+        for name, count in counts.items():
+            for _ in range(count):
+                agents.append(AGENT_TYPES[name](agent_id=len(agents) + 1, symbols=(symbol,)))
+    for _ in range(index_traders):
+        agents.append(AGENT_TYPES["NoiseTrader"](agent_id=len(agents) + 1))
+    return agents
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a headless multi-symbol market.")
+    parser.add_argument("--symbols", type=int, default=8, help="number of symbols")
+    parser.add_argument("--workers", type=int, default=0, help="shard processes (0 runs in this process)")
+    parser.add_argument("--ticks", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--agents", nargs="+", default=["LiquidityProvider=1", "NoiseTrader=2", "MarketTaker=2"],
+                        help="agents of each symbol as Type=count pairs")
+    parser.add_argument("--index-traders", type=int, default=2,
+                        help="NoiseTraders that send every order to all symbols")
+    parser.add_argument("--tick-size", type=float, default=DEFAULT_TICK_SIZE)
+    args = parser.parse_args()
+
+    try:
+        counts = parse_counts(args.agents)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.symbols < 1 or args.workers < 0:
+        parser.error("--symbols must be positive and --workers non-negative.")
+    if args.tick_size <= 0:
+        parser.error("Tick size must be positive.")
+    symbols = [f"S{i:02d}" for i in range(args.symbols)]
+    agents = build_agents(symbols, counts, args.index_traders)
+    with ShardedExchange(symbols, agents, workers=args.workers, seed=args.seed,
+                         tick_size=args.tick_size) as exchange:
+        stats = exchange.run(args.ticks)
+    print(f"symbols:      {len(symbols)} on {max(stats.workers, 1)} shard(s)")
+    print(f"ticks:        {stats.ticks}")
+    print(f"orders:       {stats.orders}")
+    print(f"trades:       {stats.trades} (volume {stats.volume})")
+    print(f"elapsed:      {stats.elapsed:.2f}s ({stats.orders_per_sec:,.0f} orders/sec)")
+    prices = ", ".join(f"{symbol} {price}" for symbol, price in list(exchange.last_prices.items())[:8])
+    print(f"last prices:  {prices}{', ...' if len(symbols) > 8 else ''}")
+
+if __name__ == "__main__":
+    main()
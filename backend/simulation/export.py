@@ -0,0 +1,328 @@
+"""Bulk export of a simulation's history as Arrow IPC streams or Parquet files.
+
+Four tables can be exported: ``trades``, ``candles`` (closed candles of one
+timeframe), ``depth`` (the snapshots kept by a ``DepthHistory``) and
+``pnl`` (every agent's position, cash and PnL after each of its trades).
+Each table is produced as a sequence of record batches of at most
+``chunk_rows`` rows read straight from the NumPy columns, so the history is
+never materialized as a whole. In Parquet every batch becomes one row
+group; all tables are in time order, so the row group statistics on
+``timestamp`` (``time`` for candles) let ``read_parquet`` skip everything
+outside a time range without reading it.
+
+Run from the ``backend`` directory to run a headless simulation and export it:
+
+    python -m simulation.export --ticks 1000000 --seed 42 --out export
+"""
+import argparse
+import os
+from dataclasses import dataclass
+from typing import Iterator
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from .accounting import INITIAL_CASH
+from .candles import CandleAggregator, CandleSeries
+from .depth_history import DepthHistory
+from .fills import SIDE_BUY, SIDE_NAMES
+from .ticks import TickGrid
+from .trade_store import TradeStore
+
+EXPORT_TABLES = ("trades", "candles", "depth", "pnl")
+EXPORT_FORMATS = ("parquet", "arrow")
+DEFAULT_CHUNK_ROWS = 65536
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("Exporting needs pyarrow; install it with `pip install pyarrow`.")
+
+def _side_type():
+    return pa.dictionary(pa.int8(), pa.string())
+
+def table_schema(table: str) -> "pa.Schema":
+    """Returns the Arrow schema of an export table."""
+    _require_pyarrow()
+    if table == "trades":
+        return pa.schema([
+            ("trade_id", pa.int64()), ("tick", pa.int64()), ("timestamp", pa.float64()),
+            ("price", pa.float64()), ("quantity", pa.int64()), ("side", _side_type()),
+            ("aggressor_order_id", pa.int64()), ("resting_order_id", pa.int64()),
+            ("aggressor_agent_id", pa.int64()), ("resting_agent_id", pa.int64()),
+        ])
+    if table == "candles":
+        return pa.schema([
+            ("time", pa.float64()), ("open", pa.float64()), ("high", pa.float64()),
+            ("low", pa.float64()), ("close", pa.float64()), ("volume", pa.int64()),
+        ])
+    if table == "depth":
+        return pa.schema([
+            ("tick", pa.int64()), ("timestamp", pa.float64()), ("side", _side_type()),
+            ("level", pa.int16()), ("price", pa.float64()), ("volume", pa.int64()),
+        ])
+    if table == "pnl":
+        return pa.schema([
+            ("trade_id", pa.int64()), ("tick", pa.int64()), ("timestamp", pa.float64()),
+            ("agent_id", pa.int64()), ("price", pa.float64()), ("shares", pa.int64()),
+            ("cash", pa.float64()), ("pnl", pa.float64()),
+        ])
+    raise ValueError(f"Unknown export table: {table}")
+
+def _sides(codes: np.ndarray) -> "pa.DictionaryArray":
+    return pa.DictionaryArray.from_arrays(pa.array(codes, pa.int8()), pa.array(SIDE_NAMES))
+
+def _row_range(times: np.ndarray, start_time: float | None, end_time: float | None) -> tuple[int, int]:
+    """Returns the rows ``[lo, hi)`` of a sorted time column within ``[start_time, end_time)``."""
+    lo = 0 if start_time is None else int(np.searchsorted(times, start_time, side="left"))
+    hi = len(times) if end_time is None else int(np.searchsorted(times, end_time, side="left"))
+    return lo, max(lo, hi)
+
+@dataclass
+class HistoryView:
+    """The history of one simulation up to a fixed row count per table.
+
+    Every store behind it is append-only, so once the view is taken (under
+    the simulation's lock) its rows can be exported without the lock while
+    the simulation keeps running.
+    """
+    trades: TradeStore
+    trade_count: int
+    grid: TickGrid
+    candles: CandleSeries | None = None
+    candle_count: int = 0
+    depth: DepthHistory | None = None
+    depth_count: int = 0
+    initial_cash: float = INITIAL_CASH
+
+    @classmethod
+    def capture(cls, trades: TradeStore, grid: TickGrid, candles: CandleSeries | None = None,
+                depth: DepthHistory | None = None, initial_cash: float = INITIAL_CASH) -> "HistoryView":
+        return cls(
+            trades, len(trades), grid,
+            candles, len(candles.closed) if candles is not None else 0,
+            depth, len(depth) if depth is not None else 0,
+            initial_cash,
+        )
+
+    def batches(self, table: str, start_time: float | None = None, end_time: float | None = None,
+                chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator["pa.RecordBatch"]:
+        """Yields the rows of ``table`` within ``[start_time, end_time)`` in batches."""
+        _require_pyarrow()
+        if table == "trades":
+            return self._trade_batches(start_time, end_time, chunk_rows)
+        if table == "candles":
+            return self._candle_batches(start_time, end_time, chunk_rows)
+        if table == "depth":
+            return self._depth_batches(start_time, end_time, chunk_rows)
+        if table == "pnl":
+            return self._pnl_batches(start_time, end_time, chunk_rows)
+        raise ValueError(f"Unknown export table: {table}")
+
+    def _trade_batches(self, start_time, end_time, chunk_rows):
+        trades, schema = self.trades, table_schema("trades")
+        lo, hi = _row_range(trades.column("timestamp", 0, self.trade_count), start_time, end_time)
+        for start in range(lo, hi, chunk_rows):
+            stop = min(start + chunk_rows, hi)
+            columns = trades.columns(start, stop)
+            columns["side"] = _sides(columns["side"])
+            yield pa.record_batch([columns[field.name] for field in schema], schema=schema)
+
+    def _candle_batches(self, start_time, end_time, chunk_rows):
+        if self.candles is None:
+            return
+        closed, schema = self.candles.closed, table_schema("candles")
+        lo, hi = _row_range(closed.column("time", 0, self.candle_count), start_time, end_time)
+        for start in range(lo, hi, chunk_rows):
+            columns = closed.columns(start, min(start + chunk_rows, hi))
+            yield pa.record_batch([columns[field.name] for field in schema], schema=schema)
+
+    def _depth_batches(self, start_time, end_time, chunk_rows):
+        if self.depth is None:
+            return
+        depth, schema = self.depth, table_schema("depth")
+        lo, hi = _row_range(depth.column("timestamp", 0, self.depth_count), start_time, end_time)
+        for start in range(lo, hi, chunk_rows):
+            columns = depth.columns(start, min(start + chunk_rows, hi))
+            columns["side"] = _sides(columns["side"])
+            columns["price"] = self.grid.to_prices(columns["price"])
+            yield pa.record_batch([columns[field.name] for field in schema], schema=schema)
+
+    def _pnl_batches(self, start_time, end_time, chunk_rows):
+        """Replays the trades into per-agent positions, one row per agent per trade.
+
+        Positions are rebuilt from the trades alone, marked to each trade's
+        price, with every agent starting from ``initial_cash``. Positions
+        before ``start_time`` are still accumulated, just not emitted.
+        """
+        trades, schema = self.trades, table_schema("pnl")
+        lo, hi = _row_range(trades.column("timestamp", 0, self.trade_count), start_time, end_time)
+        held: dict[int, int] = {}
+        cash: dict[int, float] = {}
+        step = max(1, chunk_rows // 2)  # two rows per trade
+        for start in range(0, hi, step):
+            stop = min(start + step, hi)
+            price = trades.column("price", start, stop)
+            signed = trades.column("quantity", start, stop).copy()
+            signed[trades.column("side", start, stop) != SIDE_BUY] *= -1
+            # Row 2k is trade k's aggressor, row 2k+1 its resting counterparty.
+            agent = np.stack((trades.column("aggressor_agent_id", start, stop),
+                              trades.column("resting_agent_id", start, stop)), axis=1).ravel()
+            shares_delta = np.stack((signed, -signed), axis=1).ravel()
+            row_price = np.repeat(price, 2)
+            cash_delta = -shares_delta * row_price
+
+            # Running totals per agent: cumulative sums over the rows sorted
+            # by agent, restarted at each agent's first row and offset by
+            # what the agent held before this chunk.
+            order = np.argsort(agent, kind="stable")
+            sorted_agent = agent[order]
+            firsts = np.flatnonzero(np.r_[True, sorted_agent[1:] != sorted_agent[:-1]])
+            lasts = np.r_[firsts[1:], len(order)] - 1
+            agents = sorted_agent[firsts].tolist()
+            runs = np.diff(np.r_[firsts, len(order)])
+            shares = np.empty(len(order), dtype=np.int64)
+            balance = np.empty(len(order))
+            for out, delta, carry, initial in ((shares, shares_delta, held, 0), (balance, cash_delta, cash, self.initial_cash)):
+                total = np.cumsum(delta[order])
+                before = np.r_[0, total[lasts[:-1]]]
+                opening = np.array([carry.get(a, initial) for a in agents], dtype=out.dtype)
+                out[order] = total + np.repeat(opening - before, runs)
+            for a, last in zip(agents, order[lasts].tolist()):
+                held[a] = int(shares[last])
+                cash[a] = float(balance[last])
+
+            first = max(lo, start) - start
+            if first >= stop - start:
+                continue
+            rows = slice(2 * first, None)
+            yield pa.record_batch([
+                np.repeat(trades.column("trade_id", start, stop), 2)[rows],
+                np.repeat(trades.column("tick", start, stop), 2)[rows],
+                np.repeat(trades.column("timestamp", start, stop), 2)[rows],
+                agent[rows], row_price[rows], shares[rows], balance[rows],
+                (balance + shares * row_price - self.initial_cash)[rows],
+            ], schema=schema)
+
+class _ChunkSink:
+    """A write-only file object that hands over what was written since the last ``take()``."""
+
+    def __init__(self):
+        self.closed = False
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def _open_writer(sink, schema: "pa.Schema", fmt: str):
+    if fmt == "parquet":
+        return pq.ParquetWriter(sink, schema, compression="zstd")
+    if fmt == "arrow":
+        return pa.ipc.new_stream(sink, schema)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+def write_batches(path: str, batches: Iterator["pa.RecordBatch"], schema: "pa.Schema", fmt: str = "parquet") -> int:
+    """Writes ``batches`` to a file, one Parquet row group per batch; returns the rows written."""
+    _require_pyarrow()
+    rows = 0
+    with _open_writer(path, schema, fmt) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+def stream_batches(batches: Iterator["pa.RecordBatch"], schema: "pa.Schema", fmt: str = "parquet") -> Iterator[bytes]:
+    """Encodes ``batches`` as one Parquet file or Arrow stream, yielding bytes as each batch is written."""
+    _require_pyarrow()
+    sink = _ChunkSink()
+    writer = _open_writer(sink, schema, fmt)
+    for batch in batches:
+        writer.write_batch(batch)
+        yield sink.take()
+    writer.close()
+    yield sink.take()
+
+def export_history(view: HistoryView, directory: str, fmt: str = "parquet",
+                   chunk_rows: int = DEFAULT_CHUNK_ROWS) -> dict[str, int]:
+    """Writes every table of ``view`` to ``directory``; returns the rows written per file."""
+    os.makedirs(directory, exist_ok=True)
+    extension = "parquet" if fmt == "parquet" else "arrow"
+    written = {}
+    for table in EXPORT_TABLES:
+        path = os.path.join(directory, f"{table}.{extension}")
+        written[path] = write_batches(path, view.batches(table, chunk_rows=chunk_rows), table_schema(table), fmt)
+    return written
+
+def read_parquet(path: str, start_time: float | None = None, end_time: float | None = None,
+                 columns: list[str] | None = None, time_column: str = "timestamp") -> "pa.Table":
+    """Reads the rows of an exported Parquet file within ``[start_time, end_time)``.
+
+    Row groups whose ``time_column`` statistics fall outside the range are
+    skipped without being read.
+    """
+    _require_pyarrow()
+    filters = []
+    if start_time is not None:
+        filters.append((time_column, ">=", start_time))
+    if end_time is not None:
+        filters.append((time_column, "<", end_time))
+    return pq.read_table(path, columns=columns, filters=filters or None)
+
+def main():
+    from .agents import AGENT_TYPES
+    from .engine import SimulationEngine, build_agents, parse_counts
+
+    parser = argparse.ArgumentParser(description="Run a headless simulation and export its history.")
+    parser.add_argument("--ticks", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--agents", nargs="+", default=["LiquidityProvider=1", "NoiseTrader=2", "MarketTaker=2"],
+                        help=f"agent mix as Type=count pairs ({', '.join(AGENT_TYPES)})")
+    parser.add_argument("--out", default="export", help="directory to write the tables to")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="parquet")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--candles", default="ticks:1000", help="candle timeframe as unit:size")
+    parser.add_argument("--depth-levels", type=int, default=10)
+    parser.add_argument("--depth-every", type=int, default=1000, help="ticks between depth snapshots")
+    args = parser.parse_args()
+
+    if args.chunk_rows < 1:
+        parser.error("Chunk rows must be positive.")
+    try:
+        counts = parse_counts(args.agents)
+        depth = DepthHistory(args.depth_levels, args.depth_every)
+        engine = SimulationEngine(build_agents(counts), seed=args.seed, depth_history=depth)
+        aggregator = CandleAggregator(engine.trade_store, ())
+        unit, _, size = args.candles.partition(":")
+        candles = aggregator.register(unit, int(size))
+    except ValueError as e:
+        parser.error(str(e))
+    stats = engine.run(args.ticks)
+    aggregator.update()
+    view = HistoryView.capture(engine.trade_store, engine.order_book.grid, candles, depth, engine.ledger.initial_cash)
+    print(f"simulated {stats.ticks} ticks, {stats.trades} trades in {stats.elapsed:.2f}s")
+    for path, rows in export_history(view, args.out, args.format, args.chunk_rows).items():
+        print(f"{path}: {rows} rows")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import numpy as np
+from .columnar import ColumnStore
+from .models import Side, Trade
+
+SIDE_BUY = int(Side.BUY)
+SIDE_SELL = int(Side.SELL)
+SIDE_NAMES = tuple(side.label for side in Side)
+
+TRADE_SCHEMA = {
+    "trade_id": np.int64,
+    "price": np.float64,
+    "quantity": np.int64,
+    "aggressor_order_id": np.int64,
+    "resting_order_id": np.int64,
+    "aggressor_agent_id": np.int64,
+    "resting_agent_id": np.int64,
+    "side": np.int8,
+    "timestamp": np.float64,
+}
+
+class TradeColumns(ColumnStore):
+    """Trades stored column-wise, one row per fill."""
+
+    def __init__(self, capacity: int = 1024, schema: dict[str, np.dtype] = TRADE_SCHEMA):
+        super().__init__(schema, capacity)
+
+    def to_trades(self, start: int = 0, stop: int | None = None) -> list[Trade]:
+        """Materializes ``Trade`` objects for the rows in ``[start, stop)``."""
+        columns = {name: self.column(name, start, stop).tolist() for name in TRADE_SCHEMA}
+        sides = tuple(Side)
+        columns["side"] = [sides[side] for side in columns["side"]]
+        names = list(columns)
+        return [Trade(**dict(zip(names, row))) for row in zip(*columns.values())]
+
+    def to_records(self, start: int = 0, stop: int | None = None) -> list[dict]:
+        """Returns rows ``[start, stop)`` as plain dicts keyed by column name."""
+        columns = {name: values.tolist() for name, values in self.columns(start, stop).items()}
+        columns["side"] = [SIDE_NAMES[side] for side in columns["side"]]
+        names = list(columns)
+        return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+class FillBuffer(TradeColumns):
+    """A preallocated scratch buffer the matching engine writes fills into.
+
+    The buffer only grows when a sweep produces more fills than its
+    capacity; callers drain it with ``clear()`` once they have consumed
+    the rows.
+    """
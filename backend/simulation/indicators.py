@@ -0,0 +1,145 @@
+from collections import OrderedDict
+
+import numpy as np
+from .columnar import ColumnStore
+from .trade_store import TradeStore
+
+# Trades are folded in blocks of at most this many rows so that the
+# cumulative sums used for the rolling windows stay well conditioned.
+_BLOCK = 4096
+
+MAX_PERIOD = 10_000
+# Windows for periods other than the default ones are kept for the most
+# recently requested few only; an evicted window is rebuilt on demand.
+MAX_EXTRA_WINDOWS = 4
+
+class RollingWindow:
+    """Rolling mean and (population) standard deviation of trade prices.
+
+    Row ``j`` of ``series`` describes the window ending at trade ``j + period - 1``.
+    """
+
+    def __init__(self, period: int):
+        self.period = period
+        self.series = ColumnStore({"time": np.float64, "mean": np.float64, "std": np.float64})
+
+    def update(self, prices: np.ndarray, timestamps: np.ndarray, start: int, stop: int):
+        """Emits the windows ending at trades ``[start, stop)`` of the full price history."""
+        period = self.period
+        first = max(start, period - 1)
+        if first >= stop:
+            return
+        # Sums over a window are differences of cumulative sums taken from
+        # the first trade of the first window; prices are shifted by that
+        # trade's price to keep the sum of squares from cancelling.
+        shift = float(prices[first - period + 1])
+        values = prices[first - period + 1:stop] - shift
+        csum = np.concatenate(([0.0], np.cumsum(values)))
+        csq = np.concatenate(([0.0], np.cumsum(values * values)))
+        sums = csum[period:] - csum[:-period]
+        sumsq = csq[period:] - csq[:-period]
+        mean = sums / period
+        variance = np.maximum(sumsq / period - mean * mean, 0.0)
+        self.series.extend({
+            "time": timestamps[first:stop],
+            "mean": mean + shift,
+            "std": np.sqrt(variance),
+        })
+
+class IndicatorEngine:
+    """Keeps streaming indicators up to date as trades are appended to a ``TradeStore``.
+
+    ``update()`` folds in only the trades appended since the previous call,
+    so the cost per call is proportional to the new trades. Emitted series
+    are cached, and readers page through them by point index. The windows
+    of ``periods`` always stay live; at most ``MAX_EXTRA_WINDOWS`` others
+    are kept, least recently requested evicted first.
+    """
+
+    def __init__(self, trades: TradeStore, periods: tuple[int, ...] = (20,)):
+        self.trades = trades
+        self.windows: OrderedDict[int, RollingWindow] = OrderedDict()
+        self.default_periods = frozenset(periods)
+        self.processed = 0
+        self.total_volume = 0
+        # Welford/Chan state for the volatility of all trade prices.
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        for period in periods:
+            self.register(period)
+
+    def register(self, period: int) -> RollingWindow:
+        """Returns the window for ``period``, backfilling it from the history if it is new."""
+        if not 1 <= period <= MAX_PERIOD:
+            raise ValueError(f"Period must be between 1 and {MAX_PERIOD}.")
+        window = self.windows.get(period)
+        if window is None:
+            window = RollingWindow(period)
+            self._fold_window(window, 0, self.processed)
+            self.windows[period] = window
+            extra = [p for p in self.windows if p not in self.default_periods]
+            for evicted in extra[:-MAX_EXTRA_WINDOWS]:
+                del self.windows[evicted]
+        else:
+            self.windows.move_to_end(period)
+        return window
+
+    def _fold_window(self, window: RollingWindow, start: int, stop: int):
+        prices = self.trades.column("price")
+        timestamps = self.trades.column("timestamp")
+        for block_start in range(start, stop, _BLOCK):
+            window.update(prices, timestamps, block_start, min(block_start + _BLOCK, stop))
+
+    def update(self):
+        """Folds every trade appended to the store since the last call."""
+        start, stop = self.processed, len(self.trades)
+        if start == stop:
+            return
+        prices = self.trades.column("price", start, stop)
+        self.total_volume += int(self.trades.column("quantity", start, stop).sum())
+
+        count = len(prices)
+        mean = float(prices.mean())
+        m2 = float(((prices - mean) ** 2).sum())
+        total = self._count + count
+        delta = mean - self._mean
+        self._mean += delta * count / total
+        self._m2 += m2 + delta * delta * self._count * count / total
+        self._count = total
+
+        for window in self.windows.values():
+            self._fold_window(window, start, stop)
+        self.processed = stop
+
+    @property
+    def volatility(self) -> float:
+        """Sample standard deviation of all trade prices folded so far."""
+        if self._count < 2:
+            return 0.0
+        return float(np.sqrt(self._m2 / (self._count - 1)))
+
+    def length(self, period: int) -> int:
+        """Returns how many points the series for ``period`` has emitted."""
+        return len(self.register(period).series)
+
+    def sma(self, period: int, start: int = 0, stop: int | None = None) -> list[dict]:
+        """Returns SMA points ``[start, stop)`` of the series for ``period``."""
+        series = self.register(period).series
+        return [
+            {"time": t, "sma": m}
+            for t, m in zip(series.column("time", start, stop).tolist(), series.column("mean", start, stop).tolist())
+        ]
+
+    def bbands(self, period: int, std_dev: float, start: int = 0, stop: int | None = None) -> list[dict]:
+        """Returns Bollinger Band points ``[start, stop)`` of the series for ``period``."""
+        series = self.register(period).series
+        middle = series.column("mean", start, stop)
+        width = series.column("std", start, stop) * std_dev
+        return [
+            {"time": t, "upper": upper, "middle": m, "lower": lower}
+            for t, upper, m, lower in zip(
+                series.column("time", start, stop).tolist(), (middle + width).tolist(),
+                middle.tolist(), (middle - width).tolist(),
+            )
+        ]
@@ -0,0 +1,440 @@
+"""An append-only binary journal of everything that changes a simulation.
+
+A journal file is a 64-byte header followed by fixed-width records
+(``JOURNAL_DTYPE``): order submissions, cancels, agents joining and leaving,
+fills, and clock marks. Prices are stored as integer ticks. Records are
+written in order and their ``tick`` never decreases, so a journal can be
+opened zero-copy with ``read_journal`` (an ``np.memmap``) and sliced by tick
+with ``np.searchsorted``.
+
+Each record notes an event that happened after the simulation delivered
+the orders due on ``tick``. Submissions carry their delivery delay, so
+replaying a journal rebuilds the delivery queue as well as the book.
+
+Agents are described in a second file, ``<journal>.agents``: one JSON line
+per agent added, with its type name, latency, symbols and parameters.
+``AGENT_ADD`` records refer to their line by number.
+
+``JournalWriter.snapshot`` saves the book, the delivery queue and the agents
+with their accounts next to the journal as ``<journal>.<tick>.snap.npz``. ``replay``
+starts from the latest snapshot at or before the requested tick and only
+replays the records after it.
+
+Run from the ``backend`` directory to replay a journal and time it:
+
+    python -m simulation.journal run.journal --until 500000
+"""
+import argparse
+import glob
+import json
+import os
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from . import models
+from .accounting import Ledger
+from .agents import AGENT_TYPES, Agent
+from .matching_engine import MatchingEngine
+from .models import LIMIT, Order, OrderType, Side
+from .order_book import OrderBook
+from .scheduler import OrderScheduler
+from .ticks import TickGrid
+from .trade_store import TradeStore
+
+SUBMIT, CANCEL, AGENT_ADD, AGENT_REMOVE, FILL, CLOCK = range(6)
+
+JOURNAL_DTYPE = np.dtype([
+    ("kind", np.uint8),
+    ("side", np.uint8),
+    ("order_type", np.uint8),
+    ("tick", np.int64),
+    ("order_id", np.int64),  # the aggressor's order for FILL; the agent's line in the agent file for AGENT_ADD
+    ("agent_id", np.int64),  # the aggressor's agent for FILL
+    ("price", np.int64),  # ticks; 0 for market orders
+    ("quantity", np.int64),
+    ("delay", np.int64),  # SUBMIT: ticks until delivery; AGENT_ADD: the agent's latency
+    ("trade_id", np.int64),
+    ("resting_order_id", np.int64),
+    ("resting_agent_id", np.int64),
+    ("timestamp", np.float64),
+], align=True)
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("tick_size", np.float64),
+    ("record_size", np.uint32),
+    ("reserved", "V44"),
+])
+MAGIC = b"MMSJRNL2"
+
+ACCOUNT_DTYPE = np.dtype([
+    ("agent_id", np.int64),
+    ("cash", np.float64),
+    ("shares", np.int64),
+    ("avg_price", np.float64),
+    ("realized_pnl", np.float64),
+    ("volume", np.int64),
+])
+LINK_DTYPE = np.dtype([("source", np.int64), ("target", np.int64), ("volume", np.int64)])
+
+# The TradeStore column behind each field of a FILL record; prices are stored in ticks.
+FILL_COLUMNS = {
+    "side": "side",
+    "tick": "tick",
+    "order_id": "aggressor_order_id",
+    "agent_id": "aggressor_agent_id",
+    "quantity": "quantity",
+    "trade_id": "trade_id",
+    "resting_order_id": "resting_order_id",
+    "resting_agent_id": "resting_agent_id",
+}
+
+SIDES = tuple(Side)
+ORDER_TYPES = tuple(OrderType)
+
+def _order_row(kind: int, tick: int, order: Order, delay: int = 0) -> tuple:
+    return (kind, order.side, order.order_type, tick, order.order_id, order.agent_id,
+            order.price or 0, order.quantity, delay, 0, 0, 0, order.timestamp)
+
+def _agent_spec(agent: Agent) -> dict:
+    return {"type": type(agent).__name__, "agent_id": agent.agent_id, "latency": agent.latency,
+            "symbols": list(agent.symbols) if agent.symbols is not None else None, "params": agent.params}
+
+def _make_agent(spec: dict) -> Agent:
+    agent_class = AGENT_TYPES.get(spec["type"])
+    if agent_class is None:
+        raise ValueError(f"The journal has agents of type {spec['type']}, which is not registered.")
+    return agent_class(spec["agent_id"], spec["latency"], spec["symbols"], **spec["params"])
+
+class JournalWriter:
+    """Appends records to a journal file through an in-memory buffer.
+
+    Events are buffered one by one as they happen. Fills are not: the
+    caller hands over a range of its ``TradeStore`` with ``trades()``
+    whenever convenient before the next ``flush()``, so the hot path pays
+    nothing extra for them. Fills are the first records of their tick (they
+    come from delivering the orders due on it), which is how ``flush()``
+    puts everything back in order before writing it.
+    """
+
+    def __init__(self, path: str, tick_size: float, append: bool = False):
+        self.path = path
+        self.agents_path = f"{path}.agents"
+        self.grid = TickGrid(tick_size)
+        if append and os.path.exists(path):
+            header, records = read_journal(path)
+            if header["tick_size"] != tick_size:
+                raise ValueError(f"Journal {path} uses tick size {header['tick_size']}, not {tick_size}.")
+            self.records = len(records)
+            self._file = open(path, "r+b")
+            self._file.seek(HEADER_DTYPE.itemsize + self.records * JOURNAL_DTYPE.itemsize)
+            self._file.truncate()  # drop a partial record left by a crash
+            self.agent_specs = _truncate_agents(self.agents_path)
+        else:
+            self.records = 0
+            self._file = open(path, "wb")
+            header = np.zeros(1, dtype=HEADER_DTYPE)
+            header["magic"] = MAGIC
+            header["tick_size"] = tick_size
+            header["record_size"] = JOURNAL_DTYPE.itemsize
+            self._file.write(header.tobytes())
+            self.agent_specs = 0
+            open(self.agents_path, "w").close()
+        self._agents_file = open(self.agents_path, "a")
+        self._rows: list[tuple] = []
+        self._blocks: list[np.ndarray] = []
+
+    def submit(self, tick: int, order: Order, delay: int):
+        """Records an order sent on ``tick`` that reaches the book ``delay`` ticks later."""
+        self._rows.append(_order_row(SUBMIT, tick, order, delay))
+
+    def cancel(self, tick: int, order_id: int):
+        self._rows.append((CANCEL, 0, 0, tick, order_id, 0, 0, 0, 0, 0, 0, 0, time.time()))
+
+    def agent_added(self, tick: int, agent: Agent):
+        # The agent's line is written straight away, so it is on disk before the record naming it.
+        self._agents_file.write(json.dumps(_agent_spec(agent)) + "\n")
+        self._agents_file.flush()
+        self._rows.append((AGENT_ADD, 0, 0, tick, self.agent_specs, agent.agent_id, 0, 0, agent.latency,
+                           0, 0, 0, time.time()))
+        self.agent_specs += 1
+
+    def agent_removed(self, tick: int, agent_id: int):
+        self._rows.append((AGENT_REMOVE, 0, 0, tick, 0, agent_id, 0, 0, 0, 0, 0, 0, time.time()))
+
+    def clock(self, tick: int):
+        """Marks that every tick up to and including ``tick`` has been processed."""
+        self._rows.append((CLOCK, 0, 0, tick, 0, 0, 0, 0, 0, 0, 0, 0, time.time()))
+
+    def trades(self, trade_store: TradeStore, start: int, stop: int | None = None):
+        """Records trades ``[start, stop)`` of ``trade_store`` as fills."""
+        columns = trade_store.columns(start, stop)
+        block = np.zeros(len(columns["tick"]), dtype=JOURNAL_DTYPE)
+        if not len(block):
+            return
+        block["kind"] = FILL
+        for field, column in FILL_COLUMNS.items():
+            block[field] = columns[column]
+        block["price"] = self.grid.to_ticks_array(columns["price"])
+        block["timestamp"] = columns["timestamp"]
+        self._blocks.append(block)
+
+    def flush(self):
+        block = np.array(self._rows, dtype=JOURNAL_DTYPE)
+        if self._blocks:
+            block = np.concatenate([*self._blocks, block])
+            # A stable sort on (tick, fills first) restores the order events happened in.
+            block = block[np.argsort(block["tick"] * 2 + (block["kind"] != FILL), kind="stable")]
+        self._file.write(block.tobytes())
+        self.records += len(block)
+        self._rows = []
+        self._blocks = []
+        self._file.flush()
+
+    def snapshot(self, tick: int, order_book: OrderBook, scheduler: OrderScheduler,
+                 ledger: Ledger, agents: list[Agent], next_trade_id: int) -> str:
+        """Saves the state reached after processing every tick before ``tick``."""
+        self.flush()
+        book_rows = [_order_row(SUBMIT, tick, order) for side in (order_book.bids, order_book.asks) for order in side]
+        pending_rows = [_order_row(SUBMIT, due, order) for due, order in scheduler.pending()]
+        accounts = np.array([
+            (agent.agent_id, account.cash, account.shares, account.avg_price, account.realized_pnl, account.volume)
+            for agent in agents
+            for account in (ledger.accounts[agent.agent_id],)
+        ], dtype=ACCOUNT_DTYPE)
+        links = np.array([(a, b, volume) for (a, b), volume in ledger.links.items()], dtype=LINK_DTYPE)
+        path = f"{self.path}.{tick}.snap.npz"
+        np.savez(
+            path,
+            meta=np.array([tick, self.records, next_trade_id, models.peek_order_id()], dtype=np.int64),
+            book=np.array(book_rows, dtype=JOURNAL_DTYPE),
+            pending=np.array(pending_rows, dtype=JOURNAL_DTYPE),
+            agents=np.array(json.dumps([_agent_spec(agent) for agent in agents])),
+            accounts=accounts,
+            links=links,
+        )
+        return path
+
+    def close(self):
+        self.flush()
+        self._file.close()
+        self._agents_file.close()
+
+def _truncate_agents(path: str) -> int:
+    """Drops a partial last line left by a crash and returns the number of agents in the file."""
+    if not os.path.exists(path):
+        return 0
+    with open(path, "r+b") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        f.truncate(end)
+    return data.count(b"\n", 0, end)
+
+def read_agents(path: str) -> list[dict]:
+    """Returns the agents described next to the journal at ``path``, by line number."""
+    agents_path = f"{path}.agents"
+    if not os.path.exists(agents_path):
+        return []
+    with open(agents_path) as f:
+        return [json.loads(line) for line in f if line.endswith("\n")]
+
+def read_journal(path: str) -> tuple[np.void, np.ndarray]:
+    """Returns the header and a read-only, zero-copy view of every complete record."""
+    header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    if not len(header) or header[0]["magic"] != MAGIC:
+        raise ValueError(f"{path} is not a simulation journal.")
+    header = header[0]
+    if header["record_size"] != JOURNAL_DTYPE.itemsize:
+        raise ValueError(f"{path} has {header['record_size']}-byte records, expected {JOURNAL_DTYPE.itemsize}.")
+    count = (os.path.getsize(path) - HEADER_DTYPE.itemsize) // JOURNAL_DTYPE.itemsize
+    if count == 0:
+        return header, np.empty(0, dtype=JOURNAL_DTYPE)
+    records = np.memmap(path, dtype=JOURNAL_DTYPE, mode="r", offset=HEADER_DTYPE.itemsize, shape=(count,))
+    return header, records
+
+def list_snapshots(path: str) -> list[tuple[int, str]]:
+    """Returns ``(tick, file)`` for every snapshot of the journal at ``path``, oldest first."""
+    snapshots = []
+    for file in glob.glob(glob.escape(path) + ".*.snap.npz"):
+        tick = file[len(path) + 1:-len(".snap.npz")]
+        if tick.isdigit():
+            snapshots.append((int(tick), file))
+    return sorted(snapshots)
+
+@dataclass
+class ReplayState:
+    """A simulation rebuilt from a journal, as of ``tick``."""
+    tick: int
+    records: int  # journal records consumed
+    order_book: OrderBook
+    matching_engine: MatchingEngine
+    scheduler: OrderScheduler
+    ledger: Ledger
+    trade_store: TradeStore
+    agents: list[Agent]
+
+def _order_from_row(side: int, order_type: int, order_id: int, agent_id: int, price: int,
+                    quantity: int, timestamp: float) -> Order:
+    order_type = ORDER_TYPES[order_type]
+    order = Order.unchecked(SIDES[side], quantity, order_type, agent_id,
+                            price if order_type is LIMIT else None)
+    order.order_id = order_id
+    order.timestamp = timestamp
+    return order
+
+def _restore(state: ReplayState, path: str) -> int:
+    """Loads a snapshot into ``state`` and returns the journal offset it was taken at."""
+    with np.load(path) as snapshot:
+        tick, offset, next_trade_id, next_order_id = snapshot["meta"].tolist()
+        for row in snapshot["book"].tolist():
+            state.order_book.add_order(_order_from_row(*row[1:3], *row[4:8], row[12]))
+        for row in snapshot["pending"].tolist():
+            state.scheduler.schedule(row[3], _order_from_row(*row[1:3], *row[4:8], row[12]))
+        state.agents.extend(_make_agent(spec) for spec in json.loads(str(snapshot["agents"])))
+        for agent_id, cash, shares, avg_price, realized, volume in snapshot["accounts"].tolist():
+            account = state.ledger.open(agent_id)
+            account.cash, account.shares, account.avg_price = cash, shares, avg_price
+            account.realized_pnl, account.volume = realized, volume
+        state.ledger.links = {(a, b): volume for a, b, volume in snapshot["links"].tolist()}
+    state.tick = tick
+    state.matching_engine.next_trade_id = next_trade_id
+    models.skip_order_ids(next_order_id - 1)
+    return offset
+
+def _check_fills(replayed: TradeStore, recorded: np.ndarray, grid: TickGrid):
+    """Raises ``ValueError`` unless ``replayed`` holds the fills of the ``recorded`` FILL records."""
+    if len(replayed) != len(recorded):
+        raise ValueError(f"Replay produced {len(replayed)} fills, the journal recorded {len(recorded)}.")
+    columns = replayed.columns()
+    for field, values in (("price", grid.to_ticks_array(columns["price"])),
+                          *((field, columns[column]) for field, column in FILL_COLUMNS.items())):
+        differs = np.flatnonzero(values != recorded[field])
+        if len(differs):
+            row = int(differs[0])
+            raise ValueError(f"Replayed fill {row} has {field} {values[row]}, the journal recorded {recorded[field][row]}.")
+
+def replay(path: str, until: int | None = None, use_snapshots: bool = True) -> ReplayState:
+    """Rebuilds the simulation recorded in ``path`` as it stood before tick ``until``.
+
+    Without ``until`` the whole journal is replayed. Orders are fed through a
+    real ``MatchingEngine``; the trade history is read straight from the
+    journal's fill records, and a ``ValueError`` is raised if the engine does
+    not reproduce every one of them (timestamps aside).
+    """
+    header, records = read_journal(path)
+    specs = read_agents(path)
+    ticks = records["tick"]
+    end = len(records) if until is None else int(np.searchsorted(ticks, until, side="left"))
+    order_book = OrderBook(float(header["tick_size"]))
+    state = ReplayState(
+        tick=0, records=end, order_book=order_book, matching_engine=MatchingEngine(order_book),
+        scheduler=OrderScheduler(), ledger=Ledger(), trade_store=TradeStore(), agents=[],
+    )
+
+    start = 0
+    if use_snapshots:
+        for tick, snapshot in reversed(list_snapshots(path)):
+            if until is None or tick <= until:
+                start = _restore(state, snapshot)
+                if start > end:
+                    raise ValueError(f"Snapshot {snapshot} is ahead of the journal.")
+                break
+
+    engine = state.matching_engine
+    fills = engine.fills
+    scheduler = state.scheduler
+    ledger = state.ledger
+    agents = state.agents
+    replayed = TradeStore()
+    delivered = state.tick - 1  # the last tick whose due orders have reached the book
+
+    def deliver(through: int):
+        nonlocal delivered
+        if through <= delivered:
+            return
+        while (due := scheduler.next_tick()) is not None and due <= through:
+            # An order sent on a tick with no latency reaches the book on the next one.
+            at = max(due, delivered + 1)
+            for order in scheduler.pop_due(due):
+                engine.match(order)
+            if fills.size:
+                ledger.apply(fills)
+                replayed.append_fills(fills, at)
+                fills.clear()
+        delivered = through
+
+    last_tick = state.tick - 1
+    max_order_id = 0
+    chunk = 65536
+    for chunk_start in range(start, end, chunk):
+        block = records[chunk_start:min(chunk_start + chunk, end)]
+        rows = zip(*(block[name].tolist() for name in (
+            "kind", "side", "order_type", "tick", "order_id", "agent_id",
+            "price", "quantity", "delay", "timestamp")))
+        for kind, side, order_type, tick, order_id, agent_id, price, quantity, delay, timestamp in rows:
+            if kind == FILL:
+                continue
+            deliver(tick)
+            last_tick = tick
+            if kind == SUBMIT:
+                order = _order_from_row(side, order_type, order_id, agent_id, price, quantity, timestamp)
+                scheduler.schedule(tick + delay, order)
+                max_order_id = max(max_order_id, order_id)
+            elif kind == CANCEL:
+                if not order_book.cancel_order(order_id):
+                    scheduler.cancel(order_id)
+            elif kind == AGENT_ADD:
+                agents.append(_make_agent(specs[order_id]))
+                ledger.open(agent_id)
+            elif kind == AGENT_REMOVE:
+                state.agents = agents = [agent for agent in agents if agent.agent_id != agent_id]
+                ledger.close(agent_id)
+    if end > start:
+        last_tick = max(last_tick, int(ticks[end - 1]))
+    if until is not None:
+        last_tick = max(last_tick, until - 1)
+    deliver(last_tick)
+    state.tick = last_tick + 1
+
+    fill_rows = records[:end][records["kind"][:end] == FILL]
+    _check_fills(replayed, records[start:end][records["kind"][start:end] == FILL], order_book.grid)
+    if len(fill_rows):
+        state.trade_store.extend({
+            "trade_id": fill_rows["trade_id"],
+            "price": order_book.grid.to_prices(fill_rows["price"]),
+            "quantity": fill_rows["quantity"],
+            "aggressor_order_id": fill_rows["order_id"],
+            "resting_order_id": fill_rows["resting_order_id"],
+            "aggressor_agent_id": fill_rows["agent_id"],
+            "resting_agent_id": fill_rows["resting_agent_id"],
+            "side": fill_rows["side"],
+            "timestamp": fill_rows["timestamp"],
+            "tick": fill_rows["tick"],
+        })
+        engine.next_trade_id = max(engine.next_trade_id, int(fill_rows["trade_id"][-1]) + 1)
+    models.skip_order_ids(max_order_id)
+    return state
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a simulation journal and report its final state.")
+    parser.add_argument("journal")
+    parser.add_argument("--until", type=int, default=None, help="stop before this tick")
+    parser.add_argument("--no-snapshots", action="store_true", help="replay from tick 0")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    state = replay(args.journal, args.until, use_snapshots=not args.no_snapshots)
+    elapsed = time.perf_counter() - started
+    book = state.order_book
+    print(f"tick:         {state.tick}")
+    print(f"records:      {state.records}")
+    print(f"trades:       {len(state.trade_store)}")
+    print(f"resting:      {len(book.bids)} bids, {len(book.asks)} asks")
+    print(f"pending:      {len(state.scheduler)}")
+    print(f"agents:       {len(state.agents)}")
+    print(f"elapsed:      {elapsed:.2f}s ({state.records / elapsed if elapsed > 0 else float('inf'):,.0f} records/sec)")
+
+if __name__ == "__main__":
+    main()
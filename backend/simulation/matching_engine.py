@@ -1,58 +1,107 @@
-from .models import Order, Trade
-from .order_book import OrderBook
+import time
+import numpy as np
+from .fills import SIDE_BUY, SIDE_SELL, FillBuffer
+from .models import BUY, LIMIT, Order, Trade
+from .order_book import BookSide, OrderBook
 
 class MatchingEngine:
-    """The engine that matches incoming orders against the order book."""
+    """The engine that matches incoming orders against the order book.
 
-    def __init__(self, order_book: OrderBook):
+    Fills are written into ``self.fills``, an array-backed ``FillBuffer``.
+    ``match`` leaves them there for the caller to consume in bulk, while
+    ``process_order`` materializes them as ``Trade`` objects.
+    """
+
+    def __init__(self, order_book: OrderBook, fills: FillBuffer | None = None):
         self.order_book = order_book
+        self.fills = fills if fills is not None else FillBuffer()
+        self.next_trade_id = 1
 
     def process_order(self, order: Order) -> list[Trade]:
         """Processes a new order and returns a list of trades executed."""
-        trades = []
-        if order.side == "buy":
-            trades = self._match_order(order, self.order_book.asks)
+        start = self.fills.size
+        self.match(order)
+        trades = self.fills.to_trades(start)
+        self.fills.size = start
+        return trades
+
+    def match(self, order: Order, rest: bool = True) -> int:
+        """Processes a new order, records its fills in ``self.fills`` and returns the fill count.
+
+        With ``rest=False`` the unfilled remainder of a limit order is left
+        for the caller to add to the book.
+        """
+        if order.side is BUY:
+            filled = self._match_order(order, self.order_book.asks)
         else:  # 'sell'
-            trades = self._match_order(order, self.order_book.bids)
-        
+            filled = self._match_order(order, self.order_book.bids)
+
         # If a limit order is not fully filled, add it to the book
-        if order.order_type == "limit" and order.quantity > 0:
+        if rest and order.order_type is LIMIT and order.quantity > 0:
             self.order_book.add_order(order)
-        
-        return trades
 
-    def _match_order(self, order: Order, opposite_side_book: list[Order]) -> list[Trade]:
-        """Generic matching logic for both buy and sell orders."""
-        trades = []
-        while order.quantity > 0 and opposite_side_book:
-            best_match = opposite_side_book[0]
-            
-            can_match = False
-            if order.side == "buy" and (order.order_type == "market" or order.price >= best_match.price):
-                can_match = True
-            elif order.side == "sell" and (order.order_type == "market" or order.price <= best_match.price):
-                can_match = True
-
-            if not can_match:
-                break 
-            
-            trade_quantity = min(order.quantity, best_match.quantity)
-            trade_price = best_match.price
-
-            trades.append(Trade(
-                price=trade_price,
-                quantity=trade_quantity,
-                aggressor_order_id=order.order_id,
-                resting_order_id=best_match.order_id,
-                aggressor_agent_id=order.agent_id,     # New
-                resting_agent_id=best_match.agent_id, # New
-                side=order.side
-            ))
-            
-            order.quantity -= trade_quantity
-            best_match.quantity -= trade_quantity
-            
-            if best_match.quantity == 0:
-                opposite_side_book.pop(0)
-        
-        return trades
\ No newline at end of file
+        return filled
+
+    def _match_order(self, order: Order, opposite_side_book: BookSide) -> int:
+        """Generic matching logic for both buy and sell orders.
+
+        Drains price levels front to back and writes each fill straight into
+        the fill buffer columns; no per-fill objects are created.
+        """
+        if not opposite_side_book:
+            return 0
+        is_buy = order.side is BUY
+        limit = order.price if order.order_type is LIMIT else None
+        fills = self.fills
+        to_price = self.order_book.grid.to_price
+        start = n = fills.size
+        remaining = order.quantity
+        quantities = resting_orders = resting_agents = None
+
+        while remaining > 0 and opposite_side_book:
+            level = opposite_side_book.best_level()
+            trade_price = level.price
+            if limit is not None and (limit < trade_price if is_buy else limit > trade_price):
+                break
+
+            # Only the per-fill columns are written inside the loop; columns
+            # that are constant per level or per sweep are filled as slices.
+            orders = level.orders
+            level_start = n
+            level_remaining = remaining
+            while remaining > 0:
+                if quantities is None or n == fills.capacity:
+                    if n == fills.capacity:
+                        fills.size = n
+                        fills.grow()
+                    quantities = fills.quantity
+                    resting_orders = fills.resting_order_id
+                    resting_agents = fills.resting_agent_id
+
+                best_match = orders[0]
+                trade_quantity = min(remaining, best_match.quantity)
+                quantities[n] = trade_quantity
+                resting_orders[n] = best_match.order_id
+                resting_agents[n] = best_match.agent_id
+                n += 1
+
+                remaining -= trade_quantity
+                best_match.quantity -= trade_quantity
+                if best_match.quantity == 0:
+                    opposite_side_book.pop_front(level)
+                    if level.count == 0:
+                        break
+            fills.price[level_start:n] = to_price(trade_price)
+            opposite_side_book.filled(level, level_remaining - remaining)
+
+        order.quantity = remaining
+        count = n - start
+        if count:
+            fills.trade_id[start:n] = np.arange(self.next_trade_id, self.next_trade_id + count)
+            fills.aggressor_order_id[start:n] = order.order_id
+            fills.aggressor_agent_id[start:n] = order.agent_id
+            fills.side[start:n] = SIDE_BUY if is_buy else SIDE_SELL
+            fills.timestamp[start:n] = time.time()
+            self.next_trade_id += count
+        fills.size = n
+        return count
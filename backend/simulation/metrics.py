@@ -0,0 +1,148 @@
+"""Process-wide counters and latency histograms, rendered in the Prometheus text format.
+
+Metrics are plain objects updated in place: ``Counter.inc`` adds to a float
+and ``Histogram.observe`` bisects a short tuple of bucket bounds, so timing
+a phase costs two ``perf_counter`` calls and one ``observe``. ``METRICS`` is
+the registry the API serves at ``/metrics``.
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable
+
+# Upper bounds in seconds, from 1 us to 1 s.
+DEFAULT_BUCKETS = (
+    1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+    1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0,
+)
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class Counter:
+    """A monotonically increasing count."""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: dict[str, str] | None = None):
+        self.name = name
+        self.help = help
+        self.labels = labels or {}
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labels)} {_format_value(self.value)}"]
+
+class Gauge:
+    """A value read from ``read`` whenever the metrics are rendered."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, read: Callable[[], float], labels: dict[str, str] | None = None):
+        self.name = name
+        self.help = help
+        self.labels = labels or {}
+        self.read = read
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labels)} {_format_value(self.read())}"]
+
+class Histogram:
+    """Counts observations into fixed buckets; ``counts[i]`` holds those in ``(bounds[i-1], bounds[i]]``."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: dict[str, str] | None = None,
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels or {}
+        self.bounds = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self) -> "_Timer":
+        """Returns a context manager that observes the time spent inside it."""
+        return _Timer(self)
+
+    def samples(self) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.bounds, float("inf")), self.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{self.name}_bucket{_format_labels({**self.labels, 'le': le})} {cumulative}")
+        labels = _format_labels(self.labels)
+        lines.append(f"{self.name}_sum{labels} {_format_value(self.sum)}")
+        lines.append(f"{self.name}_count{labels} {self.count}")
+        return lines
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+class MetricsRegistry:
+    """Metrics by name and labels. Asking twice for the same metric returns the same object."""
+
+    def __init__(self):
+        self._metrics: dict[tuple, Counter | Gauge | Histogram] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, factory, name: str, help: str, labels: dict[str, str], **kwargs):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = self._metrics[key] = factory(name, help, labels=labels, **kwargs)
+            return metric
+
+    def counter(self, name: str, help: str, **labels: str) -> Counter:
+        return self._get(Counter, name, help, labels)
+
+    def histogram(self, name: str, help: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS, **labels: str) -> Histogram:
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def gauge(self, name: str, help: str, read: Callable[[], float], **labels: str) -> Gauge:
+        return self._get(Gauge, name, help, labels, read=read)
+
+    def render(self) -> str:
+        """Returns every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        last_name = None
+        for metric in metrics:
+            if metric.name != last_name:
+                lines.append(f"# HELP {metric.name} {metric.help}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+                last_name = metric.name
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+METRICS = MetricsRegistry()
+
+PHASE_HELP = "Time spent in one phase of a simulation step."
+
+def phase_histogram(phase: str, registry: MetricsRegistry = METRICS) -> Histogram:
+    """Returns the latency histogram of one step phase (``mms_phase_seconds{phase=...}``)."""
+    return registry.histogram("mms_phase_seconds", PHASE_HELP, phase=phase)
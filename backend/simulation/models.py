@@ -1,34 +1,118 @@
 import time
 import itertools
 from dataclasses import dataclass, field
-from typing import Literal
+from enum import IntEnum
+from .ticks import TickGrid
 
 order_id_counter = itertools.count(1)
-OrderType = Literal["market", "limit"]
-Side = Literal["buy", "sell"]
 
-@dataclass
+# The instrument of single-book simulations; see simulation/exchange.py for several.
+DEFAULT_SYMBOL = "SIM"
+
+def skip_order_ids(last_id: int):
+    """Makes new orders get ids above ``last_id``, e.g. after restoring a journal."""
+    global order_id_counter
+    order_id_counter = itertools.count(max(last_id + 1, next(order_id_counter)))
+
+def peek_order_id() -> int:
+    """Returns the id the next order will get, without using it up."""
+    global order_id_counter
+    next_id = next(order_id_counter)
+    order_id_counter = itertools.count(next_id)
+    return next_id
+
+class _NamedIntEnum(IntEnum):
+    """An IntEnum that can also be looked up by its lower-case name, e.g. ``Side("buy")``."""
+
+    @classmethod
+    def _missing_(cls, value):
+        if isinstance(value, str):
+            return cls.__members__.get(value.upper())
+        return None
+
+    @property
+    def label(self) -> str:
+        return self.name.lower()
+
+class Side(_NamedIntEnum):
+    """Order side; the values match the ``side`` column of trade records."""
+    BUY = 0
+    SELL = 1
+
+class OrderType(_NamedIntEnum):
+    MARKET = 0
+    LIMIT = 1
+
+# Looking up an enum member through its class is slow on CPython 3.11, so
+# hot paths use these module-level aliases instead of ``Side.BUY`` etc.
+BUY, SELL = Side.BUY, Side.SELL
+MARKET, LIMIT = OrderType.MARKET, OrderType.LIMIT
+
+@dataclass(slots=True)
 class Order:
-    """Represents a single order in the market."""
+    """Represents a single order in the market.
+
+    ``side`` and ``order_type`` may be given as enum members or as their
+    names ("buy", "limit", ...); they are stored as enum members. ``price``
+    is in integer ticks of the book's tick size, and ``symbol`` names the
+    instrument the order is for.
+    """
     side: Side
     quantity: int
     order_type: OrderType
     agent_id: int
-    price: float | None = None
+    price: int | None = None
+    symbol: str = DEFAULT_SYMBOL
     order_id: int = field(init=False, default_factory=lambda: next(order_id_counter))
     timestamp: float = field(init=False, default_factory=time.time)
 
     def __post_init__(self):
-        if self.order_type == "limit" and self.price is None:
+        if type(self.side) is not Side:
+            self.side = Side(self.side)
+        if type(self.order_type) is not OrderType:
+            self.order_type = OrderType(self.order_type)
+        if self.order_type is LIMIT and self.price is None:
             raise ValueError("Limit orders must have a price.")
-        if self.order_type == "market" and self.price is not None:
+        if self.order_type is MARKET and self.price is not None:
             raise ValueError("Market orders should not have a price.")
         if self.quantity <= 0:
             raise ValueError("Order quantity must be positive.")
 
+    @classmethod
+    def unchecked(cls, side: Side, quantity: int, order_type: OrderType, agent_id: int,
+                  price: int | None = None, symbol: str = DEFAULT_SYMBOL) -> "Order":
+        """Builds an order from already valid, enum-typed fields without validating them.
+
+        For orders created inside the engine; anything built from outside
+        input should go through the normal constructor.
+        """
+        order = object.__new__(cls)
+        order.side = side
+        order.quantity = quantity
+        order.order_type = order_type
+        order.agent_id = agent_id
+        order.price = price
+        order.symbol = symbol
+        order.order_id = next(order_id_counter)
+        order.timestamp = time.time()
+        return order
+
+    def to_dict(self, grid: TickGrid) -> dict:
+        """Returns the order as JSON-ready fields, with side and type as names and a float price."""
+        return {
+            "side": self.side.label,
+            "quantity": self.quantity,
+            "order_type": self.order_type.label,
+            "agent_id": self.agent_id,
+            "price": grid.to_price(self.price) if self.price is not None else None,
+            "symbol": self.symbol,
+            "order_id": self.order_id,
+            "timestamp": self.timestamp,
+        }
+
 trade_id_counter = itertools.count(1)
 
-@dataclass
+@dataclass(slots=True)
 class Trade:
     """Represents a single executed trade."""
     price: float
@@ -38,5 +122,5 @@ class Trade:
     aggressor_agent_id: int # New
     resting_agent_id: int  # New
     side: Side
-    trade_id: int = field(init=False, default_factory=lambda: next(trade_id_counter))
-    timestamp: float = field(init=False, default_factory=time.time)
\ No newline at end of file
+    trade_id: int = field(default_factory=lambda: next(trade_id_counter))
+    timestamp: float = field(default_factory=time.time)
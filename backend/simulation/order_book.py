@@ -1,50 +1,266 @@
-from .models import Order
+import bisect
+from collections import deque
+from itertools import islice
+from .models import BUY, Order
+from .ticks import DEFAULT_TICK_SIZE, TickGrid
+
+class PriceLevel:
+    """A FIFO queue of resting orders that share a single price (in ticks)."""
+
+    __slots__ = ("price", "orders", "count", "volume")
+
+    def __init__(self, price: int):
+        self.price = price
+        self.orders: deque[Order] = deque()
+        self.count = 0  # live (not cancelled) orders in the queue
+        self.volume = 0  # total remaining quantity of the live orders
+
+class DepthLog:
+    """A bounded log of the price levels whose volume changed, one version per change.
+
+    Only the side and price are recorded; the volume is read from the book
+    when the changes are collected, so repeated changes to one level
+    collapse into its latest volume.
+    """
+
+    def __init__(self, capacity: int = 65536):
+        self.version = 0
+        self.entries: deque[tuple[bool, int]] = deque(maxlen=capacity)
+
+    def record(self, is_bid: bool, price: int):
+        self.entries.append((is_bid, price))
+        self.version += 1
+
+    def covers(self, version: int) -> bool:
+        """Whether every change after ``version`` is still in the log."""
+        return self.version - len(self.entries) <= version <= self.version
+
+    def changed_since(self, version: int) -> tuple[set[int], set[int]]:
+        """Returns the bid and ask prices changed after ``version``."""
+        bids, asks = set(), set()
+        for is_bid, price in islice(reversed(self.entries), self.version - version):
+            (bids if is_bid else asks).add(price)
+        return bids, asks
+
+class BookSide:
+    """One side of the book: price levels keyed by a sorted price index.
+
+    The index is kept so that the best level is always the last element,
+    which makes removing an exhausted best level an O(1) ``list.pop()``.
+    Cancelled orders are dropped from the book's order map immediately and
+    skipped lazily when they reach the front of their level's queue; a
+    level whose queue holds more than twice as many orders as are live is
+    compacted, so cancel churn behind the front cannot grow it unbounded.
+    Each level also keeps its aggregate volume, and every volume change is
+    recorded in the book's ``DepthLog``.
+    """
+
+    def __init__(self, is_bid: bool, live_orders: dict[int, Order], log: DepthLog):
+        self.is_bid = is_bid
+        self.levels: dict[int, PriceLevel] = {}
+        self._keys: list[int] = []  # ascending; best level last
+        self._live = live_orders
+        self._log = log
+        self._count = 0
+
+    def _key(self, price: int) -> int:
+        return price if self.is_bid else -price
+
+    def add(self, order: Order) -> PriceLevel:
+        """Appends an order to the back of its price level, creating it if needed."""
+        level = self.levels.get(order.price)
+        if level is None:
+            level = PriceLevel(order.price)
+            self.levels[order.price] = level
+            bisect.insort(self._keys, self._key(order.price))
+        level.orders.append(order)
+        level.count += 1
+        level.volume += order.quantity
+        self._count += 1
+        self._log.record(self.is_bid, order.price)
+        return level
+
+    def discard(self, order: Order):
+        """Accounts for an order that left the book through a cancel."""
+        level = self.levels[order.price]
+        level.count -= 1
+        level.volume -= order.quantity
+        self._count -= 1
+        self._log.record(self.is_bid, order.price)
+        if level.count == 0:
+            self._remove_level(level)
+        elif len(level.orders) > 2 * level.count:
+            self._compact(level)
+
+    def _compact(self, level: PriceLevel):
+        live = self._live
+        orders = [order for order in level.orders if order.order_id in live]
+        level.orders.clear()
+        level.orders.extend(orders)
+
+    def filled(self, level: PriceLevel, quantity: int):
+        """Accounts for ``quantity`` traded against ``level`` in one sweep."""
+        level.volume -= quantity
+        self._log.record(self.is_bid, level.price)
+
+    def _remove_level(self, level: PriceLevel):
+        del self.levels[level.price]
+        key = self._key(level.price)
+        i = bisect.bisect_left(self._keys, key)
+        del self._keys[i]
+
+    def best_level(self) -> PriceLevel | None:
+        """Returns the best price level with its front order live, or None."""
+        if not self._keys:
+            return None
+        key = self._keys[-1]
+        level = self.levels[key if self.is_bid else -key]
+        orders = level.orders
+        while orders[0].order_id not in self._live:
+            orders.popleft()
+        return level
+
+    def pop_front(self, level: PriceLevel) -> Order:
+        """Removes the (fully filled) front order of ``level``."""
+        order = level.orders.popleft()
+        del self._live[order.order_id]
+        level.count -= 1
+        self._count -= 1
+        if level.count == 0:
+            self.levels.pop(level.price)
+            self._keys.pop()
+        else:
+            orders = level.orders
+            while orders[0].order_id not in self._live:
+                orders.popleft()
+        return order
+
+    def best_price(self) -> int | None:
+        """Returns the best price in ticks on this side, or None if it is empty."""
+        if not self._keys:
+            return None
+        key = self._keys[-1]
+        return key if self.is_bid else -key
+
+    def volume_at(self, price: int) -> int:
+        level = self.levels.get(price)
+        return level.volume if level is not None else 0
+
+    def depth(self, n: int | None = None) -> list[tuple[int, int]]:
+        """Returns ``(price, volume)`` for the best ``n`` levels (all if None), best first."""
+        keys = self._keys
+        top = keys[::-1] if n is None else keys[:-n - 1:-1] if n > 0 else []
+        levels = self.levels
+        sign = 1 if self.is_bid else -1
+        return [(sign * key, levels[sign * key].volume) for key in top]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __bool__(self) -> bool:
+        return self._count > 0
+
+    def __iter__(self):
+        """Iterates live orders in price-time priority."""
+        live = self._live
+        for key in reversed(self._keys):
+            level = self.levels[key if self.is_bid else -key]
+            for order in level.orders:
+                if order.order_id in live:
+                    yield order
+
+    def __getitem__(self, index):
+        """Supports ``side[0]`` and ``side[:n]`` without materializing the side."""
+        if isinstance(index, slice):
+            if index.step is None and (index.start or 0) >= 0 and (index.stop or 0) >= 0:
+                return list(islice(self, index.start, index.stop))
+            return list(self)[index]
+        if index < 0:
+            return list(self)[index]
+        for order in islice(self, index, None):
+            return order
+        raise IndexError("book side index out of range")
 
 class OrderBook:
-    """A class to represent the order book for a single asset."""
+    """A class to represent the order book for a single asset.
 
-    def __init__(self):
-        """Initializes empty lists for bids and asks."""
-        self.bids: list[Order] = []
-        self.asks: list[Order] = []
+    Prices are integer ticks of ``grid.tick_size``; ``get_depth`` and
+    ``get_depth_changes`` report them as floats.
+    """
+
+    def __init__(self, tick_size: float = DEFAULT_TICK_SIZE):
+        """Initializes empty price-level ladders for bids and asks."""
+        self.grid = TickGrid(tick_size)
+        self.orders: dict[int, Order] = {}
+        self.depth_log = DepthLog()
+        self.bids = BookSide(is_bid=True, live_orders=self.orders, log=self.depth_log)
+        self.asks = BookSide(is_bid=False, live_orders=self.orders, log=self.depth_log)
+
+    @property
+    def version(self) -> int:
+        """Increases with every change to the volume at some price level."""
+        return self.depth_log.version
 
     def add_order(self, order: Order):
-        """Adds a limit order to the book and sorts it by price-time priority."""
-        if order.side == "buy":
-            self.bids.append(order)
-            self.bids.sort(key=lambda o: (-o.price, o.timestamp))
+        """Adds a limit order to the back of its price level (price-time priority)."""
+        self.orders[order.order_id] = order
+        if order.side is BUY:
+            self.bids.add(order)
         else:  # 'sell'
-            self.asks.append(order)
-            self.asks.sort(key=lambda o: (o.price, o.timestamp))
+            self.asks.add(order)
 
     def cancel_order(self, order_id: int) -> bool:
         """Removes an order from the book given its ID."""
-        # Search bids
-        for i, order in enumerate(self.bids):
-            if order.order_id == order_id:
-                del self.bids[i]
-                return True
-        
-        # Search asks
-        for i, order in enumerate(self.asks):
-            if order.order_id == order_id:
-                del self.asks[i]
-                return True
-        
-        return False # Order not found
-
-    def get_best_bid(self) -> float | None:
-        """Returns the highest bid price, or None if no bids exist."""
-        return self.bids[0].price if self.bids else None
-
-    def get_best_ask(self) -> float | None:
-        """Returns the lowest ask price, or None if no asks exist."""
-        return self.asks[0].price if self.asks else None
-
-    def get_spread(self) -> float | None:
-        """Returns the difference between the best ask and best bid."""
+        order = self.orders.pop(order_id, None)
+        if order is None:
+            return False # Order not found
+        if order.side is BUY:
+            self.bids.discard(order)
+        else:
+            self.asks.discard(order)
+        return True
+
+    def get_depth(self, levels: int | None = None) -> dict:
+        """Returns the aggregated volume of the best ``levels`` price levels per side."""
+        to_price = self.grid.to_price
+        return {
+            "bids": [{"price": to_price(p), "volume": v} for p, v in self.bids.depth(levels)],
+            "asks": [{"price": to_price(p), "volume": v} for p, v in self.asks.depth(levels)],
+        }
+
+    def get_depth_changes(self, since: int) -> dict:
+        """Returns the levels whose volume changed after version ``since``.
+
+        Levels are ``[price, volume]`` pairs, with volume 0 for a level that
+        is gone. If the log no longer reaches back to ``since``, the full
+        ladder is returned with ``snapshot`` set.
+        """
+        to_price = self.grid.to_price
+        if not self.depth_log.covers(since):
+            return {
+                "version": self.version, "snapshot": True,
+                "bids": [[to_price(p), v] for p, v in self.bids.depth()],
+                "asks": [[to_price(p), v] for p, v in self.asks.depth()],
+            }
+        bids, asks = self.depth_log.changed_since(since)
+        return {
+            "version": self.version, "snapshot": False,
+            "bids": [[to_price(p), self.bids.volume_at(p)] for p in sorted(bids, reverse=True)],
+            "asks": [[to_price(p), self.asks.volume_at(p)] for p in sorted(asks)],
+        }
+
+    def get_best_bid(self) -> int | None:
+        """Returns the highest bid price in ticks, or None if no bids exist."""
+        return self.bids.best_price()
+
+    def get_best_ask(self) -> int | None:
+        """Returns the lowest ask price in ticks, or None if no asks exist."""
+        return self.asks.best_price()
+
+    def get_spread(self) -> int | None:
+        """Returns the difference between the best ask and best bid, in ticks."""
         best_bid = self.get_best_bid()
         best_ask = self.get_best_ask()
         if best_bid is not None and best_ask is not None:
             return best_ask - best_bid
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,101 @@
+from dataclasses import dataclass
+
+import numpy as np
+from .agents import Agent
+from .models import BUY, LIMIT, MARKET, SELL, Order
+from .ticks import TickGrid
+
+class Population:
+    """The agents of a simulation, grouped into one cohort per agent type.
+
+    Each cohort keeps its members' parameters as NumPy columns, so one
+    ``decide`` call per type covers every decision its members make over a
+    batch of ticks. Ticks pick an agent uniformly at random, as before;
+    the population is rebuilt whenever agents join or leave.
+    """
+
+    def __init__(self, agents: list[Agent]):
+        self.agents = agents
+        self.agent_ids = np.array([agent.agent_id for agent in agents], dtype=np.int64)
+        self.latency = np.array([agent.latency for agent in agents], dtype=np.int64)
+        types = [type(agent) for agent in agents]
+        self.cohorts: list[tuple[type[Agent], np.ndarray, dict[str, np.ndarray]]] = []
+        self.cohort_of = np.zeros(len(agents), dtype=np.int64)
+        self.member_of = np.zeros(len(agents), dtype=np.int64)
+        for cohort, agent_type in enumerate(dict.fromkeys(types)):
+            members = np.array([i for i, t in enumerate(types) if t is agent_type], dtype=np.int64)
+            params = {name: np.array([agents[i].params[name] for i in members.tolist()], dtype=np.float64)
+                      for name in agent_type.defaults}
+            self.cohorts.append((agent_type, members, params))
+            self.cohort_of[members] = cohort
+            self.member_of[members] = np.arange(len(members))
+
+    def __len__(self) -> int:
+        return len(self.agents)
+
+    def draw(self, rng: np.random.Generator, n: int, grid: TickGrid) -> "Decisions":
+        """Picks the agent of each of the next ``n`` ticks and draws its decision."""
+        columns = self.draw_columns(rng, n)
+        return Decisions(
+            columns["selected"].tolist(), columns["agent_id"].tolist(), columns["latency"].tolist(),
+            columns["acts"].tolist(), columns["is_buy"].tolist(), columns["quantity"].tolist(),
+            columns["is_limit"].tolist(), columns["scale"].tolist(), columns["offset"].tolist(),
+            grid.to_ticks_array(columns["fallback"]).tolist(),
+        )
+
+    def draw_columns(self, rng: np.random.Generator, n: int) -> dict[str, np.ndarray]:
+        """Like ``draw``, but returns the decisions as NumPy columns (``fallback`` as a price)."""
+        selected = rng.integers(0, len(self.agents), n)
+        acts = np.zeros(n, dtype=bool)
+        is_buy = np.zeros(n, dtype=bool)
+        quantity = np.zeros(n, dtype=np.int64)
+        is_limit = np.zeros(n, dtype=bool)
+        scale = np.ones(n)
+        offset = np.zeros(n, dtype=np.int64)
+        fallback = np.zeros(n)
+        cohort_of = self.cohort_of[selected]
+        for cohort, (agent_type, members, params) in enumerate(self.cohorts):
+            rows = np.flatnonzero(cohort_of == cohort)
+            if not len(rows):
+                continue
+            chosen = self.member_of[selected[rows]]
+            drawn = agent_type.decide(rng, len(rows), {name: values[chosen] for name, values in params.items()})
+            acts[rows] = drawn["acts"]
+            is_buy[rows] = drawn["is_buy"]
+            quantity[rows] = drawn["quantity"]
+            is_limit[rows] = drawn["is_limit"]
+            scale[rows] = drawn["scale"]
+            offset[rows] = drawn["offset"]
+            fallback[rows] = drawn["fallback"]
+        return {
+            "selected": selected, "agent_id": self.agent_ids[selected], "latency": self.latency[selected],
+            "acts": acts, "is_buy": is_buy, "quantity": quantity, "is_limit": is_limit,
+            "scale": scale, "offset": offset, "fallback": fallback,
+        }
+
+@dataclass(slots=True)
+class Decisions:
+    """The decisions drawn for a batch of ticks, one Python list per column."""
+    selected: list[int]  # index into Population.agents
+    agent_id: list[int]
+    latency: list[int]
+    acts: list[bool]
+    is_buy: list[bool]
+    quantity: list[int]
+    is_limit: list[bool]
+    scale: list[float]
+    offset: list[int]
+    fallback: list[int]  # ticks
+
+    def order(self, k: int, best_bid: int | None, best_ask: int | None) -> Order | None:
+        """Returns the order decided for tick ``k`` of the batch, priced against the given best prices."""
+        if not self.acts[k]:
+            return None
+        if self.is_buy[k]:
+            side, reference = BUY, best_bid
+        else:
+            side, reference = SELL, best_ask
+        if not self.is_limit[k]:
+            return Order.unchecked(side, self.quantity[k], MARKET, self.agent_id[k])
+        price = round((reference or self.fallback[k]) * self.scale[k]) + self.offset[k]
+        return Order.unchecked(side, self.quantity[k], LIMIT, self.agent_id[k], price)
@@ -0,0 +1,61 @@
+import heapq
+from .models import Order
+
+class OrderScheduler:
+    """Delayed orders keyed by the tick on which they reach the matching engine.
+
+    Orders due on the same tick share a bucket and come out in the order they
+    were scheduled. A heap of bucket ticks finds the next due bucket in
+    O(log n), so a tick with nothing due costs O(1). Cancels remove the order
+    from the pending map in O(1); the stale bucket entry is skipped when
+    its bucket is popped.
+    """
+
+    def __init__(self):
+        self._buckets: dict[int, list[Order]] = {}
+        self._ticks: list[int] = []
+        self._pending: dict[int, Order] = {}
+
+    def schedule(self, tick: int, order: Order):
+        """Queues ``order`` to become due on ``tick``."""
+        bucket = self._buckets.get(tick)
+        if bucket is None:
+            bucket = self._buckets[tick] = []
+            heapq.heappush(self._ticks, tick)
+        bucket.append(order)
+        self._pending[order.order_id] = order
+
+    def pop_due(self, tick: int) -> list[Order]:
+        """Removes and returns every order due on or before ``tick``, oldest tick first."""
+        due = []
+        ticks = self._ticks
+        pending = self._pending
+        while ticks and ticks[0] <= tick:
+            for order in self._buckets.pop(heapq.heappop(ticks)):
+                if pending.pop(order.order_id, None) is not None:
+                    due.append(order)
+        return due
+
+    def next_tick(self) -> int | None:
+        """Returns the earliest tick that has orders scheduled, or None."""
+        return self._ticks[0] if self._ticks else None
+
+    def pending(self) -> list[tuple[int, Order]]:
+        """Returns every pending order with its due tick, in delivery order."""
+        pending = self._pending
+        return [
+            (tick, order)
+            for tick in sorted(self._buckets)
+            for order in self._buckets[tick]
+            if order.order_id in pending
+        ]
+
+    def cancel(self, order_id: int) -> bool:
+        """Withdraws a scheduled order; returns False if it is not pending."""
+        return self._pending.pop(order_id, None) is not None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def __contains__(self, order_id: int) -> bool:
+        return order_id in self._pending
@@ -0,0 +1,112 @@
+"""A bounded queue of NumPy record batches in shared memory, for passing work between processes."""
+import multiprocessing
+import os
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+POLL_INTERVAL = 0.5  # seconds a blocked call waits between checks that the other end is alive
+
+class PeerExited(RuntimeError):
+    """Raised by a blocked ``SharedQueue`` call when the process at the other end has exited."""
+
+class SharedQueue:
+    """A single-producer, single-consumer ring of ``slots`` slots of up to ``slot_rows`` records.
+
+    ``put`` copies a batch into the next free slot and ``get`` copies it
+    out, so records never go through pickling; two semaphores count the
+    free and the filled slots. Besides record batches, a slot can carry a
+    bare signal: ``put_signal(code)`` with a negative ``code`` makes the
+    consumer's ``get`` return that code instead of an array. The queue is
+    passed to the consumer process as a ``Process`` argument, before either
+    end has used it.
+
+    Blocked calls raise ``PeerExited`` once the other end is gone: the
+    creating process watches the ``Process`` set as ``peer``, and the other
+    end watches its parent, the creator.
+    """
+
+    def __init__(self, dtype: np.dtype, slot_rows: int = 65536, slots: int = 4, context=None):
+        context = context or multiprocessing.get_context()
+        self.dtype = np.dtype(dtype)
+        self.slot_rows = slot_rows
+        self.slots = slots
+        self._shm = SharedMemory(create=True, size=slots * 8 + slots * slot_rows * self.dtype.itemsize)
+        self._creator = os.getpid()
+        self._free = context.Semaphore(slots)
+        self._filled = context.Semaphore(0)
+        self._next = 0  # the next slot this end writes (producer) or reads (consumer)
+        self.peer: multiprocessing.Process | None = None
+        self._attach()
+
+    def _attach(self):
+        buffer = self._shm.buf
+        self._lengths = np.ndarray((self.slots,), dtype=np.int64, buffer=buffer)
+        self._records = np.ndarray((self.slots, self.slot_rows), dtype=self.dtype, buffer=buffer,
+                                   offset=self.slots * 8)
+
+    def __getstate__(self) -> dict:
+        return {"dtype": self.dtype, "slot_rows": self.slot_rows, "slots": self.slots, "name": self._shm.name,
+                "creator": self._creator, "free": self._free, "filled": self._filled}
+
+    def __setstate__(self, state: dict):
+        self.dtype = state["dtype"]
+        self.slot_rows = state["slot_rows"]
+        self.slots = state["slots"]
+        self._shm = SharedMemory(name=state["name"])
+        # Only the creating process unlinks the segment; keep this attach
+        # from being tracked (and unlinked) as if it were ours.
+        resource_tracker.unregister(self._shm._name, "shared_memory")
+        self._creator = state["creator"]
+        self._free = state["free"]
+        self._filled = state["filled"]
+        self._next = 0
+        self.peer = None
+        self._attach()
+
+    def _peer_alive(self) -> bool:
+        if self.peer is not None:
+            return self.peer.is_alive()
+        return os.getpid() == self._creator or os.getppid() == self._creator
+
+    def _acquire(self, semaphore):
+        while not semaphore.acquire(timeout=POLL_INTERVAL):
+            if not self._peer_alive():
+                raise PeerExited("The process at the other end of the shared queue has exited.")
+
+    def put(self, records: np.ndarray):
+        """Enqueues ``records``, split over as many slots as needed; blocks while the ring is full."""
+        for start in range(0, len(records), self.slot_rows):
+            chunk = records[start:start + self.slot_rows]
+            self._acquire(self._free)
+            slot = self._next
+            self._records[slot, :len(chunk)] = chunk
+            self._lengths[slot] = len(chunk)
+            self._next = (slot + 1) % self.slots
+            self._filled.release()
+
+    def put_signal(self, code: int):
+        """Enqueues a signal; ``code`` must be negative."""
+        self._acquire(self._free)
+        slot = self._next
+        self._lengths[slot] = code
+        self._next = (slot + 1) % self.slots
+        self._filled.release()
+
+    def get(self) -> np.ndarray | int:
+        """Dequeues the next batch (a copy), or the code of a signal; blocks while the ring is empty."""
+        self._acquire(self._filled)
+        slot = self._next
+        length = int(self._lengths[slot])
+        batch = length if length < 0 else self._records[slot, :length].copy()
+        self._next = (slot + 1) % self.slots
+        self._free.release()
+        return batch
+
+    def close(self):
+        """Releases the mapping; the creating process also removes the segment."""
+        self._lengths = self._records = None
+        self._shm.close()
+        if os.getpid() == self._creator:
+            self._shm.unlink()
@@ -0,0 +1,201 @@
+"""Parallel Monte Carlo parameter sweeps over agent mix, latency and seed.
+
+Every scenario is an independent ``SimulationEngine`` run in a worker
+process. Each finished run is appended to a JSON-lines checkpoint as soon as
+it completes, so a crashed worker or an interrupted sweep loses nothing that
+already finished. Re-running the command resumes from the checkpoint: runs
+are matched by a digest of their scenario, so only the scenarios that did
+not change are reused. Runs recorded as failed are run again.
+The sweep ends by writing all summaries to one columnar ``.npz`` file.
+
+Run from the ``backend`` directory:
+
+    python -m simulation.sweep --ticks 100000 --seeds 1 2 3 \\
+        --counts '{"NoiseTrader": [2, 8], "MarketTaker": [1, 4], "LiquidityProvider": [1]}' \\
+        --latency '{"NoiseTrader": [1, 5]}' --out sweep.npz
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from .agents import AGENT_TYPES
+from .engine import SimulationEngine, build_agents
+
+def expand_grid(counts: dict[str, list[int]], latency: dict[str, list[int]],
+                seeds: list[int], ticks: int) -> list[dict]:
+    """Returns one scenario per combination of agent counts, latencies and seed."""
+    count_names, latency_names = list(counts), list(latency)
+    scenarios = []
+    for count_values in itertools.product(*counts.values()):
+        for latency_values in itertools.product(*latency.values()):
+            for seed in seeds:
+                scenarios.append({
+                    "run_id": len(scenarios),
+                    "seed": seed,
+                    "ticks": ticks,
+                    "counts": dict(zip(count_names, count_values)),
+                    "latency": dict(zip(latency_names, latency_values)),
+                })
+    return scenarios
+
+def scenario_key(scenario: dict) -> str:
+    """Returns a digest of everything that determines a scenario's result."""
+    spec = {name: value for name, value in scenario.items() if name != "run_id"}
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+
+def run_scenario(scenario: dict) -> dict:
+    """Runs one scenario in the current process and returns its summary row."""
+    agents = build_agents(scenario["counts"])
+    for agent in agents:
+        agent.latency = scenario["latency"].get(type(agent).__name__, agent.latency)
+    engine = SimulationEngine(agents, seed=scenario["seed"])
+    stats = engine.run(scenario["ticks"])
+    prices = engine.trade_store.column("price")
+    returns = np.diff(np.log(prices)) if len(prices) > 1 else np.empty(0)
+    row = {
+        "run_id": scenario["run_id"],
+        "scenario_key": scenario_key(scenario),
+        "seed": scenario["seed"],
+        "ticks": stats.ticks,
+        "orders": stats.orders,
+        "trades": stats.trades,
+        "volume": stats.volume,
+        "mean_spread": stats.mean_spread if stats.mean_spread is not None else float("nan"),
+        "price_std": float(prices.std()) if len(prices) else float("nan"),
+        "return_std": float(returns.std()) if len(returns) else float("nan"),
+        "last_price": stats.last_price if stats.last_price is not None else float("nan"),
+        "ticks_per_sec": stats.ticks_per_sec,
+        "failed": False,
+    }
+    for name in AGENT_TYPES:
+        row[f"count_{name}"] = scenario["counts"].get(name, 0)
+        row[f"latency_{name}"] = scenario["latency"].get(name, AGENT_TYPES[name].latency)
+    return row
+
+def _failed_row(scenario: dict) -> dict:
+    return {"run_id": scenario["run_id"], "scenario_key": scenario_key(scenario), "seed": scenario["seed"],
+            "ticks": scenario["ticks"], "failed": True}
+
+def load_checkpoint(path: str) -> dict[str, dict]:
+    """Returns the rows already recorded in a checkpoint file, keyed by scenario digest."""
+    rows = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    if "scenario_key" in row:  # rows from older sweeps cannot be matched
+                        rows[row["scenario_key"]] = row
+    return rows
+
+def _run_pool(scenarios: list[dict], workers: int, record) -> tuple[list[dict], list[dict]]:
+    """Runs scenarios in one pool, with at most ``workers`` of them submitted at a time.
+
+    If a worker dies, returns the runs that were in flight, which went down
+    with the pool, and the runs not yet submitted; otherwise two empty lists.
+    """
+    waiting = scenarios[::-1]
+    crashed = []
+    broken = False
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = {}
+        while (waiting or in_flight) and not broken:
+            while waiting and len(in_flight) < workers:
+                try:
+                    future = pool.submit(run_scenario, waiting[-1])
+                except BrokenProcessPool:
+                    broken = True
+                    break
+                in_flight[future] = waiting.pop()
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            if broken or any(isinstance(future.exception(), BrokenProcessPool) for future in finished):
+                broken = True
+                finished = wait(in_flight).done
+            for future in finished:
+                scenario = in_flight.pop(future)
+                try:
+                    record(future.result())
+                except BrokenProcessPool:
+                    crashed.append(scenario)
+                except Exception:
+                    record(_failed_row(scenario))
+    return crashed, waiting[::-1]
+
+def run_sweep(scenarios: list[dict], checkpoint: str, workers: int | None = None) -> list[dict]:
+    """Runs every scenario not already finished in ``checkpoint`` across a process pool.
+
+    Scenarios recorded as failed, including crashed runs, are run again.
+
+    A worker that dies takes the runs in flight in its pool down with it.
+    The runs it had not started yet go on in a fresh pool of ``workers``;
+    the ones in flight are retried one at a time in single-worker pools, so
+    only the run that actually crashes is recorded as failed.
+    """
+    workers = workers or os.cpu_count() or 1
+    done = load_checkpoint(checkpoint)
+    todo = [scenario for scenario in scenarios
+            if done.get(scenario_key(scenario), {"failed": True})["failed"]]
+
+    with open(checkpoint, "a") as out:
+        def record(row: dict):
+            done[row["scenario_key"]] = row
+            out.write(json.dumps(row) + "\n")
+            out.flush()
+
+        suspects = []
+        while todo:
+            crashed, todo = _run_pool(todo, workers, record)
+            suspects += crashed
+        for scenario in suspects:
+            crashed, _ = _run_pool([scenario], 1, record)
+            if crashed:
+                record(_failed_row(scenario))
+    # A reused row keeps its result but takes the run id of the current grid.
+    return [{**done[scenario_key(scenario)], "run_id": scenario["run_id"]} for scenario in scenarios]
+
+def write_columns(rows: list[dict], path: str):
+    """Writes summary rows to ``path`` as one NumPy array per column (``.npz``)."""
+    names = list(dict.fromkeys(name for row in rows for name in row))
+    columns = {}
+    for name in names:
+        values = [row.get(name) for row in rows]
+        if all(isinstance(v, str) for v in values):
+            columns[name] = np.array(values)
+        elif all(isinstance(v, bool) for v in values if v is not None):
+            columns[name] = np.array([bool(v) for v in values])
+        elif all(isinstance(v, int) for v in values):
+            columns[name] = np.array(values, dtype=np.int64)
+        else:
+            columns[name] = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    np.savez(path, **columns)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a parallel parameter sweep of headless simulations.")
+    parser.add_argument("--ticks", type=int, default=100_000)
+    parser.add_argument("--seeds", type=int, nargs="+", default=[1])
+    parser.add_argument("--counts", type=json.loads, default={"LiquidityProvider": [1], "NoiseTrader": [2], "MarketTaker": [2]},
+                        help='JSON mapping agent type to a list of counts')
+    parser.add_argument("--latency", type=json.loads, default={},
+                        help='JSON mapping agent type to a list of latencies')
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default="sweep.npz")
+    args = parser.parse_args()
+
+    for name in list(args.counts) + list(args.latency):
+        if name not in AGENT_TYPES:
+            parser.error(f"Invalid agent type: {name}")
+    scenarios = expand_grid(args.counts, args.latency, args.seeds, args.ticks)
+    checkpoint = args.out + ".partial.jsonl"
+    rows = run_sweep(scenarios, checkpoint, workers=args.workers)
+    write_columns(rows, args.out)
+    failed = sum(1 for row in rows if row["failed"])
+    print(f"{len(rows)} runs ({failed} failed) written to {args.out}")
+
+if __name__ == "__main__":
+    main()
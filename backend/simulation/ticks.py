@@ -0,0 +1,41 @@
+import numpy as np
+
+DEFAULT_TICK_SIZE = 0.01
+
+class TickGrid:
+    """Converts between float prices and integer prices counted in ticks.
+
+    Everything inside the book, the matching engine and the agents works in
+    integer ticks; floats only appear where prices leave the simulation.
+    When the tick size divides one exactly (0.01, 0.05, 0.25, ...), ticks are
+    converted by dividing by the ticks per unit, which gives the same float
+    as writing the price out in decimal (``10007 / 100 == 100.07``).
+    """
+
+    def __init__(self, tick_size: float = DEFAULT_TICK_SIZE):
+        if tick_size <= 0:
+            raise ValueError("Tick size must be positive.")
+        self.tick_size = tick_size
+        per_unit = round(1 / tick_size)
+        self._per_unit = per_unit if per_unit and abs(per_unit * tick_size - 1) < 1e-9 else 0
+
+    def to_ticks(self, price: float) -> int:
+        """Returns the nearest whole number of ticks to ``price``."""
+        if self._per_unit:
+            return round(price * self._per_unit)
+        return round(price / self.tick_size)
+
+    def to_price(self, ticks: int) -> float:
+        if self._per_unit:
+            return ticks / self._per_unit
+        return ticks * self.tick_size
+
+    def to_ticks_array(self, prices: np.ndarray) -> np.ndarray:
+        if self._per_unit:
+            return np.rint(prices * self._per_unit).astype(np.int64)
+        return np.rint(prices / self.tick_size).astype(np.int64)
+
+    def to_prices(self, ticks: np.ndarray) -> np.ndarray:
+        if self._per_unit:
+            return ticks / self._per_unit
+        return ticks * self.tick_size
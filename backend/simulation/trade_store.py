@@ -0,0 +1,23 @@
+import numpy as np
+from .fills import TRADE_SCHEMA, FillBuffer, TradeColumns
+
+class TradeStore(TradeColumns):
+    """The append-only trade history of a simulation, stored column-wise.
+
+    On top of the fill columns every trade records the simulation ``tick``
+    it executed on. Readers use ``column()``/``columns()`` for zero-copy
+    NumPy views and ``to_records()`` when they need JSON-ready rows.
+    """
+
+    def __init__(self, capacity: int = 4096):
+        super().__init__(capacity, {**TRADE_SCHEMA, "tick": np.int64})
+
+    def append_fills(self, fills: FillBuffer, tick: int = 0):
+        """Appends every row currently held in ``fills`` in one bulk copy."""
+        if fills.size:
+            self.extend({**fills.columns(), "tick": tick})
+
+    @property
+    def last_price(self) -> float | None:
+        """Returns the price of the most recent trade, or None if there are none."""
+        return float(self.price[self.size - 1]) if self.size else None
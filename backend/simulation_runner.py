@@ -59,11 +59,11 @@ def main():
     print("\n--- Final Order Book State ---")
     print(f"Bids: {len(order_book.bids)} levels")
     for order in order_book.bids[:5]:
-        print(f"  Price: {order.price:.2f}, Qty: {order.quantity}")
+        print(f"  Price: {order_book.grid.to_price(order.price):.2f}, Qty: {order.quantity}")
 
     print(f"\nAsks: {len(order_book.asks)} levels")
     for order in order_book.asks[:5]:
-        print(f"  Price: {order.price:.2f}, Qty: {order.quantity}")
+        print(f"  Price: {order_book.grid.to_price(order.price):.2f}, Qty: {order.quantity}")
 
 
 if __name__ == "__main__":
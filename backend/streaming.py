@@ -0,0 +1,155 @@
+import asyncio
+from typing import Awaitable, Callable
+
+from fastapi import WebSocket
+
+from responses import encode_json
+
+# A client that falls this many trades behind stops receiving trades over
+# the socket and is told to resync them from /data/trades instead.
+MAX_PENDING_TRADES = 5000
+
+class ClientStream:
+    """The outbox of one WebSocket client.
+
+    Updates are merged into the outbox as they are offered: trades are
+    appended, while the book, PnL, metrics and interaction views keep only
+    their latest value. A slow consumer therefore receives fewer, larger
+    messages and never sees the intermediate book snapshots it fell behind
+    on. Book depth arrives as the levels that changed since the book version
+    in ``depth_version`` (see ``OrderBook.get_depth_changes``); the changes
+    waiting in the outbox are merged level by level.
+    """
+
+    def __init__(self):
+        self._wakeup = asyncio.Event()
+        self._trades: list[dict] = []
+        self._trades_cursor = 0
+        self._resync = False
+        self._latest: dict = {}
+        self.depth_version = -1  # the book version of the depth offered last; -1 asks for a snapshot
+        self._depth: dict | None = None
+
+    def offer(self, update: dict, depth: dict | None = None):
+        """Merges one step's update and depth changes into the outbox. Runs on the event loop."""
+        if update.get("reset"):
+            self._trades.clear()
+            self._resync = False
+            self._depth = None
+        if depth is not None:
+            self._merge_depth(depth)
+        trades = update.get("trades", [])
+        if self._resync or len(self._trades) + len(trades) > MAX_PENDING_TRADES:
+            self._trades.clear()
+            self._resync = True
+        else:
+            self._trades.extend(trades)
+        self._trades_cursor = update["trades_cursor"]
+        for key, value in update.items():
+            if key not in ("trades", "trades_cursor"):
+                self._latest[key] = value
+        self._wakeup.set()
+
+    def _merge_depth(self, changes: dict):
+        pending = self._depth
+        if pending is None or changes["snapshot"]:
+            pending = self._depth = {"snapshot": changes["snapshot"], "bids": {}, "asks": {}}
+        for side in ("bids", "asks"):
+            pending[side].update(changes[side])
+
+    def _drain(self) -> dict:
+        message = {"type": "update", **self._latest, "trades_cursor": self._trades_cursor}
+        if self._depth is not None:
+            message["depth"] = {"snapshot": self._depth["snapshot"],
+                                **{side: [[price, volume] for price, volume in self._depth[side].items()]
+                                   for side in ("bids", "asks")}}
+            self._depth = None
+        if self._resync:
+            message["resync_trades"] = True
+        else:
+            message["trades"] = self._trades
+        self._trades = []
+        self._resync = False
+        self._latest = {}
+        return message
+
+    async def send_loop(self, websocket: WebSocket):
+        """Sends the merged outbox whenever there is something new."""
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            await websocket.send_text(encode_json(self._drain()).decode())
+
+class EventHub:
+    """Fans simulation updates out to every connected WebSocket client.
+
+    ``publish`` may be called from any thread; it hands the update to the
+    event loop that serves the sockets.
+    """
+
+    def __init__(self):
+        self.clients: set[ClientStream] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def connect(self) -> ClientStream:
+        self._loop = asyncio.get_running_loop()
+        client = ClientStream()
+        self.clients.add(client)
+        return client
+
+    def disconnect(self, client: ClientStream):
+        self.clients.discard(client)
+
+    def publish(self, update: dict, depth_changes: Callable[[int], dict] | None = None,
+                clients: list[ClientStream] | None = None):
+        """Offers ``update`` to ``clients`` (every client by default).
+
+        ``depth_changes(since)`` returns the book's depth changes after
+        version ``since``; each client is offered those after the version it
+        was offered last, computed once per distinct version. Call it while
+        the book cannot change.
+        """
+        if self._loop is None:
+            return
+        changes_since: dict[int, dict] = {}
+        for client in list(self.clients) if clients is None else clients:
+            depth = None
+            if depth_changes is not None:
+                depth = changes_since.get(client.depth_version)
+                if depth is None:
+                    depth = changes_since[client.depth_version] = depth_changes(client.depth_version)
+                client.depth_version = depth["version"]
+            self._loop.call_soon_threadsafe(client.offer, update, depth)
+
+    def resync_depth(self):
+        """Makes the next depth offered to every client a full snapshot, for a book that was replaced."""
+        for client in list(self.clients):
+            client.depth_version = -1
+
+    async def serve(self, websocket: WebSocket, on_connect: Callable[[ClientStream], Awaitable] | None = None):
+        """Streams updates to ``websocket`` until the client goes away.
+
+        ``on_connect(client)`` is awaited once the client is registered,
+        e.g. to publish it a first update.
+        """
+        await websocket.accept()
+        client = self.connect()
+        sender = receiver = None
+        try:
+            if on_connect is not None:
+                await on_connect(client)
+            sender = asyncio.create_task(client.send_loop(websocket))
+            receiver = asyncio.create_task(self._receive_until_closed(websocket))
+            await asyncio.wait((sender, receiver), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self.disconnect(client)
+            for task in (sender, receiver):
+                if task is not None:
+                    task.cancel()
+
+    @staticmethod
+    async def _receive_until_closed(websocket: WebSocket):
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
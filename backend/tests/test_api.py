@@ -0,0 +1,76 @@
+"""Endpoint checks through the ASGI app: sessions that have not traded yet, and bad input."""
+import pytest
+from fastapi.testclient import TestClient
+
+import app
+
+client = TestClient(app.app)
+
+EMPTY_SERIES = (
+    "/data/trades",
+    "/data/price-history",
+    "/data/candlestick",
+    "/data/indicators/sma",
+    "/data/indicators/bbands",
+)
+
+@pytest.fixture
+def session_path():
+    session_id = client.post("/sessions").json()["session_id"]
+    yield f"/sessions/{session_id}"
+    client.delete(f"/sessions/{session_id}")
+
+@pytest.mark.parametrize("path", EMPTY_SERIES)
+def test_history_endpoints_on_a_new_session(session_path, path):
+    response = client.get(session_path + path)
+    assert response.status_code == 200
+    assert response.json()["items"] == []
+
+@pytest.mark.parametrize("unit, timeframe", [("trades", 10), ("trades", 7), ("ticks", 50)])
+def test_candles_before_the_first_trade(session_path, unit, timeframe):
+    response = client.get(session_path + "/data/candlestick", params={"unit": unit, "timeframe": timeframe})
+    assert response.status_code == 200
+    assert response.json() == {"start": 0, "cursor": 0, "items": [], "current": None}
+
+def test_candles_after_a_reset(session_path):
+    client.post(session_path + "/simulation/step", json={"count": 500}).raise_for_status()
+    assert client.get(session_path + "/data/candlestick").json()["current"] is not None
+    client.post(session_path + "/simulation/reset").raise_for_status()
+    response = client.get(session_path + "/data/candlestick")
+    assert response.status_code == 200
+    assert response.json()["current"] is None
+
+@pytest.mark.parametrize("path", (
+    "/data/book", "/data/book/depth", "/data/book/depth/changes", "/data/agent-interactions",
+    "/data/market-metrics", "/agents", "/agents/pnl",
+))
+def test_snapshot_endpoints_on_a_new_session(session_path, path):
+    assert client.get(session_path + path).status_code == 200
+
+@pytest.mark.parametrize("count", [0, -3, app.MAX_AGENTS_PER_REQUEST + 1])
+def test_add_agents_rejects_counts_out_of_range(session_path, count):
+    before = client.get(session_path + "/agents").json()
+    response = client.post(session_path + "/agents", json={"agent_type": "NoiseTrader", "count": count})
+    assert response.status_code == 400
+    assert client.get(session_path + "/agents").json() == before
+
+@pytest.mark.parametrize("levels", [0, -1])
+def test_depth_rejects_non_positive_levels(session_path, levels):
+    response = client.get(session_path + "/data/book/depth", params={"levels": levels})
+    assert response.status_code == 400
+
+@pytest.mark.parametrize("indicator", ["sma", "bbands"])
+@pytest.mark.parametrize("period", [0, app.MAX_PERIOD + 1])
+def test_indicators_reject_periods_out_of_range(session_path, indicator, period):
+    response = client.get(session_path + f"/data/indicators/{indicator}", params={"period": period})
+    assert response.status_code == 400
+
+@pytest.mark.parametrize("indicator", ["sma", "bbands"])
+def test_indicators_with_a_period_longer_than_the_history(session_path, indicator):
+    client.post(session_path + "/simulation/step", json={"count": 50}).raise_for_status()
+    trades = client.get(session_path + "/data/trades").json()["cursor"]
+    assert trades > 0
+    response = client.get(session_path + f"/data/indicators/{indicator}", params={"period": trades + 1})
+    assert response.status_code == 200
+    assert response.json()["items"] == []
+    assert len(client.get(session_path + f"/data/indicators/{indicator}", params={"period": 1}).json()["items"]) == trades
@@ -0,0 +1,109 @@
+"""Checks the matching engine against a plain reference price-time matcher."""
+import random
+
+import pytest
+
+from simulation.matching_engine import MatchingEngine
+from simulation.models import BUY, LIMIT, MARKET, SELL, Order
+from simulation.order_book import OrderBook
+
+class ReferenceBook:
+    """Price-time priority in its simplest form: one list per side, best order first."""
+
+    def __init__(self):
+        self.sides = {BUY: [], SELL: []}  # [order_id, agent_id, price, quantity]
+
+    def submit(self, order_id: int, agent_id: int, side, order_type, price: int | None,
+               quantity: int) -> list[tuple]:
+        """Returns ``(resting_order_id, resting_agent_id, price, quantity)`` per fill."""
+        fills = []
+        opposite = self.sides[SELL if side is BUY else BUY]
+        while quantity and opposite:
+            best = opposite[0]
+            if order_type is LIMIT and (price < best[2] if side is BUY else price > best[2]):
+                break
+            traded = min(quantity, best[3])
+            fills.append((best[0], best[1], best[2], traded))
+            quantity -= traded
+            best[3] -= traded
+            if not best[3]:
+                opposite.pop(0)
+        if order_type is LIMIT and quantity:
+            resting = self.sides[side]
+            # Behind every order at the same or a better price.
+            better = (lambda other: other[2] >= price) if side is BUY else (lambda other: other[2] <= price)
+            position = next((i for i, other in enumerate(resting) if not better(other)), len(resting))
+            resting.insert(position, [order_id, agent_id, price, quantity])
+        return fills
+
+    def cancel(self, order_id: int) -> bool:
+        for resting in self.sides.values():
+            for i, order in enumerate(resting):
+                if order[0] == order_id:
+                    del resting[i]
+                    return True
+        return False
+
+    def queue(self, side) -> list[tuple[int, int]]:
+        return [(order[0], order[3]) for order in self.sides[side]]
+
+    def depth(self, side) -> list[tuple[int, int]]:
+        levels = {}
+        for order in self.sides[side]:
+            levels[order[2]] = levels.get(order[2], 0) + order[3]
+        return list(levels.items())
+
+def engine_fills(engine: MatchingEngine, start: int) -> list[tuple]:
+    fills = engine.fills
+    prices = engine.order_book.grid.to_ticks_array(fills.price[start:fills.size]).tolist()
+    return list(zip(fills.resting_order_id[start:fills.size].tolist(),
+                    fills.resting_agent_id[start:fills.size].tolist(), prices,
+                    fills.quantity[start:fills.size].tolist()))
+
+@pytest.mark.parametrize("seed", range(12))
+def test_matches_reference_on_random_order_streams(seed):
+    rng = random.Random(seed)
+    book = OrderBook(0.01)
+    engine = MatchingEngine(book)
+    reference = ReferenceBook()
+    submitted = []
+    trades = 0
+    for _ in range(3000):
+        action = rng.random()
+        if action < 0.25 and submitted:
+            order_id = rng.choice(submitted)
+            assert book.cancel_order(order_id) == reference.cancel(order_id)
+            continue
+        side = rng.choice((BUY, SELL))
+        order_type = MARKET if action > 0.8 else LIMIT
+        price = rng.randint(9_980, 10_020) if order_type is LIMIT else None
+        order = Order.unchecked(side, rng.randint(1, 30), order_type, rng.randint(1, 8), price)
+        expected = reference.submit(order.order_id, order.agent_id, side, order_type, price, order.quantity)
+        start = engine.fills.size
+        assert engine.match(order) == len(expected)
+        assert engine_fills(engine, start) == expected
+        assert engine.fills.aggressor_order_id[start:engine.fills.size].tolist() == [order.order_id] * len(expected)
+        trades += len(expected)
+        submitted.append(order.order_id)
+
+        for book_side, ref_side in ((book.bids, BUY), (book.asks, SELL)):
+            assert book_side.depth() == reference.depth(ref_side)
+    for book_side, ref_side in ((book.bids, BUY), (book.asks, SELL)):
+        assert [(order.order_id, order.quantity) for order in book_side] == reference.queue(ref_side)
+    assert engine.fills.trade_id[:engine.fills.size].tolist() == list(range(1, trades + 1))
+    assert trades > 0
+
+def test_cancel_churn_behind_the_front_keeps_levels_compact():
+    book = OrderBook(0.01)
+    engine = MatchingEngine(book)
+    front = Order.unchecked(BUY, 5, LIMIT, 1, 10_000)
+    book.add_order(front)
+    for _ in range(1000):
+        order = Order.unchecked(BUY, 3, LIMIT, 2, 10_000)
+        book.add_order(order)
+        book.cancel_order(order.order_id)
+    level = book.bids.levels[10_000]
+    assert level.count == 1 and level.volume == 5
+    assert len(level.orders) <= 2
+    assert engine.match(Order.unchecked(SELL, 5, MARKET, 3)) == 1
+    assert not book.bids
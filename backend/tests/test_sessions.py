@@ -0,0 +1,67 @@
+"""Session registry lifetimes and their journals."""
+import glob
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app
+from session import DEFAULT_SESSION, SessionRegistry
+from simulation.journal import read_journal, replay
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    registry = SessionRegistry(journal_dir=str(tmp_path))
+    monkeypatch.setattr(app, "sessions", registry)
+    return registry
+
+def journals(directory, session_id: str) -> list[str]:
+    return sorted(glob.glob(os.path.join(str(directory), f"{session_id}.*.journal")))
+
+def test_deleting_a_session_closes_its_journal(registry, tmp_path):
+    client = TestClient(app.app)
+    session_id = client.post("/sessions").json()["session_id"]
+    client.post(f"/sessions/{session_id}/simulation/step", json={"count": 300}).raise_for_status()
+    session = registry.get(session_id)
+    writer = session.journal
+    assert client.delete(f"/sessions/{session_id}").status_code == 200
+    assert writer._file.closed
+    assert session.journal is None
+    assert client.get(f"/sessions/{session_id}/agents").status_code == 404
+    # The last batch was flushed, so the run replays to its final tick.
+    path, = journals(tmp_path, session_id)
+    assert replay(path).tick == 300
+
+def test_evicted_sessions_close_their_journals(tmp_path):
+    registry = SessionRegistry(max_sessions=2, journal_dir=str(tmp_path))
+    sessions = [registry.create() for _ in range(3)]
+    assert len(registry) == 2
+    assert sessions[0].journal is None
+    assert registry.get(sessions[0].session_id) is None
+    assert all(session.journal is not None for session in sessions[1:])
+
+    registry.ttl = 0.0
+    registry.get(DEFAULT_SESSION)
+    assert len(registry) == 1
+    assert all(session.journal is None for session in sessions)
+
+def test_default_session_starts_one_journal(registry, tmp_path):
+    session = registry.get(DEFAULT_SESSION)
+    path, = journals(tmp_path, DEFAULT_SESSION)
+    assert session.journal.path == path
+    assert registry.get(DEFAULT_SESSION) is session
+
+def test_default_session_resumes_its_latest_journal(tmp_path):
+    first = SessionRegistry(journal_dir=str(tmp_path)).get(DEFAULT_SESSION)
+    first.step(400)
+    first.close()
+    path, = journals(tmp_path, DEFAULT_SESSION)
+
+    resumed = SessionRegistry(journal_dir=str(tmp_path)).get(DEFAULT_SESSION)
+    assert journals(tmp_path, DEFAULT_SESSION) == [path]
+    assert resumed.journal.path == path
+    assert resumed.current_tick == 400
+    assert len(resumed.trade_store) == len(first.trade_store)
+    resumed.close()
+    _, records = read_journal(path)
+    assert len(records) > 0
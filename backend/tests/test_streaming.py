@@ -0,0 +1,51 @@
+"""The event stream's depth updates, applied the way the dashboard applies them."""
+from fastapi.testclient import TestClient
+
+import app
+
+client = TestClient(app.app)
+
+def apply_depth(levels: dict, changes: dict) -> dict:
+    if changes["snapshot"]:
+        levels = {"bids": {}, "asks": {}}
+    for side in ("bids", "asks"):
+        for price, volume in changes[side]:
+            if volume:
+                levels[side][price] = volume
+            else:
+                levels[side].pop(price, None)
+    return levels
+
+def book_levels(path: str) -> dict:
+    depth = client.get(path + "/data/book/depth").json()
+    return {side: {level["price"]: level["volume"] for level in depth[side]} for side in ("bids", "asks")}
+
+def test_depth_changes_rebuild_the_book():
+    session_id = client.post("/sessions").json()["session_id"]
+    path = f"/sessions/{session_id}"
+    try:
+        with client.websocket_connect(path + "/ws/stream") as socket:
+            first = socket.receive_json()
+            assert first["depth"]["snapshot"]
+            levels = apply_depth({}, first["depth"])
+            assert levels == book_levels(path)
+            snapshots = 0
+            for count in (50, 200, 1, 500, 0, 300):
+                client.post(path + "/simulation/step", json={"count": count}).raise_for_status()
+                message = socket.receive_json()
+                snapshots += message["depth"]["snapshot"]
+                levels = apply_depth(levels, message["depth"])
+                assert levels == book_levels(path)
+            assert snapshots == 0
+
+            client.post(path + "/simulation/reset").raise_for_status()
+            message = socket.receive_json()
+            assert message["reset"] and message["depth"]["snapshot"]
+            levels = apply_depth(levels, message["depth"])
+            assert levels == book_levels(path)
+            client.post(path + "/simulation/step", json={"count": 200}).raise_for_status()
+            message = socket.receive_json()
+            assert not message["depth"]["snapshot"]
+            assert apply_depth(levels, message["depth"]) == book_levels(path)
+    finally:
+        client.delete(path)
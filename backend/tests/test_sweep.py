@@ -0,0 +1,17 @@
+"""Checks that sweeps resume from their checkpoint."""
+import json
+
+from simulation.sweep import _failed_row, expand_grid, load_checkpoint, run_sweep
+
+def test_resume_reuses_finished_runs_and_reruns_failed_ones(tmp_path):
+    scenarios = expand_grid({"NoiseTrader": [2], "MarketTaker": [1]}, {}, [1, 2], 50)
+    checkpoint = tmp_path / "sweep.partial.jsonl"
+    finished = {**_failed_row(scenarios[0]), "failed": False, "trades": -1}
+    with open(checkpoint, "w") as f:
+        for row in (finished, _failed_row(scenarios[1])):
+            f.write(json.dumps(row) + "\n")
+
+    rows = run_sweep(scenarios, str(checkpoint), workers=1)
+    assert rows[0]["trades"] == -1  # reused, not rerun
+    assert not rows[1]["failed"] and "orders" in rows[1]
+    assert not load_checkpoint(str(checkpoint))[rows[1]["scenario_key"]]["failed"]
@@ -3,6 +3,8 @@ import React, { useState, useEffect, useCallback, useRef } from 'react';
 import axios from 'axios';
 import toast, { Toaster } from 'react-hot-toast';
 import soundManager from './SoundManager';
+import { fetchHistory } from './lib/history';
+import { connectStream, emptyDepthLevels, depthLevelsFromSnapshot, applyDepthChanges, depthFromLevels } from './lib/stream';
 
 import OrderBook3D from './OrderBook3D';
 import CandlestickChart from './CandlestickChart';
@@ -24,74 +26,130 @@ function App() {
   const [depthData, setDepthData] = useState({ bids: [], asks: [] });
   const [graphData, setGraphData] = useState({ nodes: [], links: [] });
   const [marketMetrics, setMarketMetrics] = useState({ total_volume: 0, volatility: 0, trade_count: 0 });
-  const [candlestickData, setCandlestickData] = useState([]);
   const [priceHistory, setPriceHistory] = useState([]);
   const [priceDirection, setPriceDirection] = useState('neutral');
   const [isMuted, setIsMuted] = useState(true);
   
   const lastPriceRef = useRef(null);
   const intervalRef = useRef(null);
+  const tradesCursorRef = useRef(0);
+  const priceCursorRef = useRef(0);
+  const depthLevelsRef = useRef(emptyDepthLevels());
+  const socketRef = useRef(null);
+  const fetchingRef = useRef(false);
+
+  const applyNewTrades = useCallback((newlyExecutedTrades, reset) => {
+    if (newlyExecutedTrades.length > 0) {
+      if (soundManager.isStarted) {
+        newlyExecutedTrades.forEach(trade => soundManager.playTradeSound(trade.side));
+      }
+      const latestTrade = newlyExecutedTrades[newlyExecutedTrades.length - 1];
+      const side = latestTrade.side.charAt(0).toUpperCase() + latestTrade.side.slice(1);
+      toast.success(`${side} executed: ${latestTrade.quantity} @ ${latestTrade.price.toFixed(2)}`);
+    }
+    setTrades(prevTrades => {
+      const base = reset ? [] : prevTrades;
+      return base.concat(newlyExecutedTrades).slice(-100); // Keep only last 100 trades
+    });
+  }, []);
+
+  const applyNewPrices = useCallback((newPriceHistory, reset) => {
+    if (newPriceHistory.length > 0) {
+      const currentPrice = newPriceHistory[newPriceHistory.length - 1].price;
+      if (lastPriceRef.current && currentPrice > lastPriceRef.current) {
+        setPriceDirection('up');
+      } else if (lastPriceRef.current && currentPrice < lastPriceRef.current) {
+        setPriceDirection('down');
+      }
+      lastPriceRef.current = currentPrice;
+    }
+    setPriceHistory(prevHistory => (reset ? [] : prevHistory).concat(newPriceHistory));
+  }, []);
+
+  const applyMetrics = useCallback((newMetrics) => {
+    if (soundManager.isStarted) {
+      soundManager.updateAmbientNoise(newMetrics.total_volume);
+    }
+    setMarketMetrics(newMetrics);
+  }, []);
 
   const fetchData = useCallback(async () => {
+    if (fetchingRef.current) return;
+    fetchingRef.current = true;
     try {
-      const [tradesRes, pnlRes, depthRes, graphRes, metricsRes, candleRes, priceHistoryRes] = await Promise.all([
-        axios.get(`${API_URL}/data/trades`),
+      // History endpoints are cursor-based: only records after the last
+      // cursor are transferred on each poll.
+      const [tradesPage, pnlRes, depthRes, graphRes, metricsRes, pricePage] = await Promise.all([
+        fetchHistory(`${API_URL}/data/trades`, tradesCursorRef.current),
         axios.get(`${API_URL}/agents/pnl`),
         axios.get(`${API_URL}/data/book/depth`),
         axios.get(`${API_URL}/data/agent-interactions`),
         axios.get(`${API_URL}/data/market-metrics`),
-        axios.get(`${API_URL}/data/candlestick`),
-        axios.get(`${API_URL}/data/price-history`)
+        fetchHistory(`${API_URL}/data/price-history`, priceCursorRef.current)
       ]);
+      tradesCursorRef.current = tradesPage.cursor;
+      priceCursorRef.current = pricePage.cursor;
 
-      const newTrades = tradesRes.data;
-      const newPriceHistory = priceHistoryRes.data;
-      const newMetrics = metricsRes.data;
-
-      setTrades(prevTrades => {
-        if (newTrades.length > prevTrades.length) {
-          const newlyExecutedTrades = newTrades.slice(prevTrades.length);
-          if (soundManager.isStarted) {
-            newlyExecutedTrades.forEach(trade => soundManager.playTradeSound(trade.side));
-          }
-          const latestTrade = newTrades[newTrades.length-1];
-          const side = latestTrade.side.charAt(0).toUpperCase() + latestTrade.side.slice(1);
-          toast.success(`${side} executed: ${latestTrade.quantity} @ ${latestTrade.price.toFixed(2)}`);
-        }
-        return newTrades.slice(-100); // Keep only last 100 trades
-      });
-
-      if (newPriceHistory.length > 0) {
-        const currentPrice = newPriceHistory[newPriceHistory.length - 1].price;
-        if (lastPriceRef.current && currentPrice > lastPriceRef.current) {
-          setPriceDirection('up');
-        } else if (lastPriceRef.current && currentPrice < lastPriceRef.current) {
-          setPriceDirection('down');
-        }
-        lastPriceRef.current = currentPrice;
-      }
-      
-      if (soundManager.isStarted) {
-        soundManager.updateAmbientNoise(newMetrics.total_volume);
-      }
-
+      applyNewTrades(tradesPage.items, tradesPage.reset);
+      applyNewPrices(pricePage.items, pricePage.reset);
+      applyMetrics(metricsRes.data);
+      depthLevelsRef.current = depthLevelsFromSnapshot(depthRes.data);
       setPnlData(pnlRes.data);
       setDepthData(depthRes.data);
       setGraphData(graphRes.data);
-      setMarketMetrics(newMetrics);
-      setCandlestickData(candleRes.data);
-      setPriceHistory(newPriceHistory);
     } catch (error) {
       console.error("Error fetching data: ", error);
       // Stop auto-run on error
       setIsAutoRunning(false);
+    } finally {
+      fetchingRef.current = false;
     }
-  }, []);
+  }, [applyNewTrades, applyNewPrices, applyMetrics]);
+
+  // Applies one pushed update from the server's event stream. Trades are only
+  // applied when they continue from our cursor; otherwise we catch up over REST.
+  const handleStreamMessage = useCallback((message) => {
+    if (message.reset) {
+      tradesCursorRef.current = 0;
+      priceCursorRef.current = 0;
+      lastPriceRef.current = null;
+      setTrades([]);
+      setPriceHistory([]);
+    }
+    const trades = message.trades || [];
+    const continuesCursor = !message.resync_trades &&
+      message.trades_cursor - trades.length === tradesCursorRef.current &&
+      tradesCursorRef.current === priceCursorRef.current;
+    if (continuesCursor) {
+      tradesCursorRef.current = message.trades_cursor;
+      priceCursorRef.current = message.trades_cursor;
+      applyNewTrades(trades, false);
+      applyNewPrices(trades.map(trade => ({ time: trade.timestamp, price: trade.price })), false);
+    } else {
+      fetchData();
+    }
+    if (message.depth) {
+      depthLevelsRef.current = applyDepthChanges(depthLevelsRef.current, message.depth);
+      setDepthData(depthFromLevels(depthLevelsRef.current));
+    }
+    if (message.pnl) setPnlData(message.pnl);
+    if (message.metrics) applyMetrics(message.metrics);
+    if (message.interactions) setGraphData(message.interactions);
+  }, [applyNewTrades, applyNewPrices, applyMetrics, fetchData]);
+
+  useEffect(() => {
+    const socket = connectStream(`${API_URL}/ws/stream`, handleStreamMessage);
+    socketRef.current = socket;
+    return () => socket.close();
+  }, [handleStreamMessage]);
 
   const handleStep = useCallback(async (count = 1) => {
     try {
       await axios.post(`${API_URL}/simulation/step`, { count: count });
-      fetchData();
+      // With a live event stream the server pushes the update; otherwise poll.
+      if (!socketRef.current || socketRef.current.readyState !== WebSocket.OPEN) {
+        fetchData();
+      }
     } catch (error) {
       console.error("Error running simulation step: ", error);
       setIsAutoRunning(false);
@@ -102,6 +160,10 @@ function App() {
     try {
       await axios.post(`${API_URL}/simulation/reset`);
       lastPriceRef.current = null;
+      tradesCursorRef.current = 0;
+      priceCursorRef.current = 0;
+      setTrades([]);
+      setPriceHistory([]);
       setPriceDirection('neutral');
       toast.error('Simulation Reset');
       fetchData();
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import ReactApexChart from 'react-apexcharts';
-import axios from 'axios';
+import { fetchHistory } from './lib/history';
 
 const ChartButton = ({ value, label, activeValue, onClick }) => (
   <button
@@ -25,30 +25,31 @@ const CandlestickChart = () => {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const candleRes = await axios.get(`http://localhost:8000/data/candlestick?timeframe=${timeframe}`);
+        const candlePage = await fetchHistory('http://localhost:8000/data/candlestick', 0, { timeframe });
+        const candles = candlePage.current ? candlePage.items.concat([candlePage.current]) : candlePage.items;
         
         let indicatorData = [];
         if (indicator === 'sma') {
-          const smaRes = await axios.get(`http://localhost:8000/data/indicators/sma?period=${indicatorPeriod}`);
-          indicatorData = smaRes.data.map(point => ({ x: new Date(point.time * 1000), y: point.sma }));
+          const smaPage = await fetchHistory('http://localhost:8000/data/indicators/sma', 0, { period: indicatorPeriod });
+          indicatorData = smaPage.items.map(point => ({ x: new Date(point.time * 1000), y: point.sma }));
           setSeries([
-            { name: 'Candles', type: 'candlestick', data: candleRes.data.map(c => ({ x: new Date(c.time * 1000), y: [c.open, c.high, c.low, c.close] })) },
+            { name: 'Candles', type: 'candlestick', data: candles.map(c => ({ x: new Date(c.time * 1000), y: [c.open, c.high, c.low, c.close] })) },
             { name: `SMA(${indicatorPeriod})`, type: 'line', data: indicatorData }
           ]);
         } else if (indicator === 'bbands') {
-          const bbandsRes = await axios.get(`http://localhost:8000/data/indicators/bbands?period=${indicatorPeriod}`);
-          const upperBand = bbandsRes.data.map(p => ({ x: new Date(p.time * 1000), y: p.upper }));
-          const middleBand = bbandsRes.data.map(p => ({ x: new Date(p.time * 1000), y: p.middle }));
-          const lowerBand = bbandsRes.data.map(p => ({ x: new Date(p.time * 1000), y: p.lower }));
+          const bbandsPage = await fetchHistory('http://localhost:8000/data/indicators/bbands', 0, { period: indicatorPeriod });
+          const upperBand = bbandsPage.items.map(p => ({ x: new Date(p.time * 1000), y: p.upper }));
+          const middleBand = bbandsPage.items.map(p => ({ x: new Date(p.time * 1000), y: p.middle }));
+          const lowerBand = bbandsPage.items.map(p => ({ x: new Date(p.time * 1000), y: p.lower }));
           setSeries([
-            { name: 'Candles', type: 'candlestick', data: candleRes.data.map(c => ({ x: new Date(c.time * 1000), y: [c.open, c.high, c.low, c.close] })) },
+            { name: 'Candles', type: 'candlestick', data: candles.map(c => ({ x: new Date(c.time * 1000), y: [c.open, c.high, c.low, c.close] })) },
             { name: 'Upper Band', type: 'line', data: upperBand },
             { name: 'Middle Band', type: 'line', data: middleBand },
             { name: 'Lower Band', type: 'line', data: lowerBand },
           ]);
         }
         
-        setVolumeSeries([{ name: 'Volume', data: candleRes.data.map(c => ({ x: new Date(c.time * 1000), y: c.volume })) }]);
+        setVolumeSeries([{ name: 'Volume', data: candles.map(c => ({ x: new Date(c.time * 1000), y: c.volume })) }]);
 
       } catch (error) {
         console.error("Failed to fetch chart data", error);
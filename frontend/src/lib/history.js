@@ -0,0 +1,26 @@
+import axios from 'axios';
+
+export const PAGE_SIZE = 1000;
+
+// Pages through a cursor-based history endpoint, starting after `cursor`.
+// Resolves to { items, cursor, current, reset }: `reset` is true when the
+// server restarted the series (e.g. after a simulation reset), in which case
+// `items` holds the series from the beginning rather than a delta.
+export async function fetchHistory(url, cursor = 0, params = {}) {
+  let items = [];
+  let next = cursor;
+  let reset = false;
+  let current = null;
+  for (;;) {
+    const { data } = await axios.get(url, { params: { ...params, cursor: next, limit: PAGE_SIZE } });
+    if (data.start !== next) {
+      reset = true;
+      items = [];
+    }
+    items = items.concat(data.items);
+    current = data.current ?? null;
+    next = data.cursor;
+    if (data.items.length < PAGE_SIZE) break;
+  }
+  return { items, cursor: next, current, reset };
+}
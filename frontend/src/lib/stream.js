@@ -0,0 +1,65 @@
+// Client side of the server's /ws/stream event stream.
+
+const RECONNECT_DELAY_MS = 2000;
+
+// Opens the event stream and reconnects after it drops. Returns an object
+// with `readyState` and `close()` like a WebSocket.
+export function connectStream(url, onMessage) {
+  const wsUrl = url.replace(/^http/, 'ws');
+  const handle = { socket: null, closed: false };
+
+  const open = () => {
+    const socket = new WebSocket(wsUrl);
+    socket.onmessage = (event) => onMessage(JSON.parse(event.data));
+    socket.onclose = () => {
+      if (!handle.closed) setTimeout(open, RECONNECT_DELAY_MS);
+    };
+    handle.socket = socket;
+  };
+  open();
+
+  return {
+    get readyState() {
+      return handle.socket ? handle.socket.readyState : WebSocket.CLOSED;
+    },
+    close() {
+      handle.closed = true;
+      if (handle.socket) handle.socket.close();
+    },
+  };
+}
+
+// Depth is kept as price -> volume maps so pushed level changes apply in place.
+export function emptyDepthLevels() {
+  return { bids: new Map(), asks: new Map() };
+}
+
+export function depthLevelsFromSnapshot(depth) {
+  return {
+    bids: new Map(depth.bids.map(level => [level.price, level.volume])),
+    asks: new Map(depth.asks.map(level => [level.price, level.volume])),
+  };
+}
+
+// Applies {snapshot, bids: [[price, volume]], asks: [...]}; volume 0 removes a level.
+export function applyDepthChanges(levels, changes) {
+  const next = changes.snapshot ? emptyDepthLevels() : { bids: new Map(levels.bids), asks: new Map(levels.asks) };
+  for (const side of ['bids', 'asks']) {
+    for (const [price, volume] of changes[side]) {
+      if (volume === 0) {
+        next[side].delete(price);
+      } else {
+        next[side].set(price, volume);
+      }
+    }
+  }
+  return next;
+}
+
+export function depthFromLevels(levels) {
+  const toList = (map) => Array.from(map, ([price, volume]) => ({ price, volume }));
+  return {
+    bids: toList(levels.bids).sort((a, b) => b.price - a.price),
+    asks: toList(levels.asks).sort((a, b) => a.price - b.price),
+  };
+}